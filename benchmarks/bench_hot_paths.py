@@ -0,0 +1,233 @@
+"""Benchmarks for the calculator and sensor hot paths.
+
+Run from the repository root:
+
+    python benchmarks/bench_hot_paths.py            # compare against baselines.json
+    python benchmarks/bench_hot_paths.py --quick    # 3 synthetic days instead of 31
+    python benchmarks/bench_hot_paths.py --update-baseline
+
+Reports throughput, p50/p99 latency per call and allocations (tracemalloc
+peak and net blocks), and exits non-zero if throughput or p50 regresses more
+than --tolerance, or p99 more than --p99-tolerance (tail latency is noisier),
+against the stored baseline. Baselines are machine-specific: regenerate them
+with --update-baseline on the machine used for release checks.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from stubs import FakeEntry, FakeEvent, FakeHass, NullStore, install_ha_stubs, load
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+TZ = ZoneInfo("Europe/Oslo")
+MONTH_START = 1_790_805_600.0  # 2026-10-01 00:00 Europe/Oslo
+
+
+@dataclass
+class Result:
+    name: str
+    calls: int
+    ops_per_s: float
+    p50_ns: int
+    p99_ns: int
+    alloc_peak_kib: float
+    net_blocks: int
+
+
+def _percentile(sorted_ns: list[float], q: float) -> float:
+    return sorted_ns[min(len(sorted_ns) - 1, math.ceil(q * len(sorted_ns)) - 1)]
+
+
+def run(
+    name: str,
+    calls: int,
+    step: Callable[[int], object],
+    batch: int = 1,
+    repeat: int = 3,
+    alloc_calls: int = 10_000,
+) -> Result:
+    """Time `calls` steps, best of `repeat` runs, then measure allocations.
+
+    step(i) receives a counter that keeps increasing across repeats, so
+    time-based replays never go backwards. Calls are timed in batches of
+    `batch` so sub-microsecond steps are not dominated by timer overhead;
+    latency percentiles are per call within a batch.
+    """
+    perf = time.perf_counter_ns
+    best_total = None
+    best_lat: list[float] = []
+    for r in range(repeat):
+        lat = []
+        for first in range(r * calls, (r + 1) * calls, batch):
+            last = min(first + batch, (r + 1) * calls)
+            t0 = perf()
+            for i in range(first, last):
+                step(i)
+            lat.append((perf() - t0) / (last - first))
+        total = sum(lat) * batch
+        if best_total is None or total < best_total:
+            best_total, best_lat = total, lat
+    best_lat.sort()
+
+    alloc_calls = min(alloc_calls, calls)
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for i in range(repeat * calls, repeat * calls + alloc_calls):
+        step(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    net_blocks = sys.getallocatedblocks() - blocks_before
+
+    return Result(
+        name=name,
+        calls=calls,
+        ops_per_s=calls / (best_total / 1e9) if best_total else float("inf"),
+        p50_ns=round(_percentile(best_lat, 0.50)),
+        p99_ns=round(_percentile(best_lat, 0.99)),
+        alloc_peak_kib=peak / 1024.0,
+        net_blocks=net_blocks,
+    )
+
+
+def _power_samples(n: int, seed: int = 1) -> list[float]:
+    rnd = random.Random(seed)
+    base = 1.5
+    out = []
+    for _ in range(n):
+        base = min(12.0, max(0.2, base + rnd.uniform(-0.05, 0.05)))
+        out.append(base + (rnd.random() < 0.01) * rnd.uniform(2.0, 7.0))
+    return out
+
+
+def bench_capacity(days: int) -> list[Result]:
+    capacity = load("capacity")
+    projection = load("projection")
+    tariff = load("pricing").TariffParams.from_options({})
+    n = days * 86_400
+    kw = _power_samples(n)
+    results = []
+    for resolution in (60, 15):
+        calc = capacity.CapacityCalculator(TZ, resolution)
+        update = calc.update_ts
+        results.append(run(
+            f"capacity.update_ts[{resolution}min]", n, lambda i: update(MONTH_START + i, kw[i % n]), batch=64
+        ))
+        top3 = calc.top3_avg_kw
+        results.append(run(f"capacity.top3_avg_kw[{resolution}min]", 200_000, lambda i: top3(), batch=64))
+        project = projection.PeakProjector().update
+        now = MONTH_START + n - 1800.0
+        results.append(run(
+            f"projection.update[{resolution}min]", 200_000, lambda i: project(calc, tariff, now, kw[i % n]), batch=64
+        ))
+    return results
+
+
+def bench_pricing() -> list[Result]:
+    pricing = load("pricing")
+    tariff = pricing.TariffParams.from_options({})
+    spot = [0.2 + (i % 97) / 50.0 for i in range(1000)]
+
+    def step(i: int) -> float:
+        tier = tariff.tier_index(spot[i % 1000] * 10.0)
+        return tariff.total_kr_kwh(spot[i % 1000], i & 1) + tariff.tier_prices[tier]
+
+    period_at = tariff.period_at
+    return [
+        run("pricing.total+tier", 500_000, step, batch=64),
+        run("tariff_calendar.period_at", 500_000, lambda i: period_at(MONTH_START + i * 60.0), batch=64),
+    ]
+
+
+def bench_sensor_event_path(events: int) -> list[Result]:
+    """Full per-event path: coordinator ingest + snapshot + every sensor's value and attributes."""
+    # uten homeassistant installert kjøres stien mot stubs, så den aldri hoppes over i stillhet
+    install_ha_stubs()
+    coordinator_mod = load("coordinator")
+    sensor_mod = load("sensor")
+    const = load("const")
+
+    coordinator_mod.entry_stores = lambda hass, entry_id: {"capacity": NullStore(), "cost": NullStore()}
+    hass = FakeHass()
+    hass.states.set("sensor.spot", "1.2345", {"today": [1.0 + h / 24 for h in range(24)]})
+    entry = FakeEntry(
+        data={const.CONF_SPOT_ENTITY: "sensor.spot", const.CONF_POWER_ENTITY: "sensor.power"},
+        options={const.OPT_MIN_PUBLISH_S: 0.0},
+    )
+    calc = load("capacity").CapacityCalculator(TZ)
+    coordinator = coordinator_mod.StromprisCoordinator(hass, entry, calc)
+    sensors = [sensor_mod.StromprisTotalSensor(hass, entry, d, coordinator) for d in sensor_mod.SENSORS]
+    for s in sensors:
+        # sensorens egen lytter: beregner verdi og attributter og skriver bare ved endring
+        coordinator.async_add_listener(s._async_write)
+    # som i Home Assistant: spotprisene kommer fra hub-en, parset én gang per tilstand
+    coordinator.async_start()
+
+    kw = _power_samples(events)
+    power_events = [
+        FakeEvent({"entity_id": "sensor.power", "new_state": hass.states.set("sensor.power", f"{v:.3f}")})
+        for v in kw
+    ]
+    handle = coordinator._handle_event
+    return [run("sensor.event_path", events, lambda i: handle(power_events[i % events]), repeat=1)]
+
+
+def compare(
+    results: list[Result], baselines: dict[str, dict], tolerance: float, p99_tolerance: float
+) -> list[str]:
+    failures = []
+    for r in results:
+        base = baselines.get(r.name)
+        if not base:
+            continue
+        if r.ops_per_s < base["ops_per_s"] * (1.0 - tolerance):
+            failures.append(f"{r.name}: {r.ops_per_s:,.0f} ops/s < baseline {base['ops_per_s']:,.0f}")
+        if r.p50_ns > base["p50_ns"] * (1.0 + tolerance):
+            failures.append(f"{r.name}: p50 {r.p50_ns} ns > baseline {base['p50_ns']} ns")
+        if r.p99_ns > base["p99_ns"] * (1.0 + p99_tolerance):
+            failures.append(f"{r.name}: p99 {r.p99_ns} ns > baseline {base['p99_ns']} ns")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="replay 3 days instead of a 31-day month")
+    parser.add_argument("--events", type=int, default=100_000, help="events for the sensor path benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression of ops/s and p50")
+    parser.add_argument("--p99-tolerance", type=float, default=0.50, help="allowed relative regression of p99")
+    parser.add_argument("--update-baseline", action="store_true", help="write results to baselines.json")
+    args = parser.parse_args()
+
+    results = bench_capacity(3 if args.quick else 31) + bench_pricing() + bench_sensor_event_path(args.events)
+
+    print(f"{'benchmark':34} {'calls':>9} {'ops/s':>12} {'p50 ns':>8} {'p99 ns':>8} {'peak KiB':>9} {'blocks':>7}")
+    for r in results:
+        print(
+            f"{r.name:34} {r.calls:>9} {r.ops_per_s:>12,.0f} {r.p50_ns:>8} {r.p99_ns:>8}"
+            f" {r.alloc_peak_kib:>9.1f} {r.net_blocks:>7}"
+        )
+
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    if args.update_baseline:
+        baselines.update({r.name: asdict(r) for r in results})
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"baselines written to {BASELINE_PATH}")
+        return 0
+
+    failures = compare(results, baselines, args.tolerance, args.p99_tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
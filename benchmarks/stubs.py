@@ -0,0 +1,209 @@
+"""Lightweight stand-ins for the parts of Home Assistant the hot paths touch.
+
+The integration package is loaded without running its ``__init__`` so the
+pure engines (capacity, pricing, curve) can be benchmarked without the
+homeassistant package. The sensor path imports Home Assistant modules; when
+homeassistant is not installed, install_ha_stubs() puts minimal stand-ins for
+the names the coordinator and sensor platform import into sys.modules. A
+running instance is never needed.
+"""
+from __future__ import annotations
+
+import enum
+import importlib
+import sys
+import types
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, tzinfo
+from pathlib import Path
+from typing import Any
+from zoneinfo import ZoneInfo
+
+INTEGRATION_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "strompris_total"
+PACKAGE = "strompris_total"
+
+
+def load(module: str) -> types.ModuleType:
+    """Import a module of the integration without executing the package __init__."""
+    if PACKAGE not in sys.modules:
+        pkg = types.ModuleType(PACKAGE)
+        pkg.__path__ = [str(INTEGRATION_DIR)]
+        sys.modules[PACKAGE] = pkg
+    return importlib.import_module(f"{PACKAGE}.{module}")
+
+
+def install_ha_stubs() -> bool:
+    """Register stand-ins for the homeassistant modules used on the event path.
+
+    Does nothing if homeassistant is importable. Returns True if stubs were installed.
+    """
+    try:
+        importlib.import_module("homeassistant.core")
+        return False
+    except ImportError:
+        pass
+
+    def module(name: str, **attrs: Any) -> types.ModuleType:
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, mod)
+        return mod
+
+    def unsub() -> None:
+        return None
+
+    class Entity:
+        hass: Any = None
+        entity_description: Any = None
+
+        def async_on_remove(self, func: Callable[[], None]) -> None:
+            return None
+
+        def async_write_ha_state(self) -> None:
+            return None
+
+    @dataclass(frozen=True, kw_only=True)
+    class EntityDescription:
+        key: str
+        name: str | None = None
+        icon: str | None = None
+        entity_category: Any = None
+        device_class: Any = None
+        state_class: Any = None
+        native_unit_of_measurement: str | None = None
+
+    class EntityCategory(enum.StrEnum):
+        CONFIG = "config"
+        DIAGNOSTIC = "diagnostic"
+
+    class SensorDeviceClass(enum.StrEnum):
+        TIMESTAMP = "timestamp"
+        ENERGY = "energy"
+        POWER = "power"
+
+    class SensorStateClass(enum.StrEnum):
+        MEASUREMENT = "measurement"
+        TOTAL = "total"
+        TOTAL_INCREASING = "total_increasing"
+
+    default_tz: tzinfo = ZoneInfo("Europe/Oslo")
+
+    module("homeassistant")
+    module(
+        "homeassistant.core",
+        CALLBACK_TYPE=Callable[[], None],
+        Event=FakeEvent,
+        HomeAssistant=FakeHass,
+        State=FakeState,
+        callback=lambda func: func,
+    )
+    module("homeassistant.const", EntityCategory=EntityCategory, UnitOfPower=types.SimpleNamespace(KILO_WATT="kW"))
+    module("homeassistant.config_entries", ConfigEntry=FakeEntry)
+    module("homeassistant.helpers")
+    module("homeassistant.helpers.entity", DeviceInfo=dict, Entity=Entity, EntityDescription=EntityDescription)
+    module("homeassistant.helpers.entity_platform", AddEntitiesCallback=Callable[..., None])
+    module(
+        "homeassistant.helpers.event",
+        async_call_later=lambda hass, delay, action: unsub,
+        async_track_point_in_time=lambda hass, action, point_in_time: unsub,
+        async_track_state_change_event=lambda hass, entity_ids, action: unsub,
+    )
+    module("homeassistant.helpers.storage", Store=lambda hass, version, key: NullStore())
+    module("homeassistant.util")
+    module(
+        "homeassistant.util.dt",
+        get_default_time_zone=lambda: default_tz,
+        now=lambda: datetime.now(default_tz),
+        utcnow=lambda: datetime.now(timezone.utc),
+        utc_from_timestamp=lambda ts: datetime.fromtimestamp(ts, timezone.utc),
+        as_local=lambda value: value.astimezone(default_tz),
+        as_utc=lambda value: value.astimezone(timezone.utc),
+        start_of_local_day=lambda: datetime.now(default_tz).replace(hour=0, minute=0, second=0, microsecond=0),
+    )
+    module("homeassistant.components")
+    module(
+        "homeassistant.components.sensor",
+        SensorDeviceClass=SensorDeviceClass,
+        SensorEntity=type("SensorEntity", (Entity,), {}),
+        SensorEntityDescription=EntityDescription,
+        SensorStateClass=SensorStateClass,
+    )
+    module("homeassistant.components.recorder", get_instance=lambda hass: hass)
+    module("homeassistant.components.recorder.models", StatisticData=dict, StatisticMetaData=dict)
+    module(
+        "homeassistant.components.recorder.statistics",
+        async_add_external_statistics=lambda hass, metadata, statistics: None,
+        get_last_statistics=lambda hass, number_of_stats, statistic_id, convert_units, types: {},
+        statistics_during_period=lambda hass, start, end, statistic_ids, period, units, types: {},
+    )
+    return True
+
+
+@dataclass
+class FakeState:
+    entity_id: str
+    state: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    last_updated: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class FakeStates:
+    def __init__(self) -> None:
+        self._states: dict[str, FakeState] = {}
+
+    def get(self, entity_id: str) -> FakeState | None:
+        return self._states.get(entity_id)
+
+    def set(self, entity_id: str, state: Any, attributes: dict[str, Any] | None = None) -> FakeState:
+        st = FakeState(entity_id, str(state), attributes or {})
+        self._states[entity_id] = st
+        return st
+
+
+class FakeBus:
+    def __init__(self) -> None:
+        self.fired: list[tuple[str, dict[str, Any]]] = []
+
+    def async_fire(self, event_type: str, event_data: dict[str, Any] | None = None) -> None:
+        self.fired.append((event_type, event_data or {}))
+
+
+class FakeHass:
+    def __init__(self) -> None:
+        self.states = FakeStates()
+        self.data: dict[str, Any] = {}
+        self.bus = FakeBus()
+        self.config = types.SimpleNamespace(components=set())
+
+    async def async_add_executor_job(self, target: Callable[..., Any], *args: Any) -> Any:
+        return target(*args)
+
+
+@dataclass
+class FakeEntry:
+    entry_id: str = "bench"
+    title: str = "Strømpris"
+    data: dict[str, Any] = field(default_factory=dict)
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class FakeEvent:
+    data: dict[str, Any]
+
+
+class NullStore:
+    """Store replacement: the benchmarks measure the event path, not storage."""
+
+    async def async_load(self) -> None:
+        return None
+
+    async def async_save(self, data: Any) -> None:
+        return None
+
+    def async_delay_save(self, data_func: Any, delay: float = 0) -> None:
+        return None
@@ -1,29 +1,109 @@
 from __future__ import annotations
 
+import logging
+from datetime import datetime
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
 
+from .backfill import async_backfill_capacity, async_compare_contracts
 from .capacity import CapacityCalculator
-from .const import DOMAIN
+from .const import COMPARISONS, DEFAULTS, DOMAIN, OPT_RESOLUTION_MIN
+from .coordinator import StromprisCoordinator, entry_stores
+from .perf import get_domain_stats
+from .services import async_setup_services
+from .tariffs import async_get_dso_catalog
+
+_LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[str] = ["sensor", "number", "select"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    async_setup_services(hass)
+    return True
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    if entry.version > 2:
+        return False
+    if entry.version == 1:
+        # Version 1 copied DEFAULTS and the DSO's catalog rates into options, which then
+        # always overrode the catalog (new tariff versions never applied). Keep only real overrides.
+        catalog = await async_get_dso_catalog(hass)
+        created_at = getattr(entry, "created_at", None)
+        options = catalog.explicit_options(entry.options, created_at.timestamp() if created_at else None)
+        dropped = {k: v for k, v in entry.options.items() if k not in options}
+        if dropped:
+            _LOGGER.info(
+                "Migrating %s: dropping options seeded from the catalog or defaults: %s",
+                entry.title,
+                ", ".join(f"{k}={v!r}" for k, v in sorted(dropped.items())),
+            )
+        hass.config_entries.async_update_entry(entry, options=options, version=2)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN].setdefault(entry.entry_id, {})
-    hass.data[DOMAIN][entry.entry_id]["capacity"] = CapacityCalculator()
-    
+    capacity = CapacityCalculator(
+        dt_util.get_default_time_zone(),
+        int(entry.options.get(OPT_RESOLUTION_MIN, DEFAULTS[OPT_RESOLUTION_MIN])),
+    )
+    coordinator = StromprisCoordinator(hass, entry, capacity)
+    coordinator.stats.setups += 1
+    hass.data[DOMAIN][entry.entry_id]["capacity"] = capacity
+    hass.data[DOMAIN][entry.entry_id]["coordinator"] = coordinator
+    await coordinator.async_restore()
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    coordinator.async_start()
+    entry.async_on_unload(coordinator.async_stop)
+    entry.async_create_background_task(
+        hass, async_backfill_capacity(hass, coordinator), f"{DOMAIN} capacity backfill"
+    )
+    _async_schedule_comparison(hass, entry, coordinator)
+
+    @callback
+    def _async_new_day(_now: datetime) -> None:
+        # the comparison is cached per day; a new day brings another day of history
+        _async_schedule_comparison(hass, entry, coordinator)
+
+    entry.async_on_unload(async_track_time_change(hass, _async_new_day, hour=0, minute=10, second=0))
     entry.async_on_unload(entry.add_update_listener(_async_entry_updated))
     return True
 
+@callback
+def _async_schedule_comparison(hass: HomeAssistant, entry: ConfigEntry, coordinator: StromprisCoordinator) -> None:
+    entry.async_create_background_task(
+        hass, async_compare_contracts(hass, coordinator), f"{DOMAIN} contract comparison"
+    )
+
 async def _async_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    # When options change, entities read from entry.options, so they update automatically.
-    # We still refresh platforms to be safe (in case we add/remove entities later).
-    await hass.config_entries.async_reload(entry.entry_id)
+    # Options are applied in place so the calculator keeps its state.
+    # Only a change to entry.data (watched entities) needs a full reload.
+    coordinator: StromprisCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    if coordinator.needs_reload(entry):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    coordinator.async_apply_options(entry.options)
+    # new DSO or contract: re-rank on the cached history
+    _async_schedule_comparison(hass, entry, coordinator)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        runtime = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        if runtime and "coordinator" in runtime:
+            await runtime["coordinator"].async_save()
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    get_domain_stats(hass).entries.pop(entry.entry_id, None)
+    hass.data.get(DOMAIN, {}).get(COMPARISONS, {}).pop(entry.entry_id, None)
+    for store in entry_stores(hass, entry.entry_id).values():
+        await store.async_remove()
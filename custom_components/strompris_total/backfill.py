@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.const import UnitOfPower
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .compare import Comparison, UsageProfile, build_profile, compare
+from .const import (
+    COMPARISONS,
+    DOMAIN,
+    OPT_BILLIG_TIMER,
+    OPT_DEBUG_SENSORS,
+    OPT_INTEGRATION_METHOD,
+    OPT_MIN_PUBLISH_S,
+    OPT_RESOLUTION_MIN,
+    OPT_VARSEL_KW,
+)
+from .coordinator import StromprisCoordinator
+from .tariffs import async_get_dso_catalog
+
+_LOGGER = logging.getLogger(__name__)
+
+# Valg som bare styrer live-sensorene; endringer i dem gir ingen ny sammenligning
+_RUNTIME_OPTIONS = frozenset({
+    OPT_BILLIG_TIMER,
+    OPT_DEBUG_SENSORS,
+    OPT_INTEGRATION_METHOD,
+    OPT_MIN_PUBLISH_S,
+    OPT_RESOLUTION_MIN,
+    OPT_VARSEL_KW,
+})
+
+
+@dataclass(slots=True)
+class _CachedComparison:
+    """Per entry in hass.data[DOMAIN][COMPARISONS]; survives reloads of the entry."""
+
+    profile_key: tuple[Any, ...]  # (day, days, power entities, spot entity, spot scale)
+    profile: UsageProfile | None  # None: no overlapping statistics that day
+    options_key: tuple[Any, ...] | None = None  # (catalog mtime, options that affect prices)
+    comparison: Comparison | None = None
+
+
+def _summed_means(stats: dict[str, list[dict[str, Any]]], entity_ids: tuple[str, ...]) -> dict[Any, float]:
+    """Hourly mean kW summed over all meters (meters without a row that hour count as 0)."""
+    total: dict[Any, float] = {}
+    for entity_id in entity_ids:
+        for r in stats.get(entity_id) or []:
+            if r.get("mean") is not None:
+                total[r["start"]] = total.get(r["start"], 0.0) + r["mean"]
+    return total
+
+
+async def async_backfill_capacity(hass: HomeAssistant, coordinator: StromprisCoordinator) -> None:
+    """Seed the calculator with this month's hourly mean kW from long-term statistics."""
+    power_entities = coordinator.power_entities
+    if not power_entities or "recorder" not in hass.config.components:
+        return
+
+    month_start = dt_util.start_of_local_day().replace(day=1)
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        dt_util.as_utc(month_start),
+        None,
+        set(power_entities),
+        "hour",
+        {"power": UnitOfPower.KILO_WATT},
+        {"mean"},
+    )
+    rows = sorted(_summed_means(stats, power_entities).items())
+    used = coordinator.capacity.backfill_hourly(rows, time.time())
+    _LOGGER.debug("Backfilled %s hourly means for %s", used, ", ".join(power_entities))
+    if used:
+        coordinator.async_refresh()
+        coordinator.async_schedule_save()
+
+
+async def async_compare_contracts(
+    hass: HomeAssistant, coordinator: StromprisCoordinator, days: int = 365
+) -> Comparison | None:
+    """Rank every contract × DSO on the entry's hourly power and spot statistics.
+
+    The recorder history is read at most once per day and the ranking is only
+    recomputed when the catalog or an option that affects prices changes, so
+    reloads and option edits reuse the cached result.
+    """
+    power_entities = coordinator.power_entities
+    if not power_entities or "recorder" not in hass.config.components:
+        return None
+
+    # statistikken er i spotsensorens egen enhet (øre, EUR/MWh, ...): skaler til NOK/kWh
+    prices = coordinator.spot_prices()
+    if prices is None:
+        _LOGGER.debug("No spot prices in NOK or EUR from %s", coordinator.spot_entity)
+        return None
+    scale = prices.unit_factor
+
+    cache: dict[str, _CachedComparison] = hass.data.setdefault(DOMAIN, {}).setdefault(COMPARISONS, {})
+    entry_id = coordinator.entry.entry_id
+    profile_key = (dt_util.now().date(), days, power_entities, coordinator.spot_entity, scale)
+    cached = cache.get(entry_id)
+    if cached is None or cached.profile_key != profile_key:
+        profile = await _async_profile(hass, coordinator, days, scale)
+        cached = cache[entry_id] = _CachedComparison(profile_key, profile)
+    if cached.profile is None:
+        return None
+
+    catalog = await async_get_dso_catalog(hass)
+    options = dict(coordinator.entry.options)
+    options_key = (catalog.mtime, tuple(sorted((k, v) for k, v in options.items() if k not in _RUNTIME_OPTIONS)))
+    if cached.comparison is None or cached.options_key != options_key:
+        dsos = [(dso, label, catalog.tariffs(dso)) for dso, label in catalog.labels]
+        cached.comparison = await hass.async_add_executor_job(compare, cached.profile, options, dsos, time.time())
+        cached.options_key = options_key
+    coordinator.async_set_comparison(cached.comparison)
+    return cached.comparison
+
+
+async def _async_profile(
+    hass: HomeAssistant, coordinator: StromprisCoordinator, days: int, scale: float
+) -> UsageProfile | None:
+    """Hourly kWh and spot price (NOK/kWh) from the recorder, reduced to a UsageProfile."""
+    power_entities = coordinator.power_entities
+    start = dt_util.start_of_local_day() - timedelta(days=days)
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period,
+        hass,
+        dt_util.as_utc(start),
+        None,
+        {*power_entities, coordinator.spot_entity},
+        "hour",
+        {"power": UnitOfPower.KILO_WATT},
+        {"mean"},
+    )
+    spot_by_start = {
+        r["start"]: r["mean"] * scale for r in stats.get(coordinator.spot_entity) or [] if r.get("mean") is not None
+    }
+    # hourly mean kW == kWh for that hour
+    rows = [
+        (start, kw, spot)
+        for start, kw in sorted(_summed_means(stats, power_entities).items())
+        if (spot := spot_by_start.get(start)) is not None
+    ]
+    if not rows:
+        _LOGGER.debug("No overlapping statistics for %s and %s", ", ".join(power_entities), coordinator.spot_entity)
+        return None
+    return await hass.async_add_executor_job(build_profile, rows, dt_util.get_default_time_zone())
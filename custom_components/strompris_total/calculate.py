@@ -0,0 +1,132 @@
+"""Batch price calculation for the strompris_total.calculate service.
+
+Items are sorted once and walked together with the spot slots, so a call with
+n timestamps over m slots costs O(n log n + m) with the tariff's precomputed
+adders and compiled calendar, instead of n template evaluations.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from typing import Any
+
+from .capacity import CapacityCalculator
+from .pricing import TariffParams
+
+# Indeks = periodekode (bit 0 = dag, bit 1 = sommer)
+PERIOD_NAMES = ("natt", "dag", "natt_sommer", "dag_sommer")
+
+
+@dataclass(frozen=True, slots=True)
+class CalcItem:
+    ts: float
+    kwh: float | None = None
+    peak_kw: float | None = None
+
+
+def calculate(
+    items: Sequence[CalcItem],
+    tariff: TariffParams,
+    spot_starts: Sequence[float],
+    spot_ends: Sequence[float],
+    spot_values: Sequence[float],
+    tz: tzinfo,
+    capacity: CapacityCalculator | None = None,
+) -> dict[str, Any]:
+    """Totals and breakdown per item (input order), sums, and the capacity tier per month.
+
+    Spot slots must be sorted and non-overlapping (as parsed by the spot hub).
+    Items outside the known spot slots get None prices and are counted as missing.
+    """
+    vat = tariff.vat_factor
+    vat_share = vat - 1.0
+    adders = tariff.adders_kr
+    grid = tariff.grid_kr
+    paaslag = tariff.paaslag_kr
+    avgift = tariff.avgift_kr
+    period_at = tariff.calendar.period_at
+
+    results: list[dict[str, Any] | None] = [None] * len(items)
+    sums = {"kwh": 0.0, "energy_kr": 0.0, "grid_energy_kr": 0.0, "taxes_kr": 0.0, "vat_kr": 0.0, "total_kr": 0.0}
+    missing = 0
+    # måned ("YYYY-MM") -> dag i måneden -> høyeste oppgitte effekt
+    peaks: dict[str, dict[int, float]] = {}
+
+    j = 0
+    n_slots = len(spot_starts)
+    for i in sorted(range(len(items)), key=lambda k: items[k].ts):
+        item = items[i]
+        ts = item.ts
+        while j < n_slots and spot_ends[j] <= ts:
+            j += 1
+        spot = spot_values[j] if j < n_slots and spot_starts[j] <= ts else None
+        period = period_at(ts)
+        local = datetime.fromtimestamp(ts, tz)
+        row: dict[str, Any] = {
+            "start": local.isoformat(),
+            "period": PERIOD_NAMES[period],
+            "spot_kr_kwh": spot,
+            "total_kr_kwh": round(spot * vat + adders[period], 6) if spot is not None else None,
+        }
+        if spot is None:
+            missing += 1
+        kwh = item.kwh
+        if kwh is not None:
+            row["kwh"] = kwh
+            if spot is not None:
+                energy = kwh * (spot + paaslag)
+                grid_energy = kwh * grid[period]
+                taxes = kwh * avgift
+                vat_kr = (energy + grid_energy + taxes) * vat_share
+                total = energy + grid_energy + taxes + vat_kr
+                row.update({
+                    "energy_kr": round(energy, 4),
+                    "grid_energy_kr": round(grid_energy, 4),
+                    "taxes_kr": round(taxes, 4),
+                    "vat_kr": round(vat_kr, 4),
+                    "total_kr": round(total, 4),
+                })
+                sums["kwh"] += kwh
+                sums["energy_kr"] += energy
+                sums["grid_energy_kr"] += grid_energy
+                sums["taxes_kr"] += taxes
+                sums["vat_kr"] += vat_kr
+                sums["total_kr"] += total
+        if item.peak_kw is not None:
+            row["peak_kw"] = item.peak_kw
+            row["tier"] = tariff.tier_labels[tariff.tier_index(item.peak_kw)]
+            days = peaks.setdefault(f"{local.year:04d}-{local.month:02d}", {})
+            days[local.day] = max(item.peak_kw, days.get(local.day, item.peak_kw))
+        results[i] = row
+
+    return {
+        "items": results,
+        "totals": {**{k: round(v, 4) for k, v in sums.items()}, "missing_spot": missing},
+        "capacity": _capacity_by_month(peaks, tariff, capacity),
+    }
+
+
+def _capacity_by_month(
+    peaks: dict[str, dict[int, float]], tariff: TariffParams, capacity: CapacityCalculator | None
+) -> list[dict[str, Any]]:
+    """Tier per month from the given peaks; the current month also counts the measured døgnmaks."""
+    current = capacity.current_day if capacity is not None else None
+    current_month = f"{current.year:04d}-{current.month:02d}" if current is not None else None
+    out = []
+    for month in sorted(peaks):
+        days = peaks[month]
+        if month == current_month:
+            avg_kw = capacity.top3_avg_with(days)
+        else:
+            best = sorted(days.values(), reverse=True)[:3]
+            avg_kw = sum(best) / len(best)
+        tier = tariff.tier_index(avg_kw)
+        out.append({
+            "month": month,
+            "top3_avg_kw": round(avg_kw, 3),
+            "tier": tariff.tier_labels[tier],
+            "capacity_kr_mnd": tariff.tier_prices[tier],
+            "includes_measured": month == current_month,
+        })
+    return out
@@ -1,87 +1,361 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Tuple
+import sys
+from array import array
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_NO_DATA = -1.0  # sentinel for "no value" in the day array and top-3 slots
+
 
-@dataclass
 class HourBucket:
-    start: datetime
-    sum_kw: float = 0.0
-    n: int = 0
+    """Running sum for one settlement slot (hour or quarter), keyed by epoch slot (int(ts // slot_s))."""
+
+    __slots__ = ("key", "sum_kw", "n")
+
+    def __init__(self, key: int = -1, sum_kw: float = 0.0, n: int = 0) -> None:
+        self.key = key
+        self.sum_kw = sum_kw
+        self.n = n
 
     def add(self, kw: float) -> None:
         self.sum_kw += kw
         self.n += 1
 
+    def reset(self, key: int) -> None:
+        self.key = key
+        self.sum_kw = 0.0
+        self.n = 0
+
     @property
     def avg_kw(self) -> float:
         return self.sum_kw / self.n if self.n else 0.0
 
 
 class CapacityCalculator:
-    """Tracks hourly average kW, daily max (døgnmaks), and top-3 daily maxima in current month."""
+    """Tracks hourly average kW, daily max (døgnmaks), and top-3 daily maxima in current month.
 
-    def __init__(self) -> None:
-        self.current_hour: Optional[HourBucket] = None
-        self.current_day: Optional[datetime.date] = None
-        self.day_max_kw: float = 0.0
-        self.daily_max_by_date: Dict[str, float] = {}  # "YYYY-MM-DD" -> døgnmaks (kW)
+    Samples go into settlement-slot buckets (60 or 15 minutes). With 15-minute
+    resolution a ring of four quarter buckets is rolled up to the hourly
+    average the DSO capacity charge uses. The per-sample path compares integer
+    epoch-slot keys and only touches datetimes when an hour boundary is crossed.
+    Finalized days live in a fixed 31-slot array and an incrementally
+    maintained top-3, so top3_avg_kw() is O(1).
+    """
 
-    def _hour_start(self, t: datetime) -> datetime:
-        return t.replace(minute=0, second=0, microsecond=0)
+    __slots__ = (
+        "_tz", "resolution_min", "_slot_s", "_per_hour", "_ring", "_slot", "hour_key",
+        "current_day", "day_max_kw", "_days", "_top3", "_day_start_ts", "_day_end_ts",
+    )
 
-    def _date_key(self, d) -> str:
-        return d.isoformat()
+    def __init__(self, tz: tzinfo | None = None, resolution_min: int = 60) -> None:
+        self._tz = tz or timezone.utc
+        self.resolution_min = resolution_min
+        self._slot_s = resolution_min * 60
+        self._per_hour = 60 // resolution_min
+        self._ring = [HourBucket() for _ in range(self._per_hour)]
+        self._slot = self._ring[0]
+        self.hour_key = -1  # epoch hour of the live hour
+        self.current_day: Optional[date] = None
+        self.day_max_kw: float = 0.0
+        self._days = array("d", [_NO_DATA] * 31)  # index = day of month - 1
+        self._top3 = [_NO_DATA, _NO_DATA, _NO_DATA]  # sorted descending
+        self._day_start_ts = 0.0
+        self._day_end_ts = 0.0
 
-    def update(self, t: datetime, kw: float) -> None:
-        """Call on each power update."""
+    @property
+    def daily_max_by_date(self) -> Dict[str, float]:
+        """Finalized døgnmaks for this month, "YYYY-MM-DD" -> kW."""
+        d = self.current_day
+        if d is None:
+            return {}
+        return {
+            date(d.year, d.month, i + 1).isoformat(): v
+            for i, v in enumerate(self._days)
+            if v != _NO_DATA
+        }
+
+    def update(self, t: datetime, kw: float) -> bool:
+        """Call on each power update. Returns True when an hour was finalized."""
         if t.tzinfo is None:
             t = t.replace(tzinfo=timezone.utc)
+        return self.update_ts(t.timestamp(), kw)
 
-        hour_start = self._hour_start(t)
-        day = t.date()
+    def update_ts(self, ts: float, kw: float) -> bool:
+        """Same as update() but takes a POSIX timestamp."""
+        rolled = False
+        key = int(ts // self._slot_s)
+        if key != self._slot.key:
+            rolled = self._roll_slot(ts, key)
+        self._slot.add(kw if kw > 0.0 else 0.0)
+        return rolled
 
-        # init
-        if self.current_hour is None:
-            self.current_hour = HourBucket(start=hour_start)
-            self.current_day = day
-            self.day_max_kw = 0.0
+    def roll_to(self, ts: float, hold_kw: float | None = None) -> bool:
+        """Finalize the current slot/hour (and day/month) if ts is past it.
+
+        With hold_kw the new slot starts with that load as its first sample
+        (sample-and-hold), so a quiet meter does not count as 0 kW until it
+        reports again.
+        """
+        key = int(ts // self._slot_s)
+        if self.hour_key < 0 or key == self._slot.key:
+            return False
+        rolled = self._roll_slot(ts, key)
+        if hold_kw is not None:
+            self._slot.add(hold_kw if hold_kw > 0.0 else 0.0)
+        return rolled
+
+    def set_resolution(self, resolution_min: int) -> None:
+        """Switch slot length; the live hour's samples are kept as one bucket."""
+        if resolution_min == self.resolution_min:
+            return
+        sum_kw = sum(b.sum_kw for b in self._ring)
+        n = sum(b.n for b in self._ring)
+        hour_key = self.hour_key
+        self.resolution_min = resolution_min
+        self._slot_s = resolution_min * 60
+        self._per_hour = 60 // resolution_min
+        self._ring = [HourBucket() for _ in range(self._per_hour)]
+        self._slot = self._ring[0]
+        if hour_key >= 0:
+            self._slot.key = hour_key * self._per_hour
+            self._slot.sum_kw = sum_kw
+            self._slot.n = n
 
-        # month rollover: if day is in a different month than current_day, reset daily dict
-        if self.current_day and (day.month != self.current_day.month or day.year != self.current_day.year):
-            self.daily_max_by_date = {}
+    def _roll_slot(self, ts: float, key: int) -> bool:
+        """Advance to slot `key`. Returns True when an hour was finalized."""
+        hour_key = int(ts // 3600)
+        rolled = False
+        if hour_key != self.hour_key:
+            rolled = self.hour_key >= 0
+            # hour rollover: finalize previous hour average into day_max
+            avg = self.hour_avg_kw()
+            if avg > self.day_max_kw:
+                self.day_max_kw = avg
+            if not self._day_start_ts <= ts < self._day_end_ts:
+                self._roll_day(datetime.fromtimestamp(ts, self._tz).date())
+            for bucket in self._ring:
+                bucket.reset(-1)
+            self.hour_key = hour_key
+        self._slot = self._ring[key % self._per_hour]
+        self._slot.reset(key)
+        return rolled
 
-        # day rollover: finalize yesterday (store its døgnmaks), then reset
-        if self.current_day and day != self.current_day:
-            # store yesterday's max
-            self.daily_max_by_date[self._date_key(self.current_day)] = float(self.day_max_kw)
-            self.current_day = day
+    def hour_avg_kw(self) -> float:
+        """Average kW of the live hour (mean of its slot averages)."""
+        if self._per_hour == 1:
+            return self._slot.avg_kw
+        total = 0.0
+        used = 0
+        for bucket in self._ring:
+            if bucket.n:
+                total += bucket.sum_kw / bucket.n
+                used += 1
+        return total / used if used else 0.0
+
+    def slot_averages(self) -> list[float | None]:
+        """Per-slot averages of the live hour (None for empty slots)."""
+        return [b.avg_kw if b.n else None for b in self._ring]
+
+    def _roll_day(self, day: date) -> None:
+        prev = self.current_day
+        # month rollover: reset daily array
+        if prev is None or (day.year, day.month) != (prev.year, prev.month):
+            self._clear_month()
+        elif day != prev:
+            # day rollover: finalize yesterday (store its døgnmaks)
+            self._set_day(prev.day, self.day_max_kw)
+        if day != prev:
             self.day_max_kw = 0.0
+        self._set_current_day(day)
+
+    def _set_current_day(self, day: date) -> None:
+        self.current_day = day
+        self._day_start_ts = datetime.combine(day, time(), self._tz).timestamp()
+        self._day_end_ts = datetime.combine(day + timedelta(days=1), time(), self._tz).timestamp()
 
-        # hour rollover: finalize previous hour average into day_max
-        if self.current_hour and hour_start != self.current_hour.start:
-            self.day_max_kw = max(self.day_max_kw, self.current_hour.avg_kw)
-            self.current_hour = HourBucket(start=hour_start)
+    def _clear_month(self) -> None:
+        for i in range(31):
+            self._days[i] = _NO_DATA
+        self._top3[:] = [_NO_DATA, _NO_DATA, _NO_DATA]
 
-        # add current sample into current hour
-        self.current_hour.add(max(0.0, float(kw)))
+    def _set_day(self, day_of_month: int, kw: float) -> None:
+        old = self._days[day_of_month - 1]
+        self._days[day_of_month - 1] = kw
+        if old == _NO_DATA:
+            self._push_top3(kw)
+        else:
+            # overwrite of an existing day (restore/backfill): rebuild from the array
+            self._rebuild_top3()
+
+    def _push_top3(self, v: float) -> None:
+        t = self._top3
+        if v <= t[2]:
+            return
+        if v > t[0]:
+            t[2] = t[1]
+            t[1] = t[0]
+            t[0] = v
+        elif v > t[1]:
+            t[2] = t[1]
+            t[1] = v
+        else:
+            t[2] = v
+
+    def _rebuild_top3(self) -> None:
+        self._top3[:] = [_NO_DATA, _NO_DATA, _NO_DATA]
+        for v in self._days:
+            if v != _NO_DATA:
+                self._push_top3(v)
+
+    def backfill_hourly(self, rows: Iterable[Tuple[float, Optional[float]]], now_ts: float) -> int:
+        """Merge hourly mean kW rows (start_ts, mean) for this month in one pass.
+
+        Rows must be sorted by start. Existing values are only raised, never
+        lowered, and the live hour is left to the sample stream. Returns the
+        number of rows used.
+        """
+        now_key = int(now_ts // self._slot_s)
+        if now_key != self._slot.key:
+            self._roll_slot(now_ts, now_key)
+        today = self.current_day
+        # midnight timestamps for day 1..today+1 of this month
+        bounds = [
+            datetime.combine(date(today.year, today.month, d), time(), self._tz).timestamp()
+            for d in range(1, today.day + 1)
+        ]
+        bounds.append(self._day_end_ts)
+        best = [_NO_DATA] * today.day
+        live_key = self.hour_key
+        i = 0
+        used = 0
+        for start, mean in rows:
+            if mean is None or start < bounds[0] or int(start // 3600) >= live_key:
+                continue
+            while start >= bounds[i + 1]:
+                i += 1
+            if mean > best[i]:
+                best[i] = mean
+            used += 1
+
+        for i in range(today.day - 1):
+            if best[i] > self._days[i]:
+                self._set_day(i + 1, best[i])
+        if best[-1] > self.day_max_kw:
+            self.day_max_kw = best[-1]
+        return used
+
+    def today_max_kw(self) -> float:
+        """Today's max so far (finalized hours + partial hour average)."""
+        avg = self.hour_avg_kw()
+        return avg if avg > self.day_max_kw else self.day_max_kw
 
     def top3_avg_kw(self) -> float:
         """Average of top 3 daily maxima in this month (kW)."""
-        values = list(self.daily_max_by_date.values())
+        a, b, c = self._top3
+
+        # include today's max so far
+        if self.current_day is not None:
+            live = self.today_max_kw()
+            if live > c:
+                if live > a:
+                    a, b, c = live, a, b
+                elif live > b:
+                    b, c = live, b
+                else:
+                    c = live
 
-        # include today's max so far (based on finalized hours + partial hour average)
-        if self.current_day:
-            today_max = self.day_max_kw
-            if self.current_hour:
-                today_max = max(today_max, self.current_hour.avg_kw)
-            values.append(today_max)
+        if a == _NO_DATA:
+            return 0.0
+        if b == _NO_DATA:
+            return a
+        if c == _NO_DATA:
+            return (a + b) / 2.0
+        return (a + b + c) / 3.0
+
+    def projected_top3_avg_kw(self, hour_kw: float) -> float:
+        """Top-3 average if the live hour ends at hour_kw (O(1))."""
+        return self._top3_avg_with(hour_kw if hour_kw > self.day_max_kw else self.day_max_kw)
+
+    def today_limit_kw(self, upper_kw: float) -> float:
+        """Highest døgnmaks today can reach while the top-3 average stays below upper_kw (O(1))."""
+        a, b, c = self._top3
+        if c != _NO_DATA:
+            # summen av topp 3 med dagens t er a + b + max(c, t)
+            return 3.0 * upper_kw - a - b
+        others = [v for v in (a, b) if v != _NO_DATA]
+        return upper_kw * (len(others) + 1) - sum(others)
+
+    def _top3_avg_with(self, live: float) -> float:
+        # som top3_avg_kw, men med oppgitt døgnmaks for i dag (top3_avg_kw holdes inline for fart)
+        a, b, c = self._top3
+        if live > c:
+            if live > a:
+                a, b, c = live, a, b
+            elif live > b:
+                b, c = live, b
+            else:
+                c = live
 
-        values = [v for v in values if v is not None]
-        if not values:
+        if a == _NO_DATA:
             return 0.0
+        if b == _NO_DATA:
+            return a
+        if c == _NO_DATA:
+            return (a + b) / 2.0
+        return (a + b + c) / 3.0
+
+    def top3_avg_with(self, peaks: Dict[int, float]) -> float:
+        """Top-3 average for this month if the given døgnmaks (day of month -> kW) were also reached."""
+        days = list(self._days)
+        if self.current_day is not None:
+            i = self.current_day.day - 1
+            days[i] = max(days[i], self.today_max_kw())
+        for day_of_month, kw in peaks.items():
+            if kw > days[day_of_month - 1]:
+                days[day_of_month - 1] = kw
+        best = sorted((v for v in days if v != _NO_DATA), reverse=True)[:3]
+        return sum(best) / len(best) if best else 0.0
+
+    def footprint_bytes(self) -> int:
+        """Approximate memory held by the calculator: object, slot ring, day array and top-3."""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self._ring)
+            + sum(sys.getsizeof(b) for b in self._ring)
+            + sys.getsizeof(self._days)
+            + sys.getsizeof(self._top3)
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Compact JSON-serializable state for Store."""
+        return {
+            "days": self.daily_max_by_date,
+            "day": self.current_day.isoformat() if self.current_day else None,
+            "day_max_kw": self.day_max_kw,
+            "hour_start": (
+                datetime.fromtimestamp(self.hour_key * 3600, self._tz).isoformat() if self.hour_key >= 0 else None
+            ),
+            "hour_sum_kw": sum(b.sum_kw for b in self._ring),
+            "hour_n": sum(b.n for b in self._ring),
+        }
 
-        values.sort(reverse=True)
-        top3 = values[:3]
-        return sum(top3) / len(top3)
+    def restore(self, data: dict[str, Any]) -> None:
+        """Load state produced by as_dict(). Month/day rollover is handled by the next update()."""
+        self.__init__(self._tz, self.resolution_min)
+        day = data.get("day")
+        if not day:
+            return
+        self._set_current_day(date.fromisoformat(day))
+        for key, kw in (data.get("days") or {}).items():
+            d = date.fromisoformat(key)
+            if (d.year, d.month) == (self.current_day.year, self.current_day.month):
+                self._set_day(d.day, float(kw))
+        self.day_max_kw = float(data.get("day_max_kw") or 0.0)
+        hour_start = data.get("hour_start")
+        if hour_start:
+            # the live hour is restored as one bucket (its first slot)
+            self.hour_key = int(datetime.fromisoformat(hour_start).timestamp() // 3600)
+            self._slot.key = self.hour_key * self._per_hour
+            self._slot.sum_kw = float(data.get("hour_sum_kw") or 0.0)
+            self._slot.n = int(data.get("hour_n") or 0)
@@ -0,0 +1,322 @@
+"""Contract × DSO comparison over a consumption history.
+
+The history is reduced once into a UsageProfile: per-slot kWh, running sums
+of kWh and spot cost, and the per-month figures that do not depend on the
+tariff (average spot, top-3 capacity). A tariff-period index (one byte per
+slot, from the compiled tariff calendar) is built once per distinct set of
+calendar rules and shared by every DSO using them. Each DSO is priced like
+BillSimulator: energy rates from the catalog version valid at each slot,
+capacity and fixed charges from the version valid when the month started.
+Each DSO is evaluated with one pass over its period index and all contracts
+are priced from the sums per tariff version and month, so the work per
+combination is O(months). Inside Home Assistant the DSOs are evaluated
+serially in one executor job; the offline simulator can pass map_jobs to
+spread them over a process pool.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import asdict, dataclass
+from datetime import datetime, tzinfo
+from typing import Any
+
+from .capacity import CapacityCalculator
+from .const import CONTRACTS, DEFAULTS, OPT_CONTRACT, OPT_DSO
+from .pricing import TariffParams
+from .tariff_calendar import PERIODS, CalendarLookup, CalendarRules
+from .tariffs import DsoTariffs, effective_options
+
+
+@dataclass(frozen=True, slots=True)
+class UsageProfile:
+    """Consumption history reduced once and shared by every combination."""
+
+    tz: tzinfo
+    months: tuple[str, ...]  # "YYYY-MM"
+    month_start: array  # array('I'): first slot of each month, then the slot count
+    starts: array  # array('d'): slot start timestamps
+    kwh: array  # array('d'): kWh per slot
+    cum_kwh: array  # array('d'): kWh before each slot, then the total
+    cum_spot_kr: array  # array('d'): sum(kWh * spot) before each slot, then the total, eks. mva
+    kwh_month: tuple[float, ...]
+    spot_avg_month: tuple[float, ...]  # unweighted average spot
+    top3_kw_month: tuple[float, ...]
+
+    @property
+    def kwh_total(self) -> float:
+        return sum(self.kwh_month)
+
+    def period_index(self, rules: CalendarRules) -> bytes:
+        """Tariff period code per slot under the given calendar rules."""
+        period_at = CalendarLookup(rules, self.tz).period_at
+        return bytes(period_at(ts) for ts in self.starts)
+
+
+class ProfileBuilder:
+    """Builds a UsageProfile from (start_ts, kWh, spot) rows in time order."""
+
+    def __init__(self, tz: tzinfo, resolution_min: int = 60) -> None:
+        self._tz = tz
+        self._kw_per_kwh = 60.0 / resolution_min
+        self._capacity = CapacityCalculator(tz, resolution_min)
+        self._hours: dict[int, tuple[int, str]] = {}
+        self._month_key: int | None = None
+        self.months: list[str] = []
+        self.month_start = array("I")
+        self.starts = array("d")
+        self.kwh = array("d")
+        self.cum_kwh = array("d", [0.0])
+        self.cum_spot_kr = array("d", [0.0])
+        self.kwh_month: list[float] = []
+        self.spot_sum_month: list[float] = []
+        self.slots_month: list[int] = []
+        self.top3_kw_month: list[float] = []
+
+    def _hour_info(self, ts: float) -> tuple[int, str]:
+        key = int(ts // 3600)
+        info = self._hours.get(key)
+        if info is None:
+            local = datetime.fromtimestamp(ts, self._tz)
+            info = (local.year * 12 + local.month, f"{local.year:04d}-{local.month:02d}")
+            self._hours[key] = info
+        return info
+
+    def add(self, ts: float, kwh: float, spot: float) -> None:
+        month_key, month = self._hour_info(ts)
+        if month_key != self._month_key:
+            if self._month_key is not None:
+                self.top3_kw_month.append(self._capacity.top3_avg_kw())
+            self._month_key = month_key
+            self.months.append(month)
+            self.month_start.append(len(self.starts))
+            self.kwh_month.append(0.0)
+            self.spot_sum_month.append(0.0)
+            self.slots_month.append(0)
+        m = len(self.months) - 1
+        self.starts.append(ts)
+        self.kwh.append(kwh)
+        self.cum_kwh.append(self.cum_kwh[-1] + kwh)
+        self.cum_spot_kr.append(self.cum_spot_kr[-1] + kwh * spot)
+        self.kwh_month[m] += kwh
+        self.spot_sum_month[m] += spot
+        self.slots_month[m] += 1
+        self._capacity.update_ts(ts, kwh * self._kw_per_kwh)
+
+    def build(self) -> UsageProfile:
+        top3 = list(self.top3_kw_month)
+        if self._month_key is not None:
+            top3.append(self._capacity.top3_avg_kw())
+        return UsageProfile(
+            tz=self._tz,
+            months=tuple(self.months),
+            month_start=self.month_start + array("I", [len(self.starts)]),
+            starts=self.starts,
+            kwh=self.kwh,
+            cum_kwh=self.cum_kwh,
+            cum_spot_kr=self.cum_spot_kr,
+            kwh_month=tuple(self.kwh_month),
+            spot_avg_month=tuple(s / n for s, n in zip(self.spot_sum_month, self.slots_month)),
+            top3_kw_month=tuple(top3),
+        )
+
+
+def build_profile(rows: Iterable[tuple[float, float, float]], tz: tzinfo, resolution_min: int = 60) -> UsageProfile:
+    builder = ProfileBuilder(tz, resolution_min)
+    for ts, kwh, spot in rows:
+        builder.add(ts, kwh, spot)
+    return builder.build()
+
+
+@dataclass(frozen=True, slots=True)
+class ComparisonRow:
+    contract: str
+    dso: str
+    dso_label: str
+    total_kr: float
+    energy_kr: float  # eks. mva
+    grid_energy_kr: float  # eks. mva
+    taxes_kr: float  # eks. mva
+    vat_kr: float
+    capacity_kr: float
+    fixed_kr: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    """Ranked cost table, cheapest first."""
+
+    rows: tuple[ComparisonRow, ...]
+    months: tuple[str, ...]
+    kwh: float
+    current: tuple[str, str] | None = None  # (contract, dso) of the entry
+    computed_at: float = 0.0
+
+    @property
+    def best(self) -> ComparisonRow | None:
+        return self.rows[0] if self.rows else None
+
+    def row(self, contract: str, dso: str) -> ComparisonRow | None:
+        return next((r for r in self.rows if r.contract == contract and r.dso == dso), None)
+
+    @property
+    def savings_kr(self) -> float | None:
+        """What the best combination saves over the current one for the same history."""
+        best = self.best
+        cur = self.row(*self.current) if self.current else None
+        if best is None or cur is None:
+            return None
+        return cur.total_kr - best.total_kr
+
+    def as_dict(self, limit: int | None = None) -> dict[str, Any]:
+        rows = self.rows if limit is None else self.rows[:limit]
+        savings = self.savings_kr
+        return {
+            "months": list(self.months),
+            "kwh": round(self.kwh, 3),
+            "current": list(self.current) if self.current else None,
+            "savings_kr": round(savings, 2) if savings is not None else None,
+            "rows": [r.as_dict() for r in rows],
+        }
+
+
+def contract_energy_kr(tariff: TariffParams, contract: str, kwh: float, spot_kr: float, spot_avg: float) -> float:
+    """Energy cost eks. mva for one month, or the part of it under one tariff version, under a contract type."""
+    if contract == "norgespris":
+        return kwh * tariff.norgespris_kr
+    if contract == "fastpris":
+        return kwh * tariff.fastpris_kr
+    if contract == "variabel":
+        # Variabel pris følger månedssnittet i spotmarkedet, ikke timeprisen.
+        return kwh * (spot_avg + tariff.variabel_paaslag_kr)
+    return spot_kr + kwh * tariff.paaslag_kr
+
+
+# (first slot, end slot, options, period index of those slots): one catalog version over the profile
+Segment = tuple[int, int, dict[str, Any], bytes]
+
+
+def evaluate_dso(
+    profile: UsageProfile,
+    dso: str,
+    dso_label: str,
+    segments: Sequence[Segment],
+    contracts: Sequence[str] = CONTRACTS,
+) -> list[ComparisonRow]:
+    """Price every contract for one DSO over the profile, one tariff per segment."""
+    month_start = profile.month_start
+    cum_kwh = profile.cum_kwh
+    cum_spot_kr = profile.cum_spot_kr
+    energy = dict.fromkeys(contracts, 0.0)
+    grid = taxes = capacity = fixed = 0.0
+    vat = dict.fromkeys(contracts, 0.0)
+    for first, end, options, period in segments:
+        tariff = TariffParams.from_options(options, tz=profile.tz)
+        period_kwh = [0.0] * PERIODS
+        for p, kwh in zip(period, profile.kwh[first:end]):
+            period_kwh[p] += kwh
+        grid_rates = tariff.grid_kr
+        seg_grid = sum(k * grid_rates[p] for p, k in enumerate(period_kwh))
+        seg_taxes = (cum_kwh[end] - cum_kwh[first]) * tariff.avgift_kr
+        seg_energy = dict.fromkeys(contracts, 0.0)
+        for m in range(bisect_right(month_start, first) - 1, len(profile.months)):
+            a = max(first, month_start[m])
+            b = min(end, month_start[m + 1])
+            if a >= b:
+                break
+            if a == month_start[m]:
+                # kapasitets- og fastledd etter versjonen som gjaldt da måneden startet
+                capacity += tariff.tier_prices[tariff.tier_index(profile.top3_kw_month[m])]
+                fixed += tariff.fixed_kr_mnd
+            kwh = cum_kwh[b] - cum_kwh[a]
+            spot_kr = cum_spot_kr[b] - cum_spot_kr[a]
+            for contract in contracts:
+                seg_energy[contract] += contract_energy_kr(tariff, contract, kwh, spot_kr, profile.spot_avg_month[m])
+        grid += seg_grid
+        taxes += seg_taxes
+        for contract in contracts:
+            energy[contract] += seg_energy[contract]
+            vat[contract] += (seg_energy[contract] + seg_grid + seg_taxes) * (tariff.vat_factor - 1.0)
+
+    return [
+        ComparisonRow(
+            contract=contract,
+            dso=dso,
+            dso_label=dso_label,
+            total_kr=energy[contract] + grid + taxes + vat[contract] + capacity + fixed,
+            energy_kr=energy[contract],
+            grid_energy_kr=grid,
+            taxes_kr=taxes,
+            vat_kr=vat[contract],
+            capacity_kr=capacity,
+            fixed_kr=fixed,
+        )
+        for contract in contracts
+    ]
+
+
+# (dso, label, segments): the arguments of evaluate_dso after the profile
+ComparisonJob = tuple[str, str, list[Segment]]
+
+
+def dso_options(base: Mapping[str, Any], dso: str, dso_defaults: Mapping[str, Any]) -> dict[str, Any]:
+    """Effective options for dso: its catalog defaults under the entry's explicit options (as the live sensors)."""
+    options = effective_options(base, dso_defaults)
+    options[OPT_DSO] = dso
+    return options
+
+
+def compare(
+    profile: UsageProfile,
+    base_options: Mapping[str, Any],
+    dsos: Sequence[tuple[str, str, DsoTariffs]],
+    computed_at: float = 0.0,
+    map_jobs: Callable[[UsageProfile, list[ComparisonJob]], Iterable[list[ComparisonRow]]] | None = None,
+) -> Comparison:
+    """Rank all CONTRACTS × dsos, where dsos is [(dso_id, label, catalog tariff versions)].
+
+    base_options are the entry's explicit options; each version's catalog
+    defaults are layered under them with effective_options().
+
+    DSOs without catalog defaults are skipped unless they are the entry's own,
+    since they would only repeat the entry's manual grid rates. map_jobs
+    evaluates the jobs (default: one after the other). Blocking; run in an
+    executor from the event loop.
+    """
+    current_dso = base_options.get(OPT_DSO, DEFAULTS[OPT_DSO])
+    n = len(profile.starts)
+    periods: dict[CalendarRules, bytes] = {}
+    jobs: list[ComparisonJob] = []
+    for dso, label, tariffs in dsos:
+        if not tariffs.defaults[-1] and dso != current_dso:
+            continue
+        segments: list[Segment] = []
+        for i, defaults in enumerate(tariffs.defaults):
+            first = bisect_left(profile.starts, tariffs.starts[i])
+            end = bisect_left(profile.starts, tariffs.starts[i + 1]) if i + 1 < len(tariffs.starts) else n
+            if first >= end:
+                continue
+            rules = tariffs.calendars[i]
+            if rules not in periods:
+                periods[rules] = profile.period_index(rules)
+            segments.append((first, end, dso_options(base_options, dso, defaults), periods[rules][first:end]))
+        jobs.append((dso, label, segments))
+    if map_jobs is None:
+        results: Iterable[list[ComparisonRow]] = (evaluate_dso(profile, *job) for job in jobs)
+    else:
+        results = map_jobs(profile, jobs)
+    rows = [row for result in results for row in result]
+
+    rows.sort(key=lambda r: r.total_kr)
+    contract = base_options.get(OPT_CONTRACT, DEFAULTS[OPT_CONTRACT])
+    return Comparison(
+        rows=tuple(rows),
+        months=profile.months,
+        kwh=profile.kwh_total,
+        current=(contract, current_dso) if contract and current_dso else None,
+        computed_at=computed_at,
+    )
@@ -15,24 +15,23 @@ from .const import (
     CONF_PRICE_AREA,
     CONF_DSO,
     CONF_CONTRACT,
+    CONF_POWER_ENTITY,
     DEFAULTS,
     OPT_PRICE_AREA,
     OPT_DSO,
     OPT_CONTRACT,
+    OPT_DEBUG_SENSORS,
     PRICE_AREAS,
     CONTRACTS,
 )
-from .tariffs import load_dso_catalog
-
-def _dso_options() -> list[tuple[str, str]]:
-    catalog = load_dso_catalog()
-    # returns list of (value,label)
-    return [(k, v.get("label", k)) for k, v in catalog.items()]
+from .tariffs import async_get_dso_catalog
 
 class StromprisTotalConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
-    VERSION = 1
+    # 2: options holder bare egne valg og overstyringer (se async_migrate_entry)
+    VERSION = 2
 
     async def async_step_user(self, user_input: dict[str, Any] | None = None):
+        catalog = await async_get_dso_catalog(self.hass)
         if user_input is not None:
             await self.async_set_unique_id(f"{DOMAIN}_{user_input[CONF_NAME]}")
             self._abort_if_unique_id_configured()
@@ -46,16 +45,13 @@ class StromprisTotalConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_POWER_ENTITY: user_input[CONF_POWER_ENTITY],
             }
 
-            # Seed options with defaults + DSO defaults + chosen values
-            options: dict[str, Any] = dict(DEFAULTS)
-            options[OPT_PRICE_AREA] = user_input[CONF_PRICE_AREA]
-            options[OPT_DSO] = user_input[CONF_DSO]
-            options[OPT_CONTRACT] = user_input[CONF_CONTRACT]
-
-            catalog = load_dso_catalog()
-            dso = user_input[CONF_DSO]
-            dso_defaults = catalog.get(dso, {}).get("defaults", {})
-            options.update(dso_defaults)
+            # Only the choices; rates come from DEFAULTS and the DSO's catalog version
+            # valid at the time, until the user overrides them
+            options: dict[str, Any] = {
+                OPT_PRICE_AREA: user_input[CONF_PRICE_AREA],
+                OPT_DSO: user_input[CONF_DSO],
+                OPT_CONTRACT: user_input[CONF_CONTRACT],
+            }
 
             return self.async_create_entry(title=user_input[CONF_NAME], data=data, options=options)
 
@@ -65,9 +61,12 @@ class StromprisTotalConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 selector.EntitySelectorConfig(domain="sensor")
             ),
             vol.Required(CONF_PRICE_AREA, default=DEFAULTS[OPT_PRICE_AREA]): vol.In(PRICE_AREAS),
-            vol.Required(CONF_DSO, default=DEFAULTS[OPT_DSO]): vol.In([k for k, _ in _dso_options()]),
+            vol.Required(CONF_DSO, default=DEFAULTS[OPT_DSO]): vol.In(dict(catalog.labels)),
             vol.Required(CONF_CONTRACT, default=DEFAULTS[OPT_CONTRACT]): vol.In(CONTRACTS),
-            vol.Required(CONF_POWER_ENTITY): selector.EntitySelector(selector.EntitySelectorConfig(domain="sensor")),
+            # Flere målere (hus, lader, varmepumpe, faser) summeres til ett effektuttak
+            vol.Required(CONF_POWER_ENTITY): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="sensor", multiple=True)
+            ),
         })
         return self.async_show_form(step_id="user", data_schema=schema)
 
@@ -80,18 +79,16 @@ class StromprisTotalOptionsFlowHandler(config_entries.OptionsFlow):
         self.entry = entry
 
     async def async_step_init(self, user_input: dict[str, Any] | None = None):
+        catalog = await async_get_dso_catalog(self.hass)
         if user_input is not None:
             # Apply option changes
             options = dict(self.entry.options)
+            dso = user_input.get(OPT_DSO, options.get(OPT_DSO, DEFAULTS[OPT_DSO]))
+            if dso != options.get(OPT_DSO, DEFAULTS[OPT_DSO]):
+                # new DSO: drop rate overrides so its catalog rates apply
+                options = catalog.options_for_dso(options, dso)
             options.update(user_input)
 
-            # If DSO changed, merge in DSO defaults (but do not overwrite fields user already set in this submission)
-            catalog = load_dso_catalog()
-            dso = options.get(OPT_DSO, DEFAULTS[OPT_DSO])
-            dso_defaults = catalog.get(dso, {}).get("defaults", {})
-            for k, v in dso_defaults.items():
-                options.setdefault(k, v)
-
             return self.async_create_entry(title="", data=options)
 
         current = dict(DEFAULTS)
@@ -99,7 +96,8 @@ class StromprisTotalOptionsFlowHandler(config_entries.OptionsFlow):
 
         schema = vol.Schema({
             vol.Required(OPT_PRICE_AREA, default=current.get(OPT_PRICE_AREA)): vol.In(PRICE_AREAS),
-            vol.Required(OPT_DSO, default=current.get(OPT_DSO)): vol.In([k for k, _ in _dso_options()]),
+            vol.Required(OPT_DSO, default=current.get(OPT_DSO)): vol.In(dict(catalog.labels)),
             vol.Required(OPT_CONTRACT, default=current.get(OPT_CONTRACT)): vol.In(CONTRACTS),
+            vol.Optional(OPT_DEBUG_SENSORS, default=bool(current.get(OPT_DEBUG_SENSORS))): bool,
         })
         return self.async_show_form(step_id="init", data_schema=schema)
@@ -15,9 +15,17 @@ OPT_CONTRACT = "opt_contract"
 OPT_PAASLAG_ORE = "opt_paaslag_ore_kwh"
 OPT_STROM_FAST_KR = "opt_strom_fast_kr_mnd"
 
+# Energipris for de andre avtaletypene (brukes i avtalesammenligningen)
+OPT_NORGESPRIS_ORE = "opt_norgespris_ore_kwh"
+OPT_FASTPRIS_ORE = "opt_fastpris_ore_kwh"
+OPT_VARIABEL_PAASLAG_ORE = "opt_variabel_paaslag_ore_kwh"
+
 OPT_NETT_DAG_ORE = "opt_nett_energiledd_dag_ore_kwh"
 OPT_NETT_NATT_ORE = "opt_nett_energiledd_natt_ore_kwh"
 OPT_NETT_FAST_KR = "opt_nett_fastledd_kr_mnd"
+# Sommersats for nettselskap med sesongdifferensiert energiledd (se "calendar" i katalogen)
+OPT_NETT_DAG_SOMMER_ORE = "opt_nett_energiledd_dag_sommer_ore_kwh"
+OPT_NETT_NATT_SOMMER_ORE = "opt_nett_energiledd_natt_sommer_ore_kwh"
 
 OPT_ELAVGIFT_ORE = "opt_elavgift_ore_kwh"
 OPT_ENOVA_ORE = "opt_enova_ore_kwh"
@@ -32,10 +40,34 @@ OPT_KAP_T5_KR = "opt_kap_t5_kr_mnd"
 OPT_KAP_T6_KR = "opt_kap_t6_kr_mnd"
 OPT_KAP_T7_KR = "opt_kap_t7_kr_mnd"
 
+# Kostnadsintegrasjon (Riemann-sum av effekt * pris)
+OPT_INTEGRATION_METHOD = "opt_integrasjonsmetode"
+
+# Minste intervall mellom publiserte tilstander ved hyppige effektmålinger (AMS/HAN)
+OPT_MIN_PUBLISH_S = "opt_min_publish_s"
+
+# Avregningsoppløsning (minutter): 60 = time, 15 = kvarter (MTU)
+OPT_RESOLUTION_MIN = "opt_opplosning_min"
+RESOLUTIONS = ["60", "15"]
+
+# Diagnosesensorer (tellere og latens) – krever omlasting for å legge til/fjerne entiteter
+OPT_DEBUG_SENSORS = "opt_diagnosesensorer"
+
+# Valutakurs for spotkilder som oppgir pris i EUR (f.eks. ENTSO-E EUR/MWh)
+OPT_EUR_NOK = "opt_valutakurs_eur_nok"
+
+# Varsel om effekttopp: terskel (kW) for prognosert timesnitt, 0 = grensen til neste kapasitetstrinn
+OPT_VARSEL_KW = "opt_effektvarsel_kw"
+
+# Billigste timer (antall timer som skal finnes i prisforløpet)
+OPT_BILLIG_TIMER = "opt_billig_timer"
+
 PRICE_AREAS = ["NO1", "NO2", "NO3", "NO4", "NO5"]
 
 CONTRACTS = ["spot_plus_paaslag", "norgespris", "fastpris", "variabel"]
 
+INTEGRATION_METHODS = ["trapezoidal", "left"]
+
 DEFAULTS = {
     OPT_PRICE_AREA: "NO1",
     OPT_DSO: "ukjent",
@@ -44,9 +76,15 @@ DEFAULTS = {
     OPT_PAASLAG_ORE: 3.0,
     OPT_STROM_FAST_KR: 49.0,
 
+    OPT_NORGESPRIS_ORE: 40.0,
+    OPT_FASTPRIS_ORE: 89.0,
+    OPT_VARIABEL_PAASLAG_ORE: 15.0,
+
     OPT_NETT_DAG_ORE: 10.0,
     OPT_NETT_NATT_ORE: 10.0,
     OPT_NETT_FAST_KR: 0.0,
+    OPT_NETT_DAG_SOMMER_ORE: 10.0,
+    OPT_NETT_NATT_SOMMER_ORE: 10.0,
 
     OPT_ELAVGIFT_ORE: 7.13,
     OPT_ENOVA_ORE: 1.0,
@@ -59,6 +97,14 @@ DEFAULTS = {
     OPT_KAP_T5_KR: 520.0,
     OPT_KAP_T6_KR: 630.0,
     OPT_KAP_T7_KR: 1175.0,
+
+    OPT_EUR_NOK: 11.5,
+    OPT_BILLIG_TIMER: 3.0,
+    OPT_VARSEL_KW: 0.0,
+    OPT_INTEGRATION_METHOD: "trapezoidal",
+    OPT_MIN_PUBLISH_S: 10.0,
+    OPT_RESOLUTION_MIN: "60",
+    OPT_DEBUG_SENSORS: False,
 }
 
 # Kapasitets-trinn (kW)
@@ -71,3 +117,30 @@ CAPACITY_TIERS = [
     (25.0, "20–25 kW",  OPT_KAP_T6_KR),
     (10_000.0, "25+ kW", OPT_KAP_T7_KR),
 ]
+
+# Delte nøkler i hass.data[DOMAIN] (ved siden av runtime-data per entry_id)
+SPOT_HUB = "spot_hub"
+COMPARISONS = "comparisons"  # avtalesammenligning per entry_id, overlever reload
+PERF_STATS = "perf_stats"
+
+# Hendelse når prognosert timesnitt krysser varselterskelen (opp eller ned)
+EVENT_PEAK_WARNING = f"{DOMAIN}_peak_warning"
+
+# Tjenester
+SERVICE_CHEAPEST_HOURS = "cheapest_hours"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_HOURS = "hours"
+ATTR_CONTIGUOUS = "contiguous"
+SERVICE_COMPARE_CONTRACTS = "compare_contracts"
+ATTR_DAYS = "days"
+SERVICE_CALCULATE = "calculate"
+ATTR_ITEMS = "items"
+ATTR_START = "start"
+ATTR_KWH = "kwh"
+ATTR_PEAK_KW = "peak_kw"
+CALCULATE_MAX_ITEMS = 10_000
+
+# Lagring av kapasitetsstatus (Store)
+STORAGE_VERSION = 1
+SAVE_DELAY_S = 10  # coalesce writes triggered by hour rollover
+SAVE_INTERVAL_S = 600  # at most this long between saves of the partial hour
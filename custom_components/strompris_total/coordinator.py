@@ -0,0 +1,465 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .capacity import CapacityCalculator
+from .const import (
+    CONF_POWER_ENTITY,
+    CONF_SPOT_ENTITY,
+    DEFAULTS,
+    DOMAIN,
+    EVENT_PEAK_WARNING,
+    OPT_BILLIG_TIMER,
+    OPT_DEBUG_SENSORS,
+    OPT_DSO,
+    OPT_EUR_NOK,
+    OPT_INTEGRATION_METHOD,
+    OPT_MIN_PUBLISH_S,
+    OPT_RESOLUTION_MIN,
+    OPT_VARSEL_KW,
+    SAVE_DELAY_S,
+    SAVE_INTERVAL_S,
+    STORAGE_VERSION,
+)
+from .compare import Comparison
+from .cost import CostAccumulator
+from .curve import PriceCurve, build_price_curve, split_slots
+from .long_term import LongTermStatistics
+from .meters import MeterMerger
+from .perf import get_domain_stats
+from .pricing import TariffParams
+from .projection import PeakProjection, PeakProjector
+from .scheduler import BoundaryScheduler
+from .spot_hub import SpotPrices, get_spot_hub
+from .tariff_calendar import DEFAULT_RULES
+from .tariffs import DsoCatalog, async_get_dso_catalog, effective_options
+from .windows import CheapestResult, find_cheapest
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PriceSnapshot:
+    """Immutable result of one calculation, shared by all sensors of an entry."""
+
+    spot_kr_kwh: float
+    total_variabel_kr_kwh: float
+    fast_kost_kr_mnd: float
+    top3_avg_kw: float
+    tier_label: str
+    margin_kw: float
+    cap_price_kr_mnd: float
+    curve: PriceCurve | None
+    cheapest_window: CheapestResult | None
+    cheapest_slots: CheapestResult | None
+    cost_day_kr: float
+    cost_month_kr: float
+    energy_day_kwh: float
+    energy_month_kwh: float
+    hour_avg_kw: float
+    meter_contributions_kw: Mapping[str, float]  # empty with a single meter
+    projection: PeakProjection | None
+
+
+def _state_float(state) -> float:
+    try:
+        return float(state.state) if state else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def power_entities(data: Mapping[str, Any]) -> tuple[str, ...]:
+    """Power entities of an entry; older entries store a single entity id."""
+    value = data.get(CONF_POWER_ENTITY)
+    if not value:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def entry_stores(hass: HomeAssistant, entry_id: str) -> dict[str, Store]:
+    """One Store per persisted engine ("capacity", "cost")."""
+    return {
+        name: Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.{name}")
+        for name in ("capacity", "cost")
+    }
+
+
+class StromprisCoordinator:
+    """Subscribes once per config entry, feeds the calculator and pushes snapshots to entities."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, capacity: CapacityCalculator) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.capacity = capacity
+        self.cost = CostAccumulator(
+            dt_util.get_default_time_zone(),
+            entry.options.get(OPT_INTEGRATION_METHOD, DEFAULTS[OPT_INTEGRATION_METHOD]),
+        )
+        self.spot_entity: str = entry.data[CONF_SPOT_ENTITY]
+        self.spot_hub = get_spot_hub(hass)
+        self.power_entities = power_entities(entry.data)
+        self.power_entity: str | None = self.power_entities[0] if self.power_entities else None
+        self.meters = MeterMerger(self.power_entities) if len(self.power_entities) > 1 else None
+        self._catalog: DsoCatalog | None = None
+        self._tariff_until = float("inf")
+        self.effective_options: dict[str, Any] = {}
+        self.tariff = self._compile_tariff(entry.options)
+        self.resolution_min = int(entry.options.get(OPT_RESOLUTION_MIN, DEFAULTS[OPT_RESOLUTION_MIN]))
+        self._curve: PriceCurve | None = None
+        self._curve_key: tuple[object, TariffParams] | None = None
+        self.cheap_hours = float(entry.options.get(OPT_BILLIG_TIMER, DEFAULTS[OPT_BILLIG_TIMER]))
+        self.eur_nok = float(entry.options.get(OPT_EUR_NOK, DEFAULTS[OPT_EUR_NOK]))
+        self._converted: SpotPrices | None = None
+        self._converted_key: tuple[SpotPrices, float] | None = None
+        self._rejected_currency: str | None = None
+        self._cheapest: tuple[CheapestResult | None, CheapestResult | None] = (None, None)
+        self._cheapest_key: tuple[PriceCurve, int | None, float] | None = None
+        self.projector = PeakProjector(float(entry.options.get(OPT_VARSEL_KW, DEFAULTS[OPT_VARSEL_KW])))
+        self._setup_data = dict(entry.data)
+        self.debug_sensors = bool(entry.options.get(OPT_DEBUG_SENSORS, DEFAULTS[OPT_DEBUG_SENSORS]))
+        self.stats = get_domain_stats(hass).entry(entry.entry_id)
+        self._listeners: dict[CALLBACK_TYPE, Callable[[], None]] = {}
+        self._options_listeners: dict[CALLBACK_TYPE, Callable[[], None]] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+        self._spot_unsub: CALLBACK_TYPE | None = None
+        self.min_publish_s = float(entry.options.get(OPT_MIN_PUBLISH_S, DEFAULTS[OPT_MIN_PUBLISH_S]))
+        self.comparison: Comparison | None = None
+        self.long_term = LongTermStatistics(hass, entry.entry_id, entry.title)
+        self.samples_ingested = 0
+        self.samples_coalesced = 0
+        self._last_publish = 0.0
+        self._flush_unsub: CALLBACK_TYPE | None = None
+        self.scheduler = BoundaryScheduler(hass, self._async_on_boundary, self.resolution_min)
+        self._stores = entry_stores(hass, entry.entry_id)
+        self._last_save = time.monotonic()
+        # sist: _compute() leser spot_hub, tariff, cachene og projector over
+        self.data: PriceSnapshot = self._compute()
+
+    def _persisted(self) -> dict[str, CapacityCalculator | CostAccumulator]:
+        return {"capacity": self.capacity, "cost": self.cost}
+
+    async def async_restore(self) -> None:
+        """Load persisted calculator/cost state (call before async_start)."""
+        # DSO calendar rules (holidays, seasons) live in the catalog
+        self._catalog = await async_get_dso_catalog(self.hass)
+        self.tariff = self._compile_tariff(self.entry.options)
+        for name, engine in self._persisted().items():
+            data = await self._stores[name].async_load()
+            if data:
+                engine.restore(data)
+        self.data = self._compute()
+
+    async def async_save(self) -> None:
+        """Write state now (used on unload)."""
+        for name, engine in self._persisted().items():
+            await self._stores[name].async_save(engine.as_dict())
+
+    @callback
+    def async_schedule_save(self) -> None:
+        # Store debounces and writes in the executor; also flushes on HA shutdown
+        self._last_save = time.monotonic()
+        for name, engine in self._persisted().items():
+            self._stores[name].async_delay_save(engine.as_dict, SAVE_DELAY_S)
+
+    @callback
+    def async_start(self) -> None:
+        # Spot prices come parsed from the shared hub; only the power meter is watched per entry.
+        self._spot_unsub = self.spot_hub.async_subscribe(self.spot_entity, self._handle_spot)
+        if self.meters is not None:
+            # start from the meters' current values; samples are only taken on events
+            for entity_id in self.power_entities:
+                self.meters.hold(entity_id, _state_float(self.hass.states.get(entity_id)))
+        if self.power_entities:
+            self._unsub = async_track_state_change_event(self.hass, list(self.power_entities), self._handle_event)
+        self.scheduler.async_start()
+
+    @callback
+    def async_stop(self) -> None:
+        self.scheduler.async_stop()
+        if self._spot_unsub is not None:
+            self._spot_unsub()
+            self._spot_unsub = None
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        if self._flush_unsub is not None:
+            self._flush_unsub()
+            self._flush_unsub = None
+        self._listeners.clear()
+        self._options_listeners.clear()
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Register an entity callback; returns a function that removes it again."""
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.pop(remove_listener, None)
+
+        self._listeners[remove_listener] = update_callback
+        return remove_listener
+
+    @callback
+    def async_add_options_listener(self, update_callback: Callable[[], None]) -> CALLBACK_TYPE:
+        """Register a callback that only runs when entry.options change (number/select entities)."""
+
+        @callback
+        def remove_listener() -> None:
+            self._options_listeners.pop(remove_listener, None)
+
+        self._options_listeners[remove_listener] = update_callback
+        return remove_listener
+
+    def needs_reload(self, entry: ConfigEntry) -> bool:
+        """True if the entry changed in a way that alters subscriptions or the entity set."""
+        return (
+            dict(entry.data) != self._setup_data
+            or bool(entry.options.get(OPT_DEBUG_SENSORS, DEFAULTS[OPT_DEBUG_SENSORS])) != self.debug_sensors
+        )
+
+    @callback
+    def async_apply_options(self, options) -> None:
+        """Hot-apply changed options: recompile tariff, keep calculator state, refresh entities."""
+        self.cheap_hours = float(options.get(OPT_BILLIG_TIMER, DEFAULTS[OPT_BILLIG_TIMER]))
+        self.eur_nok = float(options.get(OPT_EUR_NOK, DEFAULTS[OPT_EUR_NOK]))
+        self.cost.method = options.get(OPT_INTEGRATION_METHOD, DEFAULTS[OPT_INTEGRATION_METHOD])
+        self.min_publish_s = float(options.get(OPT_MIN_PUBLISH_S, DEFAULTS[OPT_MIN_PUBLISH_S]))
+        self.projector.threshold_kw = float(options.get(OPT_VARSEL_KW, DEFAULTS[OPT_VARSEL_KW]))
+        resolution_min = int(options.get(OPT_RESOLUTION_MIN, DEFAULTS[OPT_RESOLUTION_MIN]))
+        if resolution_min != self.resolution_min:
+            self.resolution_min = resolution_min
+            self.capacity.set_resolution(resolution_min)
+            self._curve_key = None
+            self.scheduler.async_stop()
+            self.scheduler.resolution_min = resolution_min
+            if self._spot_unsub is not None:
+                self.scheduler.async_start()
+        self.async_update_tariff(options)
+        for update_callback in list(self._options_listeners.values()):
+            update_callback()
+
+    @callback
+    def _handle_event(self, event: Event) -> None:
+        # Effektmåling: feed calculator (én gang per sample)
+        t0 = time.perf_counter_ns()
+        now = time.time()
+        kw = _state_float(event.data.get("new_state"))
+        if self.meters is not None:
+            # samlet effekt over alle målere (siste verdi holdes for de andre)
+            kw = self.meters.update(event.data["entity_id"], now, kw)
+        rolled = self.capacity.update_ts(now, kw)
+        self._project(now, kw)
+        # price valid from this sample on; the snapshot is refreshed in _handle_spot on spot changes
+        rolled |= self.cost.update_ts(now, kw, self.data.total_variabel_kr_kwh)
+        self.samples_ingested += 1
+        if rolled or time.monotonic() - self._last_save >= SAVE_INTERVAL_S:
+            self.async_schedule_save()
+        self._async_publish_throttled()
+        self.stats.event_handler.record(time.perf_counter_ns() - t0)
+
+    @callback
+    def _handle_spot(self, prices: SpotPrices) -> None:
+        # Ny spotpris, allerede parset én gang i hub-en for alle oppføringer
+        self.stats.spot_refreshes += 1
+        self.async_refresh()
+
+    @callback
+    def _async_on_boundary(self, now: datetime) -> None:
+        """Slot boundary reached: finalize buckets and republish even if the meter is quiet."""
+        ts = now.timestamp()
+        if ts >= self._tariff_until:
+            # ny tariffversjon i katalogen trer i kraft
+            self.tariff = self._compile_tariff(self.entry.options, ts)
+            for update_callback in list(self._options_listeners.values()):
+                update_callback()
+        held_kw = self.cost.last_kw if self.cost.last_ts is not None else None
+        # the new slot starts at the held load, as cost does across the boundary
+        rolled = self.capacity.roll_to(ts, held_kw)
+        price = self._price_at(ts)
+        if held_kw is not None:
+            # close the interval at the boundary (sample-and-hold) so the old price ends here
+            rolled |= self.cost.update_ts(ts, held_kw, price)
+            # ny time/slot: prognosen starter fra effekten som holdes
+            self._project(ts, held_kw)
+        if rolled:
+            self.async_schedule_save()
+        self.long_term.async_add_slot(ts, price, self.cost.total_kr)
+        self.async_refresh()
+
+    def _project(self, ts: float, kw: float) -> None:
+        """Update the peak projection and fire EVENT_PEAK_WARNING when it crosses the threshold."""
+        direction = self.projector.update(self.capacity, self.tariff, ts, kw)
+        if direction is None:
+            return
+        self.stats.peak_warnings += 1
+        self.hass.bus.async_fire(
+            EVENT_PEAK_WARNING,
+            {
+                "entry_id": self.entry.entry_id,
+                "direction": direction,
+                **self.projector.last.as_dict(self.tariff),
+            },
+        )
+
+    def _price_at(self, ts: float) -> float:
+        """Total price valid at ts; prefers the curve, which knows the new slot before the spot sensor updates."""
+        curve = self.data.curve
+        total = curve.total_at(ts) if curve is not None else None
+        if total is not None:
+            return total
+        return self.tariff.total_kr_kwh(self.data.spot_kr_kwh, self.tariff.period_at(ts))
+
+    @callback
+    def _async_publish_throttled(self) -> None:
+        """Publish at most every min_publish_s; a trailing flush publishes the latest sample."""
+        if self._flush_unsub is not None:
+            # a flush is already pending: this sample supersedes the previous one
+            self.samples_coalesced += 1
+            return
+        wait = self._last_publish + self.min_publish_s - time.monotonic()
+        if wait <= 0:
+            self.async_refresh()
+            return
+        self._flush_unsub = async_call_later(self.hass, wait, self._async_flush)
+
+    @callback
+    def _async_flush(self, _now) -> None:
+        self._flush_unsub = None
+        self.async_refresh()
+
+    @callback
+    def async_update_tariff(self, options) -> None:
+        """Swap in freshly compiled tariff parameters and republish."""
+        self.tariff = self._compile_tariff(options)
+        self.async_refresh()
+
+    def _compile_tariff(self, options, ts: float | None = None) -> TariffParams:
+        """Tariff valid at ts (now): the catalog version for the DSO, overridden by entry options.
+
+        Also sets effective_options, the values the number entities show.
+        """
+        if self._catalog is None:
+            self.effective_options = effective_options(options, {})
+            return TariffParams.from_options(self.effective_options, DEFAULT_RULES, dt_util.get_default_time_zone())
+        ts = time.time() if ts is None else ts
+        tariffs = self._catalog.tariffs(options.get(OPT_DSO, DEFAULTS[OPT_DSO]))
+        i = tariffs.index_at(ts)
+        self._tariff_until = tariffs.valid_until(ts)
+        self.effective_options = effective_options(options, tariffs.defaults[i])
+        return TariffParams.from_options(
+            self.effective_options, tariffs.calendars[i], dt_util.get_default_time_zone()
+        )
+
+    @callback
+    def async_set_comparison(self, comparison: Comparison) -> None:
+        """Publish a new contract × DSO ranking to the recommendation sensor."""
+        self.comparison = comparison
+        self.async_refresh()
+
+    @callback
+    def async_refresh(self) -> None:
+        """Recompute the snapshot and push it to all entities."""
+        if self._flush_unsub is not None:
+            # this publish already carries the latest samples
+            self._flush_unsub()
+            self._flush_unsub = None
+        self._last_publish = time.monotonic()
+        self.data = self._compute()
+        for update_callback in list(self._listeners.values()):
+            update_callback()
+
+    def _compute(self) -> PriceSnapshot:
+        tariff = self.tariff
+
+        # Kapasitetslogikk (snitt av topp3 døgnmaks)
+        avg_kw = self.capacity.top3_avg_kw()
+        tier = tariff.tier_index(avg_kw)
+        cap_price_kr_mnd = tariff.tier_prices[tier]
+
+        prices = self.spot_prices()
+        spot = prices.current if prices is not None else 0.0
+        curve = self._price_curve(prices)
+        cheapest_window, cheapest_slots = self._cheapest_for(curve)
+        return PriceSnapshot(
+            spot_kr_kwh=spot,
+            total_variabel_kr_kwh=tariff.total_kr_kwh(spot, tariff.period_at(time.time())),
+            # HER inkluderer vi kapasitetsledd i fast kostnad
+            fast_kost_kr_mnd=tariff.fixed_kr_mnd + cap_price_kr_mnd,
+            top3_avg_kw=avg_kw,
+            tier_label=tariff.tier_labels[tier],
+            margin_kw=max(0.0, tariff.tier_uppers[tier] - avg_kw),
+            cap_price_kr_mnd=cap_price_kr_mnd,
+            curve=curve,
+            cheapest_window=cheapest_window,
+            cheapest_slots=cheapest_slots,
+            cost_day_kr=self.cost.day_kr,
+            cost_month_kr=self.cost.month_kr,
+            energy_day_kwh=self.cost.day_kwh,
+            energy_month_kwh=self.cost.month_kwh,
+            hour_avg_kw=self.capacity.hour_avg_kw(),
+            meter_contributions_kw=self.meters.hour_contributions(time.time()) if self.meters is not None else {},
+            projection=self.projector.last,
+        )
+
+    def spot_prices(self) -> SpotPrices | None:
+        """Parsed spot prices in NOK/kWh; EUR sources are converted once per state and rate.
+
+        Other currencies have no exchange rate option and give None (with a
+        warning) rather than being priced as NOK.
+        """
+        prices = self.spot_hub.get(self.spot_entity)
+        if prices is None or prices.currency == "NOK":
+            return prices
+        if prices.currency != "EUR":
+            if prices.currency != self._rejected_currency:
+                self._rejected_currency = prices.currency
+                _LOGGER.warning(
+                    "%s reports spot prices in %s; only NOK and EUR (converted with the EUR/NOK option) are supported",
+                    self.spot_entity,
+                    prices.currency,
+                )
+            return None
+        key = self._converted_key
+        if key is None or key[0] is not prices or key[1] != self.eur_nok:
+            self._converted = prices.scaled(self.eur_nok, "NOK")
+            self._converted_key = (prices, self.eur_nok)
+        return self._converted
+
+    def _price_curve(self, prices: SpotPrices | None) -> PriceCurve | None:
+        """Total price curve, recomputed only when the spot prices or tariff change."""
+        if prices is None:
+            return None
+        cached = self._curve_key
+        if cached is None or cached[0] is not prices or cached[1] is not self.tariff:
+            tz = dt_util.get_default_time_zone()
+            today = dt_util.now().date()
+            slots = split_slots(prices.slots(), self.resolution_min)
+            self._curve = build_price_curve(slots, self.tariff, tz, today) if slots else None
+            self._curve_key = (prices, self.tariff)
+        return self._curve
+
+    def _cheapest_for(self, curve: PriceCurve | None) -> tuple[CheapestResult | None, CheapestResult | None]:
+        """Cheapest window/slots for the configured hours, recomputed when the curve or current slot moves."""
+        if curve is None:
+            return None, None
+        now_ts = time.time()
+        key = (curve.index_at(now_ts), self.cheap_hours)
+        cached = self._cheapest_key
+        if cached is None or cached[0] is not curve or cached[1:] != key:
+            self._cheapest = (
+                find_cheapest(curve, self.cheap_hours, now_ts, contiguous=True),
+                find_cheapest(curve, self.cheap_hours, now_ts, contiguous=False),
+            )
+            self._cheapest_key = (curve, *key)
+        return self._cheapest
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Optional
+
+METHOD_TRAPEZOIDAL = "trapezoidal"
+METHOD_LEFT = "left"
+
+
+class CostAccumulator:
+    """Integrates power samples into kWh and kr for the current day and month.
+
+    Constant memory: only the previous sample and the running totals are kept.
+    Each interval is priced at the price valid at its start and split at
+    midnight so day and month totals roll over exactly. total_kr never resets
+    (and is not persisted); use it for differences such as the cost of an hour.
+    """
+
+    __slots__ = (
+        "_tz", "method", "last_ts", "last_kw", "last_price",
+        "current_day", "_day_end_ts",
+        "day_kwh", "day_kr", "month_kwh", "month_kr", "total_kr",
+    )
+
+    def __init__(self, tz: tzinfo | None = None, method: str = METHOD_TRAPEZOIDAL) -> None:
+        self._tz = tz or timezone.utc
+        self.method = method
+        self.last_ts: Optional[float] = None
+        self.last_kw = 0.0
+        self.last_price = 0.0
+        self.current_day: Optional[date] = None
+        self._day_end_ts = 0.0
+        self.day_kwh = 0.0
+        self.day_kr = 0.0
+        self.month_kwh = 0.0
+        self.month_kr = 0.0
+        self.total_kr = 0.0
+
+    def update_ts(self, ts: float, kw: float, price_kr_kwh: float) -> bool:
+        """Add a sample (kW) with the total price valid from ts. Returns True on day rollover."""
+        if kw < 0.0:
+            kw = 0.0
+        rolled = False
+        last_ts = self.last_ts
+        if self.current_day is None:
+            self._set_day(datetime.fromtimestamp(ts, self._tz).date())
+        elif last_ts is not None and ts > last_ts:
+            while ts >= self._day_end_ts:
+                # split the interval at midnight
+                boundary = self._day_end_ts
+                boundary_kw = self.last_kw + (kw - self.last_kw) * (boundary - last_ts) / (ts - last_ts)
+                self._add(last_ts, boundary, boundary_kw)
+                self._roll_day()
+                last_ts = boundary
+                if self.method != METHOD_LEFT:
+                    self.last_kw = boundary_kw
+                rolled = True
+            self._add(last_ts, ts, kw)
+        elif ts >= self._day_end_ts:
+            self._roll_day(datetime.fromtimestamp(ts, self._tz).date())
+            rolled = True
+
+        self.last_ts = ts
+        self.last_kw = kw
+        self.last_price = price_kr_kwh
+        return rolled
+
+    def _add(self, t0: float, t1: float, kw1: float) -> None:
+        hours = (t1 - t0) / 3600.0
+        if self.method == METHOD_LEFT:
+            kwh = self.last_kw * hours
+        else:
+            kwh = (self.last_kw + kw1) * 0.5 * hours
+        kr = kwh * self.last_price
+        self.day_kwh += kwh
+        self.day_kr += kr
+        self.month_kwh += kwh
+        self.month_kr += kr
+        self.total_kr += kr
+
+    def _set_day(self, day: date) -> None:
+        self.current_day = day
+        self._day_end_ts = datetime.combine(day + timedelta(days=1), time(), self._tz).timestamp()
+
+    def _roll_day(self, day: date | None = None) -> None:
+        prev = self.current_day
+        day = day or prev + timedelta(days=1)
+        if (day.year, day.month) != (prev.year, prev.month):
+            self.month_kwh = 0.0
+            self.month_kr = 0.0
+        self.day_kwh = 0.0
+        self.day_kr = 0.0
+        self._set_day(day)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Compact JSON-serializable state for Store."""
+        return {
+            "day": self.current_day.isoformat() if self.current_day else None,
+            "day_kwh": self.day_kwh,
+            "day_kr": self.day_kr,
+            "month_kwh": self.month_kwh,
+            "month_kr": self.month_kr,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        """Load totals from as_dict(). The next sample starts a new interval (no integration over downtime)."""
+        self.__init__(self._tz, self.method)
+        day = data.get("day")
+        if not day:
+            return
+        self._set_day(date.fromisoformat(day))
+        self.day_kwh = float(data.get("day_kwh") or 0.0)
+        self.day_kr = float(data.get("day_kr") or 0.0)
+        self.month_kwh = float(data.get("month_kwh") or 0.0)
+        self.month_kr = float(data.get("month_kr") or 0.0)
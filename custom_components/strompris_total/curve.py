@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, tzinfo
+from types import MappingProxyType
+from typing import Any
+
+from .pricing import TariffParams
+
+
+@dataclass(frozen=True, slots=True)
+class PriceCurve:
+    """Total kr/kWh per spot slot for today + tomorrow, computed in one pass."""
+
+    starts: tuple[float, ...]  # slot start, POSIX timestamp
+    ends: tuple[float, ...]
+    spot: tuple[float, ...]
+    total: tuple[float, ...]
+    today_avg: float | None
+    attributes: Mapping[str, Any]
+
+    def index_at(self, ts: float) -> int | None:
+        """Index of the slot containing ts, if the curve covers it."""
+        i = bisect_right(self.starts, ts) - 1
+        if i >= 0 and ts < self.ends[i]:
+            return i
+        return None
+
+    def total_at(self, ts: float) -> float | None:
+        """Total price for the slot containing ts, if the curve covers it."""
+        i = self.index_at(ts)
+        return self.total[i] if i is not None else None
+
+    @property
+    def slot_seconds(self) -> float:
+        return self.ends[0] - self.starts[0] if self.starts else 3600.0
+
+
+def split_slots(slots: Iterable[tuple[float, float, float]], resolution_min: int) -> list[tuple[float, float, float]]:
+    """Split longer slots (e.g. hourly spot prices) into resolution_min slots with the same price."""
+    step = resolution_min * 60.0
+    out: list[tuple[float, float, float]] = []
+    for start, end, value in slots:
+        while end - start > step:
+            out.append((start, start + step, value))
+            start += step
+        out.append((start, end, value))
+    return out
+
+
+def build_price_curve(
+    slots: list[tuple[float, float, float]], tariff: TariffParams, tz: tzinfo, today: date
+) -> PriceCurve:
+    vat = tariff.vat_factor
+    adders = tariff.adders_kr
+    period_at = tariff.calendar.period_at
+
+    starts: list[float] = []
+    ends: list[float] = []
+    spot: list[float] = []
+    total: list[float] = []
+    raw_today: list[dict[str, Any]] = []
+    raw_tomorrow: list[dict[str, Any]] = []
+    today_sum = 0.0
+    for start_ts, end_ts, value in slots:
+        start = datetime.fromtimestamp(start_ts, tz)
+        price = value * vat + adders[period_at(start_ts)]
+        starts.append(start_ts)
+        ends.append(end_ts)
+        spot.append(value)
+        total.append(price)
+        item = {
+            "start": start.isoformat(),
+            "end": datetime.fromtimestamp(end_ts, tz).isoformat(),
+            "value": round(price, 4),
+        }
+        if start.date() == today:
+            raw_today.append(item)
+            today_sum += price
+        elif start.date() > today:
+            raw_tomorrow.append(item)
+
+    today_avg = today_sum / len(raw_today) if raw_today else None
+    return PriceCurve(
+        starts=tuple(starts),
+        ends=tuple(ends),
+        spot=tuple(spot),
+        total=tuple(total),
+        today_avg=today_avg,
+        attributes=MappingProxyType({
+            "today": [i["value"] for i in raw_today],
+            "tomorrow": [i["value"] for i in raw_tomorrow],
+            "raw_today": raw_today,
+            "raw_tomorrow": raw_tomorrow,
+        }),
+    )
@@ -0,0 +1,63 @@
+"""Diagnostics download: configuration, runtime counters and hot-path latency."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import StromprisCoordinator
+from .perf import get_domain_stats
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    domain_stats = get_domain_stats(hass)
+    stats = domain_stats.entry(entry.entry_id)
+    runtime = hass.data.get(DOMAIN, {}).get(entry.entry_id) or {}
+    coordinator: StromprisCoordinator | None = runtime.get("coordinator")
+
+    data: dict[str, Any] = {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "counters": {
+            "state_writes": stats.state_writes,
+            "writes_skipped": stats.writes_skipped,
+            "spot_refreshes": stats.spot_refreshes,
+            "peak_warnings": stats.peak_warnings,
+            "reloads": stats.reloads,
+            "catalog_loads": domain_stats.catalog_loads,
+        },
+        "latency": {
+            "event_handler": stats.event_handler.as_dict(),
+            "native_value": stats.native_value.as_dict(),
+        },
+    }
+    if coordinator is not None:
+        capacity = coordinator.capacity
+        data["counters"]["samples_ingested"] = coordinator.samples_ingested
+        data["counters"]["samples_coalesced"] = coordinator.samples_coalesced
+        data["capacity"] = {
+            "memory_bytes": capacity.footprint_bytes(),
+            "resolution_min": capacity.resolution_min,
+            "top3_avg_kw": capacity.top3_avg_kw(),
+        }
+        projection = coordinator.projector.last
+        data["projection"] = projection.as_dict(coordinator.tariff) if projection is not None else None
+        if coordinator.meters is not None:
+            data["meters"] = coordinator.meters.as_dict()
+        data["long_term_statistics"] = {
+            "statistic_ids": [coordinator.long_term.price_id, coordinator.long_term.cost_id],
+            "pending_hours": len(coordinator.long_term.accumulator.pending),
+            "flushes": coordinator.long_term.flushes,
+        }
+        # unconverted, so an unsupported currency shows up here
+        prices = coordinator.spot_hub.get(coordinator.spot_entity)
+        data["spot_hub"] = {
+            "sources": coordinator.spot_hub.source_count,
+            "parses": coordinator.spot_hub.parses,
+            "adapter": prices.source if prices is not None else None,
+            "currency": prices.currency if prices is not None else None,
+            "unit_factor": prices.unit_factor if prices is not None else None,
+            "slots": len(prices.starts) if prices is not None else 0,
+        }
+    return data
@@ -7,6 +7,8 @@ from .const import DOMAIN, CONF_NAME
 
 class StromprisBaseEntity(Entity):
     _attr_has_entity_name = True
+    # State is pushed by the coordinator (events + boundary timer)
+    _attr_should_poll = False
 
     def __init__(self, entry: ConfigEntry) -> None:
         self.entry = entry
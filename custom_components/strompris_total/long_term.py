@@ -0,0 +1,153 @@
+"""Hourly price and cost as recorder long-term statistics.
+
+Per-event sensor states are what grows the recorder database. The hourly
+series that dashboards actually use are built here from the slot boundaries
+the coordinator already handles, and written as external statistics: one
+batch per closed hour instead of a state row per power sample.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Timer som holdes igjen hvis recorder ikke er tilgjengelig
+MAX_PENDING_HOURS = 48
+
+
+@dataclass(frozen=True, slots=True)
+class HourRow:
+    start: float  # timestart (epoch)
+    price_mean: float
+    price_min: float
+    price_max: float
+    cost_kr: float
+
+
+class HourlyAccumulator:
+    """Collects slot prices and the running cost total into closed hours."""
+
+    __slots__ = ("hour", "_n", "_sum", "_min", "_max", "_cost_start", "pending")
+
+    def __init__(self) -> None:
+        self.hour: int | None = None
+        self._n = 0
+        self._sum = 0.0
+        self._min = 0.0
+        self._max = 0.0
+        self._cost_start = 0.0
+        self.pending: list[HourRow] = []
+
+    def add_slot(self, ts: float, price: float, cost_total_kr: float) -> bool:
+        """Price of the slot starting at ts and the cost so far; True when an hour was closed."""
+        hour = int(ts // 3600)
+        closed = False
+        if hour != self.hour:
+            if self.hour is not None and self._n:
+                self.pending.append(HourRow(
+                    self.hour * 3600.0, self._sum / self._n, self._min, self._max, cost_total_kr - self._cost_start
+                ))
+                del self.pending[:-MAX_PENDING_HOURS]
+                closed = True
+            self.hour = hour
+            self._n = 0
+            self._sum = 0.0
+            self._min = self._max = price
+            self._cost_start = cost_total_kr
+        self._n += 1
+        self._sum += price
+        if price < self._min:
+            self._min = price
+        elif price > self._max:
+            self._max = price
+        return closed
+
+
+class LongTermStatistics:
+    """Writes closed hours of one entry as external statistics (price mean/min/max, cost sum)."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, title: str) -> None:
+        self.hass = hass
+        self.accumulator = HourlyAccumulator()
+        object_id = entry_id.lower()
+        self.price_id = f"{DOMAIN}:{object_id}_pris_kr_kwh"
+        self.cost_id = f"{DOMAIN}:{object_id}_kostnad_kr"
+        self._price_meta = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=f"{title} totalpris",
+            source=DOMAIN,
+            statistic_id=self.price_id,
+            unit_of_measurement="NOK/kWh",
+        )
+        self._cost_meta = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"{title} kostnad",
+            source=DOMAIN,
+            statistic_id=self.cost_id,
+            unit_of_measurement="NOK",
+        )
+        self._cost_sum: float | None = None
+        self._last_start = float("-inf")
+        self._flushing = False
+        self.flushes = 0
+
+    @callback
+    def async_add_slot(self, ts: float, price: float, cost_total_kr: float) -> None:
+        if not self.accumulator.add_slot(ts, price, cost_total_kr) or self._flushing:
+            return
+        if "recorder" not in self.hass.config.components:
+            return
+        self._flushing = True
+        self.hass.async_create_background_task(self._async_flush(), f"{DOMAIN} long-term statistics")
+
+    async def _async_flush(self) -> None:
+        try:
+            if self._cost_sum is None:
+                await self._async_load_last_sum()
+            pending, self.accumulator.pending = self.accumulator.pending, []
+            # timer som allerede er skrevet (f.eks. før en omstart) hoppes over, ellers dobles summen
+            pending = [row for row in pending if row.start > self._last_start]
+            if not pending:
+                return
+            price_rows: list[StatisticData] = []
+            cost_rows: list[StatisticData] = []
+            cost_sum = self._cost_sum or 0.0
+            for row in pending:
+                start = dt_util.utc_from_timestamp(row.start)
+                price_rows.append(
+                    StatisticData(start=start, mean=row.price_mean, min=row.price_min, max=row.price_max)
+                )
+                cost_sum += row.cost_kr
+                cost_rows.append(StatisticData(start=start, state=row.cost_kr, sum=cost_sum))
+            async_add_external_statistics(self.hass, self._price_meta, price_rows)
+            async_add_external_statistics(self.hass, self._cost_meta, cost_rows)
+            self._cost_sum = cost_sum
+            self._last_start = pending[-1].start
+            self.flushes += 1
+            _LOGGER.debug("Wrote %s hours of long-term statistics for %s", len(pending), self.cost_id)
+        finally:
+            self._flushing = False
+
+    async def _async_load_last_sum(self) -> None:
+        last = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, self.cost_id, True, {"sum"}
+        )
+        rows = last.get(self.cost_id)
+        if not rows:
+            self._cost_sum = 0.0
+            return
+        self._cost_sum = float(rows[0].get("sum") or 0.0)
+        start = rows[0]["start"]
+        self._last_start = start.timestamp() if isinstance(start, datetime) else float(start)
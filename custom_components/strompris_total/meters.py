@@ -0,0 +1,70 @@
+"""Merge several power meters into the one stream the DSO bills capacity on.
+
+Each meter holds its last value until it reports again (last-value-hold), so
+every event from any meter yields one aggregate sample: the sum of the held
+values. The sum and the per-meter sums for the current hour are advanced in
+one O(k) loop per event, so each meter's share of the hour's sample average
+is always at hand.
+"""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+
+class MeterMerger:
+    """Last-value-hold sum of k power meters (kW) with per-meter hour contributions."""
+
+    __slots__ = ("entity_ids", "_index", "_kw", "total_kw", "hour_key", "_hour_sums", "_hour_n")
+
+    def __init__(self, entity_ids: Sequence[str]) -> None:
+        self.entity_ids = tuple(entity_ids)
+        self._index = {entity_id: i for i, entity_id in enumerate(self.entity_ids)}
+        self._kw = [0.0] * len(self.entity_ids)
+        self.total_kw = 0.0
+        self.hour_key = -1
+        self._hour_sums = [0.0] * len(self.entity_ids)
+        self._hour_n = 0
+
+    def hold(self, entity_id: str, kw: float) -> None:
+        """Set a meter's held value without taking a sample (e.g. from its state at startup)."""
+        i = self._index.get(entity_id)
+        if i is not None:
+            self._kw[i] = kw
+            self.total_kw = sum(self._kw)
+
+    def update(self, entity_id: str, ts: float, kw: float) -> float:
+        """New reading from one meter; returns the aggregate kW valid from ts."""
+        i = self._index.get(entity_id)
+        if i is not None:
+            self._kw[i] = kw
+        key = int(ts // 3600)
+        if key != self.hour_key:
+            self.hour_key = key
+            self._hour_sums = [0.0] * len(self._kw)
+            self._hour_n = 0
+        # én løkke over k målere: summen (uten avrundingsdrift) og timebidragene
+        sums = self._hour_sums
+        total = 0.0
+        for j, value in enumerate(self._kw):
+            sums[j] += value
+            total += value
+        self._hour_n += 1
+        self.total_kw = total
+        return total
+
+    def current_kw(self) -> dict[str, float]:
+        return dict(zip(self.entity_ids, self._kw))
+
+    def hour_contributions(self, ts: float | None = None) -> dict[str, float]:
+        """Each meter's share (kW) of the current hour's sample average; the shares add up to it.
+
+        Empty if no sample has arrived in the hour containing ts (default: the last sample's hour).
+        """
+        if not self._hour_n or (ts is not None and int(ts // 3600) != self.hour_key):
+            return {}
+        n = self._hour_n
+        return {entity_id: s / n for entity_id, s in zip(self.entity_ids, self._hour_sums)}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"kw": self.current_kw(), "hour_contributions_kw": self.hour_contributions()}
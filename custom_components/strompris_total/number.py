@@ -9,17 +9,28 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
+    DOMAIN,
     DEFAULTS,
     OPT_PAASLAG_ORE,
     OPT_STROM_FAST_KR,
+    OPT_NORGESPRIS_ORE,
+    OPT_FASTPRIS_ORE,
+    OPT_VARIABEL_PAASLAG_ORE,
     OPT_NETT_DAG_ORE,
     OPT_NETT_NATT_ORE,
+    OPT_NETT_DAG_SOMMER_ORE,
+    OPT_NETT_NATT_SOMMER_ORE,
     OPT_NETT_FAST_KR,
     OPT_ELAVGIFT_ORE,
     OPT_ENOVA_ORE,
     OPT_MVA_PROSENT,
+    OPT_BILLIG_TIMER,
+    OPT_EUR_NOK,
+    OPT_VARSEL_KW,
+    OPT_MIN_PUBLISH_S,
     OPT_KAP_T1_KR, OPT_KAP_T2_KR, OPT_KAP_T3_KR, OPT_KAP_T4_KR, OPT_KAP_T5_KR, OPT_KAP_T6_KR, OPT_KAP_T7_KR,
 )
+from .coordinator import StromprisCoordinator
 from .entity import StromprisBaseEntity
 
 @dataclass(frozen=True, kw_only=True)
@@ -46,6 +57,33 @@ NUMBERS: list[StromprisNumberDescription] = [
         native_max_value=2000,
         native_step=1,
     ),
+    StromprisNumberDescription(
+        key="norgespris_ore_kwh",
+        name="Norgespris",
+        option_key=OPT_NORGESPRIS_ORE,
+        native_unit_of_measurement="øre/kWh",
+        native_min_value=0,
+        native_max_value=500,
+        native_step=0.1,
+    ),
+    StromprisNumberDescription(
+        key="fastpris_ore_kwh",
+        name="Fastpris",
+        option_key=OPT_FASTPRIS_ORE,
+        native_unit_of_measurement="øre/kWh",
+        native_min_value=0,
+        native_max_value=500,
+        native_step=0.1,
+    ),
+    StromprisNumberDescription(
+        key="variabel_paaslag_ore_kwh",
+        name="Variabel pris påslag",
+        option_key=OPT_VARIABEL_PAASLAG_ORE,
+        native_unit_of_measurement="øre/kWh",
+        native_min_value=0,
+        native_max_value=200,
+        native_step=0.1,
+    ),
     StromprisNumberDescription(
         key="nett_energiledd_dag_ore_kwh",
         name="Nettleie energiledd dag",
@@ -64,6 +102,24 @@ NUMBERS: list[StromprisNumberDescription] = [
         native_max_value=300,
         native_step=0.01,
     ),
+    StromprisNumberDescription(
+        key="nett_energiledd_dag_sommer_ore_kwh",
+        name="Nettleie energiledd dag sommer",
+        option_key=OPT_NETT_DAG_SOMMER_ORE,
+        native_unit_of_measurement="øre/kWh",
+        native_min_value=0,
+        native_max_value=300,
+        native_step=0.01,
+    ),
+    StromprisNumberDescription(
+        key="nett_energiledd_natt_sommer_ore_kwh",
+        name="Nettleie energiledd natt sommer",
+        option_key=OPT_NETT_NATT_SOMMER_ORE,
+        native_unit_of_measurement="øre/kWh",
+        native_min_value=0,
+        native_max_value=300,
+        native_step=0.01,
+    ),
     StromprisNumberDescription(
         key="nett_fastledd_kr_mnd",
         name="Nettleie fastledd",
@@ -163,6 +219,42 @@ NUMBERS: list[StromprisNumberDescription] = [
         native_max_value=10000,
         native_step=1,
     ),
+    StromprisNumberDescription(
+        key="valutakurs_eur_nok",
+        name="Valutakurs EUR/NOK",
+        option_key=OPT_EUR_NOK,
+        native_unit_of_measurement="NOK/EUR",
+        native_min_value=5,
+        native_max_value=20,
+        native_step=0.01,
+    ),
+    StromprisNumberDescription(
+        key="effektvarsel_kw",
+        name="Effektvarsel terskel",
+        option_key=OPT_VARSEL_KW,
+        native_unit_of_measurement="kW",
+        native_min_value=0,
+        native_max_value=50,
+        native_step=0.1,
+    ),
+    StromprisNumberDescription(
+        key="billig_timer",
+        name="Billigste timer antall",
+        option_key=OPT_BILLIG_TIMER,
+        native_unit_of_measurement="h",
+        native_min_value=1,
+        native_max_value=24,
+        native_step=1,
+    ),
+    StromprisNumberDescription(
+        key="min_publish_s",
+        name="Minste oppdateringsintervall",
+        option_key=OPT_MIN_PUBLISH_S,
+        native_unit_of_measurement="s",
+        native_min_value=0,
+        native_max_value=300,
+        native_step=1,
+    ),
 ]
 
 async def async_setup_entry(
@@ -181,14 +273,19 @@ class StromprisNumberEntity(StromprisBaseEntity, NumberEntity):
         self.hass = hass
         self.entity_description = description
         self._attr_unique_id = f"{entry.entry_id}_{description.key}"
-        self._attr_native_value = float(entry.options.get(description.option_key, DEFAULTS[description.option_key]))
+        self.coordinator: StromprisCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self.coordinator.async_add_options_listener(self.async_write_ha_state))
 
     @property
     def native_value(self) -> float | None:
-        return float(self.entry.options.get(self.entity_description.option_key, self._attr_native_value or 0))
+        # egen overstyring, ellers katalogsatsen som gjelder nå, ellers DEFAULTS
+        key = self.entity_description.option_key
+        return float(self.coordinator.effective_options.get(key, DEFAULTS[key]))
 
     async def async_set_native_value(self, value: float) -> None:
         options = dict(self.entry.options)
         options[self.entity_description.option_key] = float(value)
+        # Update listener hot-applies the change and refreshes all entities (no reload)
         self.hass.config_entries.async_update_entry(self.entry, options=options)
-        self.async_write_ha_state()
@@ -0,0 +1,101 @@
+"""Cheap always-on runtime counters and latency histograms.
+
+Timings use time.perf_counter_ns (monotonic) and go into fixed buckets, so
+recording is a bisect over a dozen ints and an increment; nothing grows with
+uptime. Stats live in hass.data[DOMAIN] per entry_id and survive reloads, so
+the reload counter is meaningful.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any
+
+from .const import DOMAIN, PERF_STATS
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+# Øvre grenser (mikrosekunder); siste bøtte er alt over 10 ms
+BUCKETS_US = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_BUCKETS_NS = tuple(b * 1000 for b in BUCKETS_US)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "n", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BUCKETS_NS) + 1)
+        self.n = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        self.counts[bisect_left(_BUCKETS_NS, ns)] += 1
+        self.n += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def quantile_us(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)."""
+        if not self.n:
+            return None
+        target = q * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return float(BUCKETS_US[i]) if i < len(BUCKETS_US) else self.max_ns / 1000.0
+        return self.max_ns / 1000.0
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={b}us" for b in BUCKETS_US] + [f">{BUCKETS_US[-1]}us"]
+        return {
+            "count": self.n,
+            "mean_us": round(self.total_ns / self.n / 1000.0, 2) if self.n else None,
+            "p50_us": self.quantile_us(0.5),
+            "p99_us": self.quantile_us(0.99),
+            "max_us": round(self.max_ns / 1000.0, 2),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class EntryStats:
+    """Counters for one config entry."""
+
+    __slots__ = ("setups", "state_writes", "writes_skipped", "spot_refreshes", "peak_warnings", "event_handler", "native_value")
+
+    def __init__(self) -> None:
+        self.setups = 0
+        self.state_writes = 0
+        self.writes_skipped = 0  # unchanged value and attributes
+        self.spot_refreshes = 0
+        self.peak_warnings = 0  # fired EVENT_PEAK_WARNING (both directions)
+        self.event_handler = LatencyHistogram()
+        self.native_value = LatencyHistogram()
+
+    @property
+    def reloads(self) -> int:
+        return max(0, self.setups - 1)
+
+
+class DomainStats:
+    __slots__ = ("catalog_loads", "entries")
+
+    def __init__(self) -> None:
+        self.catalog_loads = 0
+        self.entries: dict[str, EntryStats] = {}
+
+    def entry(self, entry_id: str) -> EntryStats:
+        stats = self.entries.get(entry_id)
+        if stats is None:
+            stats = self.entries[entry_id] = EntryStats()
+        return stats
+
+
+def get_domain_stats(hass: HomeAssistant) -> DomainStats:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    stats = domain_data.get(PERF_STATS)
+    if stats is None:
+        stats = domain_data[PERF_STATS] = DomainStats()
+    return stats
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import tzinfo
+from types import MappingProxyType
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from .const import (
+    CAPACITY_TIERS,
+    DEFAULTS,
+    OPT_ELAVGIFT_ORE,
+    OPT_ENOVA_ORE,
+    OPT_FASTPRIS_ORE,
+    OPT_MVA_PROSENT,
+    OPT_NETT_DAG_ORE,
+    OPT_NETT_DAG_SOMMER_ORE,
+    OPT_NETT_FAST_KR,
+    OPT_NETT_NATT_ORE,
+    OPT_NETT_NATT_SOMMER_ORE,
+    OPT_NORGESPRIS_ORE,
+    OPT_PAASLAG_ORE,
+    OPT_STROM_FAST_KR,
+    OPT_VARIABEL_PAASLAG_ORE,
+)
+from .tariff_calendar import DEFAULT_RULES, PERIOD_DAY, PERIOD_SUMMER, PERIODS, CalendarLookup, CalendarRules
+
+NORWAY_TZ = ZoneInfo("Europe/Oslo")
+
+
+@dataclass(frozen=True, slots=True)
+class TariffParams:
+    """Pricing parameters compiled once from entry.options + DEFAULTS.
+
+    The adders are in kr and already include VAT, so the total price for a spot
+    price is ``spot * vat_factor + adders_kr[period]``, where the period code
+    comes from the DSO's compiled tariff calendar. The per-component rates
+    (eks. mva) are kept for cost breakdowns.
+    """
+
+    vat_factor: float
+    paaslag_kr: float  # eks. mva
+    grid_kr: tuple[float, ...]  # nett energiledd per periodekode, eks. mva
+    avgift_kr: float  # elavgift + enova, eks. mva
+    norgespris_kr: float  # eks. mva
+    fastpris_kr: float  # eks. mva
+    variabel_paaslag_kr: float  # over månedssnitt spot, eks. mva
+    adders_kr: tuple[float, ...]  # (påslag + nett + elavgift + enova) per periodekode, inkl. mva
+    calendar: CalendarLookup
+    fixed_kr_mnd: float  # strøm fastbeløp + nett fastledd
+    tier_uppers: tuple[float, ...]
+    tier_labels: tuple[str, ...]
+    tier_prices: tuple[float, ...]
+    attributes: Mapping[str, Any]
+
+    @classmethod
+    def from_options(
+        cls,
+        options: Mapping[str, Any],
+        rules: CalendarRules = DEFAULT_RULES,
+        tz: tzinfo = NORWAY_TZ,
+    ) -> TariffParams:
+        opts = dict(DEFAULTS)
+        opts.update(options)
+
+        vat_factor = 1.0 + float(opts[OPT_MVA_PROSENT]) / 100.0
+        common_ore = float(opts[OPT_PAASLAG_ORE]) + float(opts[OPT_ELAVGIFT_ORE]) + float(opts[OPT_ENOVA_ORE])
+        grid_ore = [0.0] * PERIODS
+        for code in range(PERIODS):
+            summer = code & PERIOD_SUMMER
+            if code & PERIOD_DAY:
+                grid_ore[code] = float(opts[OPT_NETT_DAG_SOMMER_ORE if summer else OPT_NETT_DAG_ORE])
+            else:
+                grid_ore[code] = float(opts[OPT_NETT_NATT_SOMMER_ORE if summer else OPT_NETT_NATT_ORE])
+        return cls(
+            vat_factor=vat_factor,
+            paaslag_kr=float(opts[OPT_PAASLAG_ORE]) / 100.0,
+            grid_kr=tuple(g / 100.0 for g in grid_ore),
+            avgift_kr=(float(opts[OPT_ELAVGIFT_ORE]) + float(opts[OPT_ENOVA_ORE])) / 100.0,
+            norgespris_kr=float(opts[OPT_NORGESPRIS_ORE]) / 100.0,
+            fastpris_kr=float(opts[OPT_FASTPRIS_ORE]) / 100.0,
+            variabel_paaslag_kr=float(opts[OPT_VARIABEL_PAASLAG_ORE]) / 100.0,
+            adders_kr=tuple((common_ore + g) / 100.0 * vat_factor for g in grid_ore),
+            calendar=CalendarLookup(rules, tz),
+            fixed_kr_mnd=float(opts[OPT_STROM_FAST_KR]) + float(opts[OPT_NETT_FAST_KR]),
+            tier_uppers=tuple(float(upper) for upper, _, _ in CAPACITY_TIERS),
+            tier_labels=tuple(label for _, label, _ in CAPACITY_TIERS),
+            tier_prices=tuple(float(opts.get(key, 0.0)) for _, _, key in CAPACITY_TIERS),
+            attributes=MappingProxyType({
+                "paaslag_ore_kwh": opts[OPT_PAASLAG_ORE],
+                "nett_dag_ore_kwh": opts[OPT_NETT_DAG_ORE],
+                "nett_natt_ore_kwh": opts[OPT_NETT_NATT_ORE],
+                "elavgift_ore_kwh": opts[OPT_ELAVGIFT_ORE],
+                "enova_ore_kwh": opts[OPT_ENOVA_ORE],
+                "mva_prosent": opts[OPT_MVA_PROSENT],
+            }),
+        )
+
+    def period_at(self, ts: float) -> int:
+        return self.calendar.period_at(ts)
+
+    def total_kr_kwh(self, spot_kr_kwh: float, period: int) -> float:
+        return spot_kr_kwh * self.vat_factor + self.adders_kr[period]
+
+    def tier_index(self, avg_kw: float) -> int:
+        """Index of the first tier whose upper bound is above avg_kw."""
+        return min(bisect_right(self.tier_uppers, avg_kw), len(self.tier_uppers) - 1)
@@ -0,0 +1,139 @@
+"""Real-time projection of the hour's capacity peak and early warning before a tier change.
+
+The live hour is projected to its end by assuming the current load holds for
+the rest of it: avg_so_far * f + current_kw * (1 - f), where f is the elapsed
+fraction of the hour. The highest døgnmaks today can reach without moving the
+month's top-3 average into the next CAPACITY_TIERS step has a closed form in
+the finalized top 3 (see CapacityCalculator.today_limit_kw), so each sample
+costs O(1) and no history is replayed.
+
+Early in the hour the projection is close to the instantaneous load, so a
+crossing only counts after GRACE_S into the hour and once it has held for
+DWELL_S, and "down" needs the projection HYSTERESIS below the threshold. A
+kettle or a charger ramp then does not toggle automations on every sample.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from .capacity import CapacityCalculator
+from .pricing import TariffParams
+
+DIRECTION_UP = "up"
+DIRECTION_DOWN = "down"
+
+GRACE_S = 300.0  # ingen varsler de første minuttene av timen
+DWELL_S = 120.0  # kryssingen må vare så lenge før hendelsen sendes
+HYSTERESIS = 0.05  # "down" først når prognosen er 5 % under terskelen
+
+
+@dataclass(frozen=True, slots=True)
+class PeakProjection:
+    hour_kw: float              # projected average for the live hour (kW = kWh for the hour)
+    top3_kw: float              # top-3 average if the hour ends at hour_kw
+    tier: int                   # tier index from the finalized hours' top-3
+    projected_tier: int         # tier index from top3_kw
+    limit_kw: float | None      # highest hour average that keeps the current tier (None in the top tier)
+    budget_kwh: float | None    # kWh left this hour before the tier changes
+    threshold_kw: float | None  # hour average that triggers the warning
+    above: bool
+
+    def as_dict(self, tariff: TariffParams) -> dict[str, Any]:
+        return {
+            "projected_hour_kw": round(self.hour_kw, 3),
+            "projected_top3_kw": round(self.top3_kw, 3),
+            "tier": tariff.tier_labels[self.tier],
+            "projected_tier": tariff.tier_labels[self.projected_tier],
+            "limit_kw": round(self.limit_kw, 3) if self.limit_kw is not None else None,
+            "budget_kwh": round(self.budget_kwh, 3) if self.budget_kwh is not None else None,
+            "threshold_kw": round(self.threshold_kw, 3) if self.threshold_kw is not None else None,
+            "above": self.above,
+        }
+
+
+class PeakProjector:
+    """Projects the live hour on every sample and reports threshold crossings.
+
+    threshold_kw > 0 is a fixed warning level for the projected hour average;
+    0 warns at the tier boundary (limit_kw). The tier and limit only change
+    when an hour is finalized, so they are cached per hour and tariff and a
+    sample costs a few float operations.
+    """
+
+    __slots__ = ("threshold_kw", "_above", "_since", "_key", "_tier", "_limit_kw", "_state", "_last")
+
+    def __init__(self, threshold_kw: float = 0.0) -> None:
+        self.threshold_kw = threshold_kw
+        self._above = False
+        self._since: float | None = None  # start of a crossing not yet reported
+        self._key: tuple[int, float, TariffParams] | None = None
+        self._tier = 0
+        self._limit_kw: float | None = None
+        # (capacity, tariff, hour_kw, energy_kwh) fra siste update(); PeakProjection bygges ved behov
+        self._state: tuple[CapacityCalculator, TariffParams, float, float] | None = None
+        self._last: PeakProjection | None = None
+
+    @property
+    def last(self) -> PeakProjection | None:
+        """Projection from the latest update()."""
+        if self._last is None and self._state is not None:
+            capacity, tariff, hour_kw, energy_kwh = self._state
+            top3_kw = capacity.projected_top3_avg_kw(hour_kw)
+            limit_kw = self._limit_kw
+            budget_kwh = None if limit_kw is None else max(0.0, limit_kw - energy_kwh)
+            threshold_kw = self._threshold(limit_kw)
+            self._last = PeakProjection(
+                hour_kw, top3_kw, self._tier, tariff.tier_index(top3_kw),
+                limit_kw, budget_kwh, threshold_kw, self._above,
+            )
+        return self._last
+
+    def update(self, capacity: CapacityCalculator, tariff: TariffParams, ts: float, kw: float) -> str | None:
+        """Project with the current load kw at ts; returns DIRECTION_UP/DOWN when a crossing has held for DWELL_S."""
+        kw = kw if kw > 0.0 else 0.0
+        hour_key = capacity.hour_key
+        if hour_key < 0:
+            hour_kw = kw
+            energy_kwh = 0.0
+        else:
+            elapsed = (ts - hour_key * 3600) / 3600.0
+            elapsed = 0.0 if elapsed < 0.0 else 1.0 if elapsed > 1.0 else elapsed
+            energy_kwh = capacity.hour_avg_kw() * elapsed
+            hour_kw = energy_kwh + kw * (1.0 - elapsed)
+
+        key = self._key
+        if key is None or key[0] != hour_key or key[1] != capacity.day_max_kw or key[2] is not tariff:
+            self._rebase(capacity, tariff)
+
+        self._state = (capacity, tariff, hour_kw, energy_kwh)
+        self._last = None
+        threshold_kw = self._threshold(self._limit_kw)
+        if self._above:
+            crossed = threshold_kw is None or hour_kw < threshold_kw * (1.0 - HYSTERESIS)
+        else:
+            crossed = threshold_kw is not None and hour_kw >= threshold_kw
+        if not crossed or hour_key < 0 or ts - hour_key * 3600 < GRACE_S:
+            self._since = None
+            return None
+        if self._since is None:
+            self._since = ts
+        if ts - self._since < DWELL_S:
+            return None
+        self._since = None
+        self._above = not self._above
+        return DIRECTION_UP if self._above else DIRECTION_DOWN
+
+    def _rebase(self, capacity: CapacityCalculator, tariff: TariffParams) -> None:
+        """Tier and limit from the finalized hours (new hour, new døgnmaks or new tariff)."""
+        self._key = (capacity.hour_key, capacity.day_max_kw, tariff)
+        # trinnet før denne timen, ellers flytter grensen seg mens timen pågår
+        tier = tariff.tier_index(capacity.projected_top3_avg_kw(0.0))
+        self._tier = tier
+        if tier < len(tariff.tier_uppers) - 1:
+            self._limit_kw = capacity.today_limit_kw(tariff.tier_uppers[tier])
+        else:
+            self._limit_kw = None
+
+    def _threshold(self, limit_kw: float | None) -> float | None:
+        return self.threshold_kw if self.threshold_kw > 0.0 else limit_kw
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+
+def next_boundary(now: datetime, resolution_min: int = 60) -> datetime:
+    """Next settlement-slot start after now (local time).
+
+    Hour, tariff-period (06/22), day and month boundaries all fall on slot
+    starts, so one timer at this instant covers every rollover.
+    """
+    start = now.replace(minute=now.minute - now.minute % resolution_min, second=0, microsecond=0)
+    # add in UTC so DST transitions don't produce a non-existent local time
+    return dt_util.as_local(dt_util.as_utc(start) + timedelta(minutes=resolution_min))
+
+
+class BoundaryScheduler:
+    """Keeps exactly one point-in-time timer armed for the next boundary."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        action: Callable[[datetime], None],
+        resolution_min: int = 60,
+    ) -> None:
+        self.hass = hass
+        self.action = action
+        self.resolution_min = resolution_min
+        self.next_fire: datetime | None = None
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> None:
+        self._async_arm(dt_util.now())
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self.next_fire = None
+
+    @callback
+    def _async_arm(self, now: datetime) -> None:
+        self.next_fire = next_boundary(now, self.resolution_min)
+        self._unsub = async_track_point_in_time(self.hass, self._async_fire, self.next_fire)
+
+    @callback
+    def _async_fire(self, now: datetime) -> None:
+        self._unsub = None
+        try:
+            self.action(dt_util.as_local(now))
+        finally:
+            # never re-arm for the boundary that just fired
+            self._async_arm(max(dt_util.now(), now))
@@ -9,15 +9,21 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
+    DOMAIN,
     DEFAULTS,
     OPT_PRICE_AREA,
     OPT_DSO,
     OPT_CONTRACT,
+    OPT_INTEGRATION_METHOD,
+    OPT_RESOLUTION_MIN,
     PRICE_AREAS,
     CONTRACTS,
+    INTEGRATION_METHODS,
+    RESOLUTIONS,
 )
+from .coordinator import StromprisCoordinator
 from .entity import StromprisBaseEntity
-from .tariffs import load_dso_catalog
+from .tariffs import async_get_dso_catalog
 
 @dataclass(frozen=True, kw_only=True)
 class StromprisSelectDescription(SelectEntityDescription):
@@ -28,8 +34,7 @@ async def async_setup_entry(
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    catalog = load_dso_catalog()
-    dso_values = list(catalog.keys())
+    catalog = await async_get_dso_catalog(hass)
 
     descriptions: list[StromprisSelectDescription] = [
         StromprisSelectDescription(
@@ -48,7 +53,19 @@ async def async_setup_entry(
             key="nettselskap",
             name="Nettselskap",
             option_key=OPT_DSO,
-            options=dso_values,
+            options=catalog.ids,
+        ),
+        StromprisSelectDescription(
+            key="integrasjonsmetode",
+            name="Integrasjonsmetode kostnad",
+            option_key=OPT_INTEGRATION_METHOD,
+            options=INTEGRATION_METHODS,
+        ),
+        StromprisSelectDescription(
+            key="opplosning_min",
+            name="Avregningsoppløsning (min)",
+            option_key=OPT_RESOLUTION_MIN,
+            options=RESOLUTIONS,
         ),
     ]
     async_add_entities([StromprisSelectEntity(hass, entry, d) for d in descriptions])
@@ -61,6 +78,10 @@ class StromprisSelectEntity(StromprisBaseEntity, SelectEntity):
         self.hass = hass
         self.entity_description = description
         self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self.coordinator: StromprisCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self.coordinator.async_add_options_listener(self.async_write_ha_state))
 
     @property
     def current_option(self) -> str | None:
@@ -68,14 +89,11 @@ class StromprisSelectEntity(StromprisBaseEntity, SelectEntity):
 
     async def async_select_option(self, option: str) -> None:
         options = dict(self.entry.options)
+        if self.entity_description.option_key == OPT_DSO and option != self.current_option:
+            # new DSO: drop rate overrides so its catalog rates apply
+            catalog = await async_get_dso_catalog(self.hass)
+            options = catalog.options_for_dso(options, option)
         options[self.entity_description.option_key] = option
 
-        # If DSO changed, merge in DSO defaults (do not overwrite user-set keys already present)
-        if self.entity_description.option_key == OPT_DSO:
-            catalog = load_dso_catalog()
-            dso_defaults = catalog.get(option, {}).get("defaults", {})
-            for k, v in dso_defaults.items():
-                options.setdefault(k, v)
-
+        # Update listener hot-applies the change and refreshes all entities (no reload)
         self.hass.config_entries.async_update_entry(self.entry, options=options)
-        self.async_write_ha_state()
@@ -1,31 +1,23 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from datetime import datetime
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.util import dt as dt_util
 
-from .const import (
-    DOMAIN,
-    CAPACITY_TIERS,
-    CONF_SPOT_ENTITY,
-    CONF_POWER_ENTITY,
-    DEFAULTS,
-    OPT_PAASLAG_ORE,
-    OPT_NETT_DAG_ORE,
-    OPT_NETT_NATT_ORE,
-    OPT_ELAVGIFT_ORE,
-    OPT_ENOVA_ORE,
-    OPT_MVA_PROSENT,
-    OPT_STROM_FAST_KR,
-    OPT_NETT_FAST_KR,
-)
+from .const import DOMAIN
+from .coordinator import StromprisCoordinator
 from .entity import StromprisBaseEntity
 
 
@@ -53,6 +45,24 @@ SENSORS: list[StromprisSensorDescription] = [
         native_unit_of_measurement="kW",
         icon="mdi:flash",
     ),
+    StromprisSensorDescription(
+        key="kapasitet_timesnitt_kw",
+        name="Effekt timesnitt nå",
+        native_unit_of_measurement="kW",
+        icon="mdi:flash-outline",
+    ),
+    StromprisSensorDescription(
+        key="kapasitet_prognose_kw",
+        name="Prognose timesnitt",
+        native_unit_of_measurement="kW",
+        icon="mdi:chart-timeline-variant",
+    ),
+    StromprisSensorDescription(
+        key="kapasitet_budsjett_kwh",
+        name="Gjenstående kWh før trinnhopp",
+        native_unit_of_measurement="kWh",
+        icon="mdi:battery-arrow-down-outline",
+    ),
     StromprisSensorDescription(
         key="kapasitet_trinn",
         name="Kapasitet trinn",
@@ -70,6 +80,75 @@ SENSORS: list[StromprisSensorDescription] = [
         native_unit_of_measurement="kr/mnd",
         icon="mdi:cash-multiple",
     ),
+    StromprisSensorDescription(
+        key="prisforlop_kr_kwh",
+        name="Prisforløp i dag snitt",
+        native_unit_of_measurement="kr/kWh",
+        icon="mdi:chart-line",
+    ),
+    StromprisSensorDescription(
+        key="billigste_vindu_start",
+        name="Billigste sammenhengende vindu",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        icon="mdi:clock-start",
+    ),
+    StromprisSensorDescription(
+        key="billigste_timer_snitt_kr_kwh",
+        name="Billigste timer snitt",
+        native_unit_of_measurement="kr/kWh",
+        icon="mdi:sort-numeric-ascending",
+    ),
+    StromprisSensorDescription(
+        key="kostnad_i_dag_kr",
+        name="Kostnad i dag",
+        native_unit_of_measurement="NOK",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:cash-clock",
+    ),
+    StromprisSensorDescription(
+        key="kostnad_mnd_kr",
+        name="Kostnad denne måneden",
+        native_unit_of_measurement="NOK",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:cash-register",
+    ),
+    StromprisSensorDescription(
+        key="anbefalt_avtale",
+        name="Anbefalt avtale",
+        icon="mdi:trophy-outline",
+    ),
+]
+
+# Diagnosesensorer, bare når OPT_DEBUG_SENSORS er slått på
+DEBUG_SENSORS: list[StromprisSensorDescription] = [
+    StromprisSensorDescription(
+        key="diag_effektmaalinger",
+        name="Diagnose effektmålinger",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:counter",
+    ),
+    StromprisSensorDescription(
+        key="diag_tilstandsskriv",
+        name="Diagnose tilstandsskriv",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:database-edit",
+    ),
+    StromprisSensorDescription(
+        key="diag_hendelse_p99_us",
+        name="Diagnose hendelse p99",
+        native_unit_of_measurement="µs",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:timer-outline",
+    ),
+    StromprisSensorDescription(
+        key="diag_kalkulator_bytes",
+        name="Diagnose kalkulator minne",
+        native_unit_of_measurement="B",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:memory",
+    ),
 ]
 
 
@@ -78,138 +157,258 @@ async def async_setup_entry(
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    spot_entity: str = entry.data[CONF_SPOT_ENTITY]
-    power_entity: str | None = entry.data.get(CONF_POWER_ENTITY)
+    coordinator: StromprisCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    descriptions = SENSORS + DEBUG_SENSORS if coordinator.debug_sensors else SENSORS
     async_add_entities(
-        [StromprisTotalSensor(hass, entry, d, spot_entity, power_entity) for d in SENSORS]
+        [StromprisTotalSensor(hass, entry, d, coordinator) for d in descriptions]
     )
 
 
 class StromprisTotalSensor(StromprisBaseEntity, SensorEntity):
     entity_description: StromprisSensorDescription
 
-    def _capacity_tier(self, avg_kw: float, opts: dict) -> tuple[str, float, float]:
-        """
-        Returns (label, price_kr_mnd, next_threshold_kw).
-        next_threshold_kw = upper bound of current tier (for margin calc).
-        """
-        for upper, label, price_key in CAPACITY_TIERS:
-            if avg_kw < upper:
-                price = float(opts.get(price_key, 0.0))
-                return label, price, float(upper)
-        # fallback (shouldn't happen)
-        return CAPACITY_TIERS[-1][1], float(opts.get(CAPACITY_TIERS[-1][2], 0.0)), float(CAPACITY_TIERS[-1][0])
+    # Statisk oppsett, prislister som allerede ligger på spotsensoren og verdier
+    # som har egne sensorer: vises i UI, men lagres ikke i recorder for hver endring.
+    _unrecorded_attributes = frozenset({
+        "spot_entity",
+        "power_entity",
+        "power_entities",
+        "paaslag_ore_kwh",
+        "nett_dag_ore_kwh",
+        "nett_natt_ore_kwh",
+        "elavgift_ore_kwh",
+        "enova_ore_kwh",
+        "mva_prosent",
+        "kapasitet_top3_snitt_kw",
+        "kapasitet_trinn",
+        "kapasitet_margin_kw",
+        "kapasitet_fastledd_kr_mnd",
+        "today",
+        "tomorrow",
+        "raw_today",
+        "raw_tomorrow",
+        "timer",
+        "rangering",
+    })
 
     def __init__(
         self,
         hass: HomeAssistant,
         entry: ConfigEntry,
         description: StromprisSensorDescription,
-        spot_entity: str,
-        power_entity: str | None,
+        coordinator: StromprisCoordinator,
     ) -> None:
         super().__init__(entry)
         self.hass = hass
         self.entity_description = description
-        self.spot_entity = spot_entity
-        self.power_entity = power_entity
+        self.coordinator = coordinator
         self._attr_unique_id = f"{entry.entry_id}_{description.key}"
-        self.capacity = hass.data[DOMAIN][entry.entry_id]["capacity"]
+        # (value, attributes) as last written; also served to HA during the write
+        self._published: tuple[float | str | None, dict[str, Any]] | None = None
+        self._attributes_from: tuple[Any, ...] | None = None
 
     async def async_added_to_hass(self) -> None:
-        watch = [self.spot_entity]
-        if self.power_entity:
-            watch.append(self.power_entity)
-        self.async_on_remove(
-            async_track_state_change_event(self.hass, watch, self._handle_event)
-        )
+        self.async_on_remove(self.coordinator.async_add_listener(self._async_write))
 
     @callback
-    def _handle_event(self, event: Event) -> None:
-        # Hvis dette var power update: feed calculator
-        if self.power_entity and event.data.get("entity_id") == self.power_entity:
-            st = self.hass.states.get(self.power_entity)
-            try:
-                kw = float(st.state) if st else 0.0
-            except (TypeError, ValueError):
-                kw = 0.0
-            self.capacity.update(dt_util.now(), kw)
-
+    def _async_write(self) -> None:
+        """Write state only when the rounded value or the attributes changed since the last write."""
+        value = self._timed_value()
+        key = self._attributes_key()
+        published = self._published
+        if published is not None and key is not None and key == self._attributes_from:
+            # same inputs: the large attribute sets are neither rebuilt nor compared
+            attributes = published[1]
+        else:
+            attributes = self._attributes()
+        self._attributes_from = key
+        if published is not None and value == published[0] and (
+            attributes is published[1] or attributes == published[1]
+        ):
+            self.coordinator.stats.writes_skipped += 1
+            return
+        self._published = (value, attributes)
+        self.coordinator.stats.state_writes += 1
         self.async_write_ha_state()
 
-    def _is_day_rate(self, now: datetime) -> bool:
-        # Enkel standard: dag=06-22 man-fre. Alt annet natt.
-        wd = now.isoweekday()  # 1=Mon..7=Sun
-        is_weekday = wd in (1, 2, 3, 4, 5)
-        return is_weekday and (6 <= now.hour < 22)
-
     @property
     def native_value(self) -> float | str | None:
-        key = self.entity_description.key
-        opts = dict(DEFAULTS)
-        opts.update(self.entry.options)
+        if self._published is not None:
+            return self._published[0]
+        return self._timed_value()
 
-        # Kapasitetslogikk (snitt av topp3 døgnmaks)
-        avg_kw = float(self.capacity.top3_avg_kw())
-        tier_label, cap_price_kr_mnd, next_upper_kw = self._capacity_tier(avg_kw, opts)
-        margin_kw = max(0.0, next_upper_kw - avg_kw)
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        if self._published is not None:
+            return self._published[1]
+        return self._attributes()
+
+    def _timed_value(self) -> float | str | None:
+        t0 = time.perf_counter_ns()
+        value = self._value()
+        self.coordinator.stats.native_value.record(time.perf_counter_ns() - t0)
+        return value
+
+    def _value(self) -> float | str | None:
+        key = self.entity_description.key
+        data = self.coordinator.data
 
         if key == "kapasitet_top3_snitt_kw":
-            return round(avg_kw, 3)
+            return round(data.top3_avg_kw, 3)
+
+        if key == "kapasitet_timesnitt_kw":
+            return round(data.hour_avg_kw, 3)
+
+        if key == "kapasitet_prognose_kw":
+            return round(data.projection.hour_kw, 3) if data.projection is not None else None
+
+        if key == "kapasitet_budsjett_kwh":
+            # ingen grense i øverste trinn
+            if data.projection is None or data.projection.budget_kwh is None:
+                return None
+            return round(data.projection.budget_kwh, 3)
 
         if key == "kapasitet_trinn":
-            return tier_label
+            return data.tier_label
 
         if key == "kapasitet_margin_kw":
-            return round(margin_kw, 3)
+            return round(data.margin_kw, 3)
 
         if key == "kapasitet_fastledd_kr_mnd":
-            return round(cap_price_kr_mnd, 2)
+            return round(data.cap_price_kr_mnd, 2)
 
         if key == "fast_kost_kr_mnd":
-            # HER inkluderer vi kapasitetsledd i fast kostnad
-            return round(
-                float(opts[OPT_STROM_FAST_KR]) + float(opts[OPT_NETT_FAST_KR]) + cap_price_kr_mnd,
-                2,
-            )
+            return round(data.fast_kost_kr_mnd, 2)
 
-        # total variabel (kr/kWh) – samme som før
-        spot_state = self.hass.states.get(self.spot_entity)
-        try:
-            spot = float(spot_state.state) if spot_state else 0.0
-        except (TypeError, ValueError):
-            spot = 0.0
+        if key == "prisforlop_kr_kwh":
+            if data.curve is None or data.curve.today_avg is None:
+                return None
+            return round(data.curve.today_avg, 4)
 
-        now = dt_util.now()
-        nett_energiledd_ore = float(opts[OPT_NETT_DAG_ORE]) if self._is_day_rate(now) else float(opts[OPT_NETT_NATT_ORE])
+        if key == "billigste_vindu_start":
+            if data.cheapest_window is None:
+                return None
+            return dt_util.utc_from_timestamp(data.cheapest_window.start)
 
-        paaslag_kr = float(opts[OPT_PAASLAG_ORE]) / 100.0
-        nett_kr = float(nett_energiledd_ore) / 100.0
-        elavgift_kr = float(opts[OPT_ELAVGIFT_ORE]) / 100.0
-        enova_kr = float(opts[OPT_ENOVA_ORE]) / 100.0
-        mva = float(opts[OPT_MVA_PROSENT]) / 100.0
+        if key == "billigste_timer_snitt_kr_kwh":
+            if data.cheapest_slots is None:
+                return None
+            return round(data.cheapest_slots.average_kr_kwh, 4)
 
-        eks_mva = spot + paaslag_kr + nett_kr + elavgift_kr + enova_kr
-        return round(eks_mva * (1.0 + mva), 4)
+        if key == "kostnad_i_dag_kr":
+            return round(data.cost_day_kr, 2)
 
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+        if key == "kostnad_mnd_kr":
+            return round(data.cost_month_kr, 2)
+
+        if key.startswith("diag_"):
+            return self._diagnostic_value(key)
+
+        if key == "anbefalt_avtale":
+            best = self.coordinator.comparison.best if self.coordinator.comparison else None
+            return f"{best.contract} / {best.dso_label}" if best else None
+
+        # total variabel (kr/kWh)
+        return round(data.total_variabel_kr_kwh, 4)
+
+    def _diagnostic_value(self, key: str) -> float | int | None:
+        stats = self.coordinator.stats
+        if key == "diag_effektmaalinger":
+            return self.coordinator.samples_ingested
+        if key == "diag_tilstandsskriv":
+            return stats.state_writes
+        if key == "diag_hendelse_p99_us":
+            return stats.event_handler.quantile_us(0.99)
+        return self.coordinator.capacity.footprint_bytes()
+
+    def _attributes_key(self) -> tuple[Any, ...] | None:
+        """What the large attribute sets are built from; None for sensors with small attributes.
+
+        The coordinator swaps the curve, cheapest results, tariff and comparison
+        for new objects when they change, and tuple equality checks identity
+        first, so an unchanged key costs a few pointer compares per sample.
+        """
+        key = self.entity_description.key
+        data = self.coordinator.data
+        if key == "prisforlop_kr_kwh":
+            return (data.curve,)
+        if key in ("billigste_vindu_start", "billigste_timer_snitt_kr_kwh"):
+            result = data.cheapest_window if key == "billigste_vindu_start" else data.cheapest_slots
+            # aktiv_naa endres bare når vi går inn i en ny slot
+            now_slot = data.curve.index_at(dt_util.utcnow().timestamp()) if data.curve is not None else None
+            return (result, data.curve, self.coordinator.cheap_hours, now_slot)
+        if key == "anbefalt_avtale":
+            return (self.coordinator.comparison,)
+        if key == "total_variabel_kr_kwh":
+            return (
+                self.coordinator.tariff,
+                round(data.top3_avg_kw, 3),
+                data.tier_label,
+                round(data.margin_kw, 3),
+                round(data.cap_price_kr_mnd, 2),
+            )
+        return None
+
+    def _attributes(self) -> dict[str, Any]:
+        if self.entity_description.key == "prisforlop_kr_kwh":
+            curve = self.coordinator.data.curve
+            return dict(curve.attributes) if curve else {}
+        if self.entity_description.key in ("billigste_vindu_start", "billigste_timer_snitt_kr_kwh"):
+            data = self.coordinator.data
+            result = data.cheapest_window if self.entity_description.key == "billigste_vindu_start" else data.cheapest_slots
+            if result is None or data.curve is None:
+                return {}
+            attrs = result.as_dict(data.curve, dt_util.get_default_time_zone())
+            attrs["timer"] = self.coordinator.cheap_hours
+            attrs["aktiv_naa"] = data.curve.index_at(dt_util.utcnow().timestamp()) in result.slots
+            return attrs
+        if self.entity_description.key == "kapasitet_timesnitt_kw":
+            contributions = self.coordinator.data.meter_contributions_kw
+            if not contributions:
+                return {}
+            # hvilken måler som bærer timesnittet (og dermed et eventuelt trinnhopp)
+            return {"bidrag_kw": {entity_id: round(kw, 3) for entity_id, kw in contributions.items()}}
+        if self.entity_description.key == "kapasitet_prognose_kw":
+            projection = self.coordinator.data.projection
+            if projection is None:
+                return {}
+            tariff = self.coordinator.tariff
+            return {
+                "prognose_top3_snitt_kw": round(projection.top3_kw, 3),
+                "prognose_trinn": tariff.tier_labels[projection.projected_tier],
+                "grense_kw": round(projection.limit_kw, 3) if projection.limit_kw is not None else None,
+                "terskel_kw": round(projection.threshold_kw, 3) if projection.threshold_kw is not None else None,
+                "over_terskel": projection.above,
+            }
+        if self.entity_description.key == "kostnad_i_dag_kr":
+            return {"energi_kwh": round(self.coordinator.data.energy_day_kwh, 3)}
+        if self.entity_description.key == "kostnad_mnd_kr":
+            return {"energi_kwh": round(self.coordinator.data.energy_month_kwh, 3)}
+        if self.entity_description.key == "anbefalt_avtale":
+            comparison = self.coordinator.comparison
+            if comparison is None or comparison.best is None:
+                return {}
+            best = comparison.best
+            savings = comparison.savings_kr
+            return {
+                "avtale": best.contract,
+                "nettselskap": best.dso,
+                "total_kr": round(best.total_kr, 2),
+                "besparelse_kr": round(savings, 2) if savings is not None else None,
+                "maaneder": len(comparison.months),
+                "beregnet": dt_util.utc_from_timestamp(comparison.computed_at).isoformat(),
+                "rangering": [r.as_dict() for r in comparison.rows[:5]],
+            }
         if self.entity_description.key != "total_variabel_kr_kwh":
             return {}
-        opts = dict(DEFAULTS)
-        opts.update(self.entry.options)
+        data = self.coordinator.data
         return {
-            "spot_entity": self.spot_entity,
-            "power_entity": self.power_entity,
-            "paaslag_ore_kwh": opts[OPT_PAASLAG_ORE],
-            "nett_dag_ore_kwh": opts[OPT_NETT_DAG_ORE],
-            "nett_natt_ore_kwh": opts[OPT_NETT_NATT_ORE],
-            "elavgift_ore_kwh": opts[OPT_ELAVGIFT_ORE],
-            "enova_ore_kwh": opts[OPT_ENOVA_ORE],
-            "mva_prosent": opts[OPT_MVA_PROSENT],
-            "kapasitet_top3_snitt_kw": round(avg_kw, 3),
-            "kapasitet_trinn": tier_label,
-            "kapasitet_margin_kw": round(margin_kw, 3),
-            "kapasitet_fastledd_kr_mnd": round(cap_price_kr_mnd, 2),
-
+            "spot_entity": self.coordinator.spot_entity,
+            "power_entity": self.coordinator.power_entity,
+            "power_entities": list(self.coordinator.power_entities),
+            **self.coordinator.tariff.attributes,
+            "kapasitet_top3_snitt_kw": round(data.top3_avg_kw, 3),
+            "kapasitet_trinn": data.tier_label,
+            "kapasitet_margin_kw": round(data.margin_kw, 3),
+            "kapasitet_fastledd_kr_mnd": round(data.cap_price_kr_mnd, 2),
         }
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import time
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_CONTIGUOUS,
+    ATTR_DAYS,
+    ATTR_HOURS,
+    ATTR_ITEMS,
+    ATTR_KWH,
+    ATTR_PEAK_KW,
+    ATTR_START,
+    CALCULATE_MAX_ITEMS,
+    COMPARISONS,
+    DOMAIN,
+    PERF_STATS,
+    SERVICE_CALCULATE,
+    SERVICE_CHEAPEST_HOURS,
+    SERVICE_COMPARE_CONTRACTS,
+    SPOT_HUB,
+)
+from .backfill import async_compare_contracts
+from .calculate import CalcItem, calculate
+from .coordinator import StromprisCoordinator
+from .windows import find_cheapest
+
+CHEAPEST_HOURS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_HOURS): vol.All(vol.Coerce(float), vol.Range(min=0.25, max=48)),
+    vol.Optional(ATTR_CONTIGUOUS, default=True): cv.boolean,
+})
+
+COMPARE_CONTRACTS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_DAYS, default=365): vol.All(vol.Coerce(int), vol.Range(min=7, max=730)),
+})
+
+CALCULATE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_ITEMS): vol.All(
+        cv.ensure_list,
+        vol.Length(min=1, max=CALCULATE_MAX_ITEMS),
+        [vol.Schema({
+            vol.Required(ATTR_START): cv.datetime,
+            vol.Optional(ATTR_KWH): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(ATTR_PEAK_KW): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        })],
+    ),
+})
+
+
+def _get_coordinator(hass: HomeAssistant, call: ServiceCall) -> StromprisCoordinator:
+    """Coordinator for the requested entry, or the only loaded one."""
+    runtimes = {k: v for k, v in hass.data.get(DOMAIN, {}).items() if k not in (SPOT_HUB, PERF_STATS, COMPARISONS)}
+    entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID)
+    if entry_id is None:
+        if len(runtimes) != 1:
+            raise ServiceValidationError(f"{ATTR_CONFIG_ENTRY_ID} is required when more than one entry is loaded")
+        entry_id = next(iter(runtimes))
+    runtime = runtimes.get(entry_id)
+    if not runtime or "coordinator" not in runtime:
+        raise ServiceValidationError(f"Unknown or unloaded config entry: {entry_id}")
+    return runtime["coordinator"]
+
+
+async def _async_cheapest_hours(call: ServiceCall) -> ServiceResponse:
+    coordinator = _get_coordinator(call.hass, call)
+    curve = coordinator.data.curve
+    if curve is None:
+        return {"result": None}
+    result = find_cheapest(curve, call.data[ATTR_HOURS], time.time(), call.data[ATTR_CONTIGUOUS])
+    if result is None:
+        return {"result": None}
+    return {"result": result.as_dict(curve, dt_util.get_default_time_zone())}
+
+
+async def _async_compare_contracts(call: ServiceCall) -> ServiceResponse:
+    coordinator = _get_coordinator(call.hass, call)
+    comparison = await async_compare_contracts(call.hass, coordinator, call.data[ATTR_DAYS])
+    return {"result": comparison.as_dict() if comparison else None}
+
+
+async def _async_calculate(call: ServiceCall) -> ServiceResponse:
+    coordinator = _get_coordinator(call.hass, call)
+    tz = dt_util.get_default_time_zone()
+    items = []
+    for item in call.data[ATTR_ITEMS]:
+        start = item[ATTR_START]
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=tz)
+        items.append(CalcItem(start.timestamp(), item.get(ATTR_KWH), item.get(ATTR_PEAK_KW)))
+    prices = coordinator.spot_prices()
+    starts, ends, values = (prices.starts, prices.ends, prices.values) if prices is not None else ((), (), ())
+    return calculate(items, coordinator.tariff, starts, ends, values, tz, coordinator.capacity)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CHEAPEST_HOURS,
+        _async_cheapest_hours,
+        schema=CHEAPEST_HOURS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COMPARE_CONTRACTS,
+        _async_compare_contracts,
+        schema=COMPARE_CONTRACTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CALCULATE,
+        _async_calculate,
+        schema=CALCULATE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
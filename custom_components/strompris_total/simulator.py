@@ -0,0 +1,333 @@
+"""Offline bill simulator: monthly bills from hourly consumption + spot prices.
+
+Uses the same TariffParams, tariff calendar and CapacityCalculator as the live
+sensors, so a simulated month matches what the integration would have shown.
+Catalog tariffs are looked up by date, so a year of history is billed with
+the rates that were in force at the time.
+Rows are streamed (CSV via the csv module, Parquet in record batches via
+pyarrow if installed) and only one open month per meter is kept in memory.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, tzinfo
+from typing import TYPE_CHECKING
+from zoneinfo import ZoneInfo
+
+from .capacity import CapacityCalculator
+from .const import DEFAULTS, OPT_DSO
+from .pricing import TariffParams
+from .tariffs import DsoCatalog, TariffTimeline, load_dso_catalog
+
+if TYPE_CHECKING:
+    from .compare import ComparisonJob, ComparisonRow, UsageProfile
+
+Row = tuple[str, float, float, float]  # (meter, start_ts, kwh, spot_kr_kwh)
+
+# Below this many slot × DSO passes a process pool costs more than it saves.
+PARALLEL_MIN_WORK = 2_000_000
+
+
+@dataclass(slots=True)
+class MonthBill:
+    meter: str
+    month: str  # "YYYY-MM"
+    kwh: float = 0.0
+    energy_kr: float = 0.0  # spot + påslag, eks. mva
+    grid_energy_kr: float = 0.0  # nett energiledd dag/natt, eks. mva
+    taxes_kr: float = 0.0  # elavgift + enova, eks. mva
+    vat_kr: float = 0.0  # mva på de variable leddene
+    capacity_kr: float = 0.0  # kapasitetsledd for trinnet
+    fixed_kr: float = 0.0  # strøm fastbeløp + nett fastledd
+    top3_avg_kw: float = 0.0
+    tier: str = ""
+
+    @property
+    def total_kr(self) -> float:
+        return self.energy_kr + self.grid_energy_kr + self.taxes_kr + self.vat_kr + self.capacity_kr + self.fixed_kr
+
+    def as_dict(self) -> dict[str, object]:
+        data = asdict(self)
+        data["total_kr"] = self.total_kr
+        return data
+
+
+class _MeterState:
+    __slots__ = ("capacity", "bill", "month_key", "tariff")
+
+    def __init__(self, capacity: CapacityCalculator, bill: MonthBill, month_key: int, tariff: TariffParams) -> None:
+        self.capacity = capacity
+        self.bill = bill
+        self.month_key = month_key
+        self.tariff = tariff  # gjelder kapasitets- og fastledd for måneden
+
+
+class BillSimulator:
+    """Feeds rows per meter and closes a MonthBill whenever a meter enters a new month.
+
+    Rows must be in time order per meter; meters may be interleaved. tariff is
+    either fixed TariffParams or a TariffTimeline; energy rates follow the
+    version valid at each row, capacity and fixed charges the one valid when
+    the month started.
+    """
+
+    def __init__(self, tariff: TariffParams | TariffTimeline, tz: tzinfo, resolution_min: int = 60) -> None:
+        self._tariff_at: Callable[[float], TariffParams] = (
+            tariff.at if isinstance(tariff, TariffTimeline) else lambda _ts: tariff
+        )
+        self.tz = tz
+        self.resolution_min = resolution_min
+        self._kw_per_kwh = 60.0 / resolution_min
+        self._meters: dict[str, _MeterState] = {}
+        # epoch hour -> (month_key, "YYYY-MM"); shared by all meters
+        self._hours: dict[int, tuple[int, str]] = {}
+
+    def _hour_info(self, ts: float) -> tuple[int, str]:
+        key = int(ts // 3600)
+        info = self._hours.get(key)
+        if info is None:
+            if len(self._hours) > 100_000:
+                self._hours.clear()
+            local = datetime.fromtimestamp(ts, self.tz)
+            info = (local.year * 12 + local.month, f"{local.year:04d}-{local.month:02d}")
+            self._hours[key] = info
+        return info
+
+    def add(self, meter: str, ts: float, kwh: float, spot: float) -> MonthBill | None:
+        """Add one interval; returns the meter's previous month when this row starts a new one."""
+        month_key, month = self._hour_info(ts)
+        state = self._meters.get(meter)
+        closed = None
+        t = self._tariff_at(ts)
+        if state is None:
+            state = _MeterState(
+                CapacityCalculator(self.tz, self.resolution_min), MonthBill(meter, month), month_key, t
+            )
+            self._meters[meter] = state
+        elif month_key != state.month_key:
+            closed = self._close(state)
+            state.bill = MonthBill(meter, month)
+            state.month_key = month_key
+            state.tariff = t
+
+        bill = state.bill
+        energy = kwh * (spot + t.paaslag_kr)
+        grid = kwh * t.grid_kr[t.calendar.period_at(ts)]
+        taxes = kwh * t.avgift_kr
+        bill.kwh += kwh
+        bill.energy_kr += energy
+        bill.grid_energy_kr += grid
+        bill.taxes_kr += taxes
+        bill.vat_kr += (energy + grid + taxes) * (t.vat_factor - 1.0)
+        state.capacity.update_ts(ts, kwh * self._kw_per_kwh)
+        return closed
+
+    def _close(self, state: _MeterState) -> MonthBill:
+        bill = state.bill
+        t = state.tariff
+        top3 = state.capacity.top3_avg_kw()
+        tier = t.tier_index(top3)
+        bill.top3_avg_kw = top3
+        bill.tier = t.tier_labels[tier]
+        bill.capacity_kr = t.tier_prices[tier]
+        bill.fixed_kr = t.fixed_kr_mnd
+        return bill
+
+    def finish(self) -> list[MonthBill]:
+        """Close the open month of every meter."""
+        return [self._close(state) for state in self._meters.values()]
+
+    def run(self, rows: Iterable[Row]) -> Iterator[MonthBill]:
+        for meter, ts, kwh, spot in rows:
+            closed = self.add(meter, ts, kwh, spot)
+            if closed is not None:
+                yield closed
+        yield from self.finish()
+
+
+def _parse_ts(value: str, tz: tzinfo) -> float:
+    t = datetime.fromisoformat(value)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=tz)
+    return t.timestamp()
+
+
+def read_csv(path: str, cols: Sequence[str], tz: tzinfo) -> Iterator[Row]:
+    time_col, kwh_col, spot_col, meter_col = cols
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        it = header.index(time_col)
+        ik = header.index(kwh_col)
+        isp = header.index(spot_col)
+        im = header.index(meter_col) if meter_col in header else None
+        for rec in reader:
+            if not rec:
+                continue
+            yield (
+                rec[im] if im is not None else "",
+                _parse_ts(rec[it], tz),
+                float(rec[ik]),
+                float(rec[isp]),
+            )
+
+
+def read_parquet(path: str, cols: Sequence[str], tz: tzinfo, chunk_rows: int) -> Iterator[Row]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise SystemExit("Parquet input needs pyarrow (pip install pyarrow)") from err
+
+    time_col, kwh_col, spot_col, meter_col = cols
+    pf = pq.ParquetFile(path)
+    names = set(pf.schema_arrow.names)
+    columns = [time_col, kwh_col, spot_col] + ([meter_col] if meter_col in names else [])
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=columns):
+        data = batch.to_pydict()
+        times = data[time_col]
+        meters = data.get(meter_col) or [""] * len(times)
+        for meter, t, kwh, spot in zip(meters, times, data[kwh_col], data[spot_col]):
+            if kwh is None or spot is None:
+                continue
+            if isinstance(t, datetime):
+                ts = (t if t.tzinfo else t.replace(tzinfo=tz)).timestamp()
+            else:
+                ts = _parse_ts(str(t), tz)
+            yield str(meter), ts, float(kwh), float(spot)
+
+
+def _load_options(options_path: str | None, dso: str | None) -> tuple[dict[str, object], DsoCatalog]:
+    """Explicit options (DSO and options file); catalog rates are layered per date by TariffTimeline."""
+    options: dict[str, object] = {OPT_DSO: dso or DEFAULTS[OPT_DSO]}
+    if options_path:
+        with open(options_path, encoding="utf-8") as f:
+            options.update(json.load(f))
+    return options, DsoCatalog.from_raw(load_dso_catalog())
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate monthly electricity bills from hourly data.")
+    parser.add_argument("input", nargs="+", help="CSV or Parquet files (timestamp, kwh, spot[, meter])")
+    parser.add_argument("--options", help="JSON file with option keys (opt_*) overriding the defaults")
+    parser.add_argument("--dso", help="DSO id from data/no_dsos.json whose defaults are applied first")
+    parser.add_argument("--tz", default="Europe/Oslo", help="time zone for naive timestamps and day/night")
+    parser.add_argument("--resolution", type=int, choices=(60, 15), default=60, help="row interval in minutes")
+    parser.add_argument("--chunk-rows", type=int, default=65_536, help="Parquet record batch size")
+    parser.add_argument("--time-col", default="timestamp")
+    parser.add_argument("--kwh-col", default="kwh")
+    parser.add_argument("--spot-col", default="spot", help="spot price column in NOK/kWh eks. mva")
+    parser.add_argument("--meter-col", default="meter")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--compare", action="store_true", help="rank every contract × DSO instead of billing")
+    parser.add_argument("--workers", type=int, help="process pool size for --compare (default: automatic)")
+    args = parser.parse_args(argv)
+
+    tz = ZoneInfo(args.tz)
+    options, catalog = _load_options(args.options, args.dso)
+    cols = (args.time_col, args.kwh_col, args.spot_col, args.meter_col)
+
+    def rows() -> Iterator[Row]:
+        for path in args.input:
+            if path.endswith((".parquet", ".pq")):
+                yield from read_parquet(path, cols, tz, args.chunk_rows)
+            else:
+                yield from read_csv(path, cols, tz)
+
+    if args.compare:
+        return _compare(rows(), options, catalog, tz, args)
+
+    bills = BillSimulator(TariffTimeline(catalog, options, tz), tz, args.resolution).run(rows())
+    if args.format == "json":
+        json.dump([b.as_dict() for b in bills], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return 0
+
+    writer = None
+    for bill in bills:
+        data = bill.as_dict()
+        if writer is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(data))
+            writer.writeheader()
+        writer.writerow({k: round(v, 4) if isinstance(v, float) else v for k, v in data.items()})
+    return 0
+
+
+def _compare(
+    rows: Iterable[Row], options: dict[str, object], catalog: DsoCatalog, tz: tzinfo, args: argparse.Namespace
+) -> int:
+    from .compare import ProfileBuilder, compare
+
+    builders: dict[str, ProfileBuilder] = {}
+    for meter, ts, kwh, spot in rows:
+        builder = builders.get(meter)
+        if builder is None:
+            builder = builders[meter] = ProfileBuilder(tz, args.resolution)
+        builder.add(ts, kwh, spot)
+
+    # historikken prises med satsene som gjaldt da, som BillSimulator
+    dsos = [(dso, label, catalog.tariffs(dso)) for dso, label in catalog.labels]
+    map_jobs = _pool_map(args.workers)
+    results = {meter: compare(b.build(), options, dsos, map_jobs=map_jobs) for meter, b in builders.items()}
+    if args.format == "json":
+        json.dump({meter: c.as_dict() for meter, c in results.items()}, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return 0
+
+    writer = None
+    for meter, comparison in results.items():
+        for rank, row in enumerate(comparison.rows, 1):
+            data = {"meter": meter, "rank": rank, **row.as_dict()}
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=list(data))
+                writer.writeheader()
+            writer.writerow(data)
+    return 0
+
+
+_worker_profile: UsageProfile | None = None
+
+
+def _init_worker(profile: UsageProfile) -> None:
+    global _worker_profile
+    _worker_profile = profile
+
+
+def _evaluate_in_worker(job: ComparisonJob) -> list[ComparisonRow]:
+    from .compare import evaluate_dso
+
+    return evaluate_dso(_worker_profile, *job)
+
+
+def _pool_map(
+    workers: int | None,
+) -> Callable[[UsageProfile, list[ComparisonJob]], Iterable[list[ComparisonRow]]]:
+    """map_jobs for compare(): a process pool that receives the profile once per worker.
+
+    Only the CLI uses it; inside Home Assistant the comparison runs in one executor job.
+    """
+    from .compare import evaluate_dso
+
+    def map_jobs(profile: UsageProfile, jobs: list[ComparisonJob]) -> Iterable[list[ComparisonRow]]:
+        n = workers
+        if n is None:
+            n = min(len(jobs), os.cpu_count() or 1) if len(profile.kwh) * len(jobs) >= PARALLEL_MIN_WORK else 1
+        if n <= 1 or len(jobs) <= 1:
+            return [evaluate_dso(profile, *job) for job in jobs]
+        # spawn: the child re-imports this module instead of copying the parent
+        with ProcessPoolExecutor(
+            max_workers=n,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(profile,),
+        ) as pool:
+            return list(pool.map(_evaluate_in_worker, jobs))
+
+    return map_jobs
@@ -0,0 +1,172 @@
+"""Domain-wide spot price hub shared by all config entries.
+
+Many entries can watch the same spot sensor (sites, sub-meters, what-if
+contracts). The hub holds one state listener per spot entity, parses each
+new state once into compact arrays and fans the result out to every
+subscribed entry, so the cost grows with the number of distinct spot
+sources rather than the number of entries. A source lives as long as it has
+subscribers; entries release theirs on unload, so the hub only holds the
+spot entities currently in use.
+
+The attribute format and unit are detected by the adapters in spot_sources
+(the adapter is remembered per entity), and prices are stored in kr per kWh
+of the source currency.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, SPOT_HUB
+from .spot_sources import SpotAdapter, detect_adapter, parse_unit
+
+
+@dataclass(frozen=True, slots=True)
+class SpotPrices:
+    """One parsed spot state (kr/kWh eks. mva in `currency`), shared read-only by all subscribers."""
+
+    entity_id: str
+    last_updated: datetime
+    current: float
+    starts: array  # array('d'): slot start timestamps, sorted
+    ends: array  # array('d')
+    values: array  # array('d')
+    source: str = ""  # adapter name
+    currency: str = "NOK"
+    unit_factor: float = 1.0  # source unit -> kr/kWh, for statistics of the raw state
+
+    def slots(self) -> Iterator[tuple[float, float, float]]:
+        return zip(self.starts, self.ends, self.values)
+
+    def scaled(self, factor: float, currency: str) -> SpotPrices:
+        """Copy with every price multiplied by factor (currency conversion)."""
+        return replace(
+            self,
+            current=self.current * factor,
+            values=array("d", (v * factor for v in self.values)),
+            currency=currency,
+            unit_factor=self.unit_factor * factor,
+        )
+
+
+def parse_spot_state(state: State, adapter: SpotAdapter | None = None) -> SpotPrices:
+    """Parse one state into sorted arrays in kr/kWh; the adapter is detected if not given."""
+    attrs = state.attributes
+    if adapter is None:
+        adapter = detect_adapter(attrs)
+    currency, factor = parse_unit(attrs)
+    tz = dt_util.get_default_time_zone()
+    today = dt_util.as_local(state.last_updated).date()
+    # sortert input er O(n) for sort(); ENTSO-E "prices" kan ha flere døgn i vilkårlig rekkefølge
+    slots = sorted(adapter.slots(attrs, tz, today)) if adapter is not None else []
+    starts, ends, values = array("d"), array("d"), array("d")
+    last_start = None
+    for start, end, value in slots:
+        if start == last_start:
+            continue
+        starts.append(start)
+        ends.append(end)
+        values.append(value * factor)
+        last_start = start
+    try:
+        current = float(state.state) * factor
+    except (TypeError, ValueError):
+        current = 0.0
+    return SpotPrices(
+        state.entity_id, state.last_updated, current, starts, ends, values,
+        adapter.name if adapter is not None else "", currency, factor,
+    )
+
+
+class _Source:
+    __slots__ = ("prices", "adapter", "subscribers", "unsub")
+
+    def __init__(self) -> None:
+        self.prices: SpotPrices | None = None
+        self.adapter: SpotAdapter | None = None
+        self.subscribers: dict[object, Callable[[SpotPrices], None]] = {}
+        self.unsub: CALLBACK_TYPE | None = None
+
+
+class SpotPriceHub:
+    """One listener and one parse per spot entity state, fanned out to all entries."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._sources: dict[str, _Source] = {}
+        self.parses = 0
+
+    def get(self, entity_id: str) -> SpotPrices | None:
+        """Parsed prices for the entity's current state, cached by (entity_id, last_updated) while subscribed."""
+        state = self.hass.states.get(entity_id)
+        if state is None:
+            return None
+        source = self._sources.get(entity_id)
+        if source is None:
+            # uten abonnenter lagres ingenting, ellers vokser hub-en med hver entitet som er spurt om
+            self.parses += 1
+            return parse_spot_state(state)
+        prices = source.prices
+        if prices is None or prices.last_updated != state.last_updated:
+            adapter = source.adapter
+            if adapter is None or not adapter.detect(state.attributes):
+                # første tilstand, eller kilden har byttet format
+                adapter = source.adapter = detect_adapter(state.attributes)
+            prices = source.prices = parse_spot_state(state, adapter)
+            self.parses += 1
+        return prices
+
+    @callback
+    def async_subscribe(self, entity_id: str, update_callback: Callable[[SpotPrices], None]) -> CALLBACK_TYPE:
+        """Call update_callback with the parsed prices on every state change of entity_id.
+
+        Each subscription holds a reference to the entity's source; the
+        listener and cached prices are released with the last one.
+        """
+        source = self._sources.get(entity_id)
+        if source is None:
+            source = self._sources[entity_id] = _Source()
+        if source.unsub is None:
+            source.unsub = async_track_state_change_event(self.hass, [entity_id], self._async_handle_event)
+        key = object()
+        source.subscribers[key] = update_callback
+
+        @callback
+        def unsubscribe() -> None:
+            source.subscribers.pop(key, None)
+            if not source.subscribers and source.unsub is not None:
+                source.unsub()
+                source.unsub = None
+                self._sources.pop(entity_id, None)
+
+        return unsubscribe
+
+    @callback
+    def _async_handle_event(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        source = self._sources.get(entity_id)
+        if source is None or event.data.get("new_state") is None:
+            return
+        prices = self.get(entity_id)
+        if prices is None:
+            return
+        for update_callback in list(source.subscribers.values()):
+            update_callback(prices)
+
+    @property
+    def source_count(self) -> int:
+        return len(self._sources)
+
+
+def get_spot_hub(hass: HomeAssistant) -> SpotPriceHub:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    hub = domain_data.get(SPOT_HUB)
+    if hub is None:
+        hub = domain_data[SPOT_HUB] = SpotPriceHub(hass)
+    return hub
@@ -0,0 +1,166 @@
+"""Spot price source adapters: detect the attribute format and unit of a spot entity.
+
+Nordpool, ENTSO-E and Tibber style sensors expose the same prices in
+different shapes (raw_today, prices_today, per-slot dicts, plain lists) and
+units (NOK/kWh, øre/kWh, EUR/MWh). Each adapter recognises one shape and
+yields (start, end, value) slots; parse_unit() gives the factor that scales values to kr (or the
+source currency's main unit) per kWh. Adapters are tried in order and the
+first match wins; register_adapter() puts a new one in front.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping, Sequence
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Any, Protocol
+
+Slot = tuple[float, float, float]  # (start_ts, end_ts, value in source unit)
+
+# Nøkler for starttid og pris i per-slot-dicts (Nordpool, ENTSO-E, Tibber)
+_START_KEYS = ("start", "startsAt", "time", "start_time")
+_END_KEYS = ("end", "endsAt", "end_time")
+_VALUE_KEYS = ("value", "price", "total")
+
+# Underenheter (1/100 av hovedvalutaen)
+_MINOR_UNITS = {"øre", "ore", "öre", "cent", "cents", "ct", "c", "snt"}
+_CURRENCY_ALIASES = {
+    "kr": "NOK", "nok": "NOK", "øre": "NOK", "ore": "NOK",
+    "eur": "EUR", "€": "EUR", "cent": "EUR", "cents": "EUR", "ct": "EUR", "c": "EUR",
+    "sek": "SEK", "öre": "SEK", "dkk": "DKK",
+}
+
+
+class SpotAdapter(Protocol):
+    name: str
+
+    def detect(self, attrs: Mapping[str, Any]) -> bool:
+        """True if the attributes have this adapter's shape."""
+
+    def slots(self, attrs: Mapping[str, Any], tz: tzinfo, today: date) -> Iterator[Slot]:
+        """(start, end, value) for every priced slot, in source units."""
+
+
+def _as_ts(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _first_key(item: Mapping[str, Any], keys: Sequence[str]) -> str | None:
+    for key in keys:
+        if key in item:
+            return key
+    return None
+
+
+def _dict_list(attrs: Mapping[str, Any], key: str) -> list[Mapping[str, Any]] | None:
+    value = attrs.get(key)
+    if value and isinstance(value, (list, tuple)) and isinstance(value[0], Mapping):
+        return value
+    return None
+
+
+class SlotListAdapter:
+    """Lists of per-slot dicts under the given day keys.
+
+    Start, end and price keys are found from the first item. Without an end
+    key a slot ends where the next one starts (the last one gets the same
+    length as the one before it, or an hour).
+    """
+
+    def __init__(self, name: str, keys: Sequence[str]) -> None:
+        self.name = name
+        self.keys = tuple(keys)
+
+    def detect(self, attrs: Mapping[str, Any]) -> bool:
+        for key in self.keys:
+            items = _dict_list(attrs, key)
+            if items is not None:
+                return _first_key(items[0], _START_KEYS) is not None and _first_key(items[0], _VALUE_KEYS) is not None
+        return False
+
+    def slots(self, attrs: Mapping[str, Any], tz: tzinfo, today: date) -> Iterator[Slot]:
+        for key in self.keys:
+            items = _dict_list(attrs, key)
+            if items is None:
+                continue
+            start_key = _first_key(items[0], _START_KEYS)
+            end_key = _first_key(items[0], _END_KEYS)
+            value_key = _first_key(items[0], _VALUE_KEYS)
+            if start_key is None or value_key is None:
+                continue
+            # sorter før slutt utledes fra neste start (ENTSO-E-lister kan komme usortert)
+            timed = sorted(((_as_ts(item[start_key]), item) for item in items), key=lambda si: si[0])
+            for i, (start, item) in enumerate(timed):
+                value = item.get(value_key)
+                if value is None:
+                    continue
+                if end_key is not None:
+                    end = _as_ts(item[end_key])
+                elif i + 1 < len(timed):
+                    end = timed[i + 1][0]
+                else:
+                    end = start + (start - timed[i - 1][0] if i else 3600.0)
+                yield start, end, float(value)
+
+
+class PlainListAdapter:
+    """today/tomorrow as bare price lists from local midnight (hourly, or quarter-hourly above 25 entries)."""
+
+    name = "plain_list"
+
+    def detect(self, attrs: Mapping[str, Any]) -> bool:
+        today = attrs.get("today")
+        return bool(today) and isinstance(today, (list, tuple)) and not isinstance(today[0], Mapping)
+
+    def slots(self, attrs: Mapping[str, Any], tz: tzinfo, today: date) -> Iterator[Slot]:
+        for day_offset, key in ((0, "today"), (1, "tomorrow")):
+            plain = attrs.get(key)
+            if not plain or isinstance(plain[0], Mapping):
+                continue
+            midnight = datetime.combine(today + timedelta(days=day_offset), time(), tz).timestamp()
+            step = 900.0 if len(plain) > 25 else 3600.0
+            for i, value in enumerate(plain):
+                if value is None:
+                    continue
+                start = midnight + i * step
+                yield start, start + step, float(value)
+
+
+ADAPTERS: list[SpotAdapter] = [
+    SlotListAdapter("nordpool", ("raw_today", "raw_tomorrow")),
+    SlotListAdapter("entsoe", ("prices_today", "prices_tomorrow")),
+    SlotListAdapter("slot_list", ("today", "tomorrow")),  # Tibber og lignende
+    SlotListAdapter("prices", ("prices",)),
+    PlainListAdapter(),
+]
+
+
+def register_adapter(adapter: SpotAdapter) -> None:
+    """Try adapter before the built-in ones."""
+    ADAPTERS.insert(0, adapter)
+
+
+def detect_adapter(attrs: Mapping[str, Any]) -> SpotAdapter | None:
+    for adapter in ADAPTERS:
+        if adapter.detect(attrs):
+            return adapter
+    return None
+
+
+def parse_unit(attrs: Mapping[str, Any]) -> tuple[str, float]:
+    """(currency, factor to main currency unit per kWh) from unit_of_measurement / Nordpool attributes.
+
+    Unknown or missing units are taken as NOK/kWh.
+    """
+    uom = str(attrs.get("unit_of_measurement") or "").strip()
+    currency_part, _, energy_part = uom.partition("/")
+    currency_part = currency_part.strip().lower()
+    factor = 1.0
+    if energy_part.strip().lower() == "mwh":
+        factor /= 1000.0
+    if currency_part in _MINOR_UNITS or (not currency_part and attrs.get("price_in_cents")):
+        factor /= 100.0
+    currency = _CURRENCY_ALIASES.get(currency_part) or attrs.get("currency")
+    if not currency:
+        currency = currency_part if len(currency_part) == 3 and currency_part.isalpha() else "NOK"
+    return str(currency).upper(), factor
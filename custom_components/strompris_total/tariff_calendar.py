@@ -0,0 +1,153 @@
+"""Compiled grid-tariff calendar: one period code per hour (or quarter) of a year.
+
+The rules (day hours, weekdays, Norwegian public holidays, winter/summer
+months) come from the DSO catalog and are evaluated once per slot when a year
+is compiled. Lookups afterwards are an index into a bytes object, and compiled
+years are cached per (rules, time zone, year, resolution), so live pricing,
+price curves and batch simulations share the same arrays.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import Any
+
+# Periodekoder: bit 0 = dag, bit 1 = sommer
+PERIOD_NIGHT = 0
+PERIOD_DAY = 1
+PERIOD_SUMMER = 2
+PERIODS = 4
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def norwegian_holidays(year: int) -> frozenset[date]:
+    """Offentlige høytidsdager (helligdager og 1./17. mai)."""
+    easter = easter_sunday(year)
+    return frozenset({
+        date(year, 1, 1),
+        easter - timedelta(days=3),  # skjærtorsdag
+        easter - timedelta(days=2),  # langfredag
+        easter,
+        easter + timedelta(days=1),  # 2. påskedag
+        date(year, 5, 1),
+        date(year, 5, 17),
+        easter + timedelta(days=39),  # Kristi himmelfartsdag
+        easter + timedelta(days=49),  # 1. pinsedag
+        easter + timedelta(days=50),  # 2. pinsedag
+        date(year, 12, 25),
+        date(year, 12, 26),
+    })
+
+
+@dataclass(frozen=True, slots=True)
+class CalendarRules:
+    """When a DSO charges the day rate, and which months use the summer rates."""
+
+    day_start: int = 6
+    day_end: int = 22
+    day_weekdays: tuple[int, ...] = (1, 2, 3, 4, 5)  # isoweekday
+    holidays_as_night: bool = True
+    summer_months: tuple[int, ...] = ()
+
+    @classmethod
+    def from_raw(cls, raw: Mapping[str, Any] | None) -> CalendarRules:
+        """Rules from a catalog "calendar" object; missing keys keep the defaults."""
+        if not raw:
+            return DEFAULT_RULES
+        day_hours = raw.get("day_hours", (6, 22))
+        return cls(
+            day_start=int(day_hours[0]),
+            day_end=int(day_hours[1]),
+            day_weekdays=tuple(int(d) for d in raw.get("day_weekdays", (1, 2, 3, 4, 5))),
+            holidays_as_night=bool(raw.get("holidays_as_night", True)),
+            summer_months=tuple(int(m) for m in raw.get("summer_months", ())),
+        )
+
+    def period(self, local: datetime, holidays: frozenset[date] = frozenset()) -> int:
+        """Period code for a local time (uncached; use TariffCalendar for lookups)."""
+        code = PERIOD_SUMMER if local.month in self.summer_months else PERIOD_NIGHT
+        if (
+            self.day_start <= local.hour < self.day_end
+            and local.isoweekday() in self.day_weekdays
+            and not (self.holidays_as_night and local.date() in holidays)
+        ):
+            code |= PERIOD_DAY
+        return code
+
+
+DEFAULT_RULES = CalendarRules()
+
+
+@dataclass(frozen=True, slots=True)
+class TariffCalendar:
+    """Period codes for one local calendar year, indexed by (ts - start) // step."""
+
+    rules: CalendarRules
+    year: int
+    start_ts: float
+    end_ts: float
+    step_s: float
+    codes: bytes
+
+    def period_at(self, ts: float) -> int:
+        """O(1) period code for a timestamp inside this year."""
+        return self.codes[int((ts - self.start_ts) // self.step_s)]
+
+    def covers(self, ts: float) -> bool:
+        return self.start_ts <= ts < self.end_ts
+
+
+def compile_calendar(rules: CalendarRules, tz: tzinfo, year: int, resolution_min: int = 60) -> TariffCalendar:
+    """Evaluate the rules for every slot of the year (8760/8784 hours, or 35040/35136 quarters)."""
+    start_ts = datetime.combine(date(year, 1, 1), time(), tz).timestamp()
+    end_ts = datetime.combine(date(year + 1, 1, 1), time(), tz).timestamp()
+    step = resolution_min * 60
+    holidays = norwegian_holidays(year)
+    codes = bytearray()
+    # Reglene gjelder hele timer, så regn ut én gang per time og gjenta for kvarterene.
+    per_hour = 3600 // step
+    for hour_ts in range(int(start_ts), int(end_ts), 3600):
+        code = rules.period(datetime.fromtimestamp(hour_ts, tz), holidays)
+        codes.extend(bytes((code,)) * per_hour)
+    return TariffCalendar(rules, year, start_ts, end_ts, float(step), bytes(codes))
+
+
+@lru_cache(maxsize=32)
+def get_calendar(rules: CalendarRules, tz: tzinfo, year: int, resolution_min: int = 60) -> TariffCalendar:
+    """Compiled calendar, shared by every user of the same rules and year."""
+    return compile_calendar(rules, tz, year, resolution_min)
+
+
+class CalendarLookup:
+    """Period lookup for one set of rules that keeps the current year's calendar at hand."""
+
+    __slots__ = ("rules", "tz", "resolution_min", "_cal")
+
+    def __init__(self, rules: CalendarRules, tz: tzinfo, resolution_min: int = 60) -> None:
+        self.rules = rules
+        self.tz = tz
+        self.resolution_min = resolution_min
+        self._cal: TariffCalendar | None = None
+
+    def period_at(self, ts: float) -> int:
+        cal = self._cal
+        if cal is None or not cal.start_ts <= ts < cal.end_ts:
+            year = datetime.fromtimestamp(ts, self.tz).year
+            cal = self._cal = get_calendar(self.rules, self.tz, year, self.resolution_min)
+        return cal.codes[int((ts - cal.start_ts) // cal.step_s)]
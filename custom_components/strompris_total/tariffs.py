@@ -1,10 +1,217 @@
+"""DSO catalog: labels, tariff defaults and calendar rules per grid company.
+
+Each DSO has one or more tariff versions with an effective-from date:
+
+    "elvia": {"label": "...", "calendar": {...},
+              "periods": [{"from": "2025-01-01", "defaults": {...}},
+                          {"from": "2025-07-01", "defaults": {...}, "calendar": {...}}]}
+
+A version inherits the defaults and calendar of the one before it and only
+lists what changed. The older flat form ({"defaults": {...}}) is one version
+valid for all time. Versions are compiled per DSO on first use into sorted
+start arrays, so the version valid at a timestamp is a bisect.
+
+Entry options hold only what the user set explicitly. effective_options() is
+the one precedence rule for live sensors, the simulator and the comparison:
+DEFAULTS, then the catalog version, then the entry's own overrides.
+"""
 from __future__ import annotations
 
 import json
+import time
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, tzinfo
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from .const import DEFAULTS, DOMAIN, OPT_CONTRACT, OPT_DSO, OPT_PRICE_AREA
+from .perf import get_domain_stats
+from .pricing import NORWAY_TZ, TariffParams
+from .tariff_calendar import DEFAULT_RULES, CalendarRules
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+CATALOG_PATH = Path(__file__).parent / "data" / "no_dsos.json"
+DATA_CATALOG = f"{DOMAIN}_dso_catalog"
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+_MISSING = object()
+
+# Valg fra oppsettet, som alltid ligger i options
+_SELECTIONS = (OPT_PRICE_AREA, OPT_DSO, OPT_CONTRACT)
+
 
 def load_dso_catalog() -> dict[str, Any]:
-    path = Path(__file__).parent / "data" / "no_dsos.json"
-    with path.open("r", encoding="utf-8") as f:
+    with CATALOG_PATH.open("r", encoding="utf-8") as f:
         return json.load(f)
+
+
+@dataclass(frozen=True, slots=True)
+class DsoTariffs:
+    """Compiled tariff versions of one DSO, sorted by effective-from."""
+
+    starts: array  # array('d'): effective-from timestamps; the first is -inf
+    defaults: tuple[Mapping[str, Any], ...]
+    calendars: tuple[CalendarRules, ...]
+
+    @classmethod
+    def from_raw(cls, raw: Mapping[str, Any], tz: tzinfo = NORWAY_TZ) -> DsoTariffs:
+        periods = raw.get("periods") or [{"defaults": raw.get("defaults", {})}]
+        periods = sorted(periods, key=lambda p: p.get("from", ""))
+        starts = array("d")
+        defaults: list[Mapping[str, Any]] = []
+        calendars: list[CalendarRules] = []
+        merged: dict[str, Any] = {}
+        calendar = CalendarRules.from_raw(raw.get("calendar"))
+        for i, period in enumerate(periods):
+            frm = period.get("from")
+            if i == 0 or not frm:
+                # den eldste versjonen gjelder også bakover i tid
+                starts.append(float("-inf"))
+            else:
+                starts.append(datetime.combine(date.fromisoformat(frm), dt_time(), tz).timestamp())
+            merged.update(period.get("defaults", {}))
+            if "calendar" in period:
+                calendar = CalendarRules.from_raw(period["calendar"])
+            defaults.append(MappingProxyType(dict(merged)))
+            calendars.append(calendar)
+        return cls(starts, tuple(defaults), tuple(calendars))
+
+    def index_at(self, ts: float) -> int:
+        return max(bisect_right(self.starts, ts) - 1, 0)
+
+    def valid_until(self, ts: float) -> float:
+        """Start of the next version after ts, or +inf."""
+        i = self.index_at(ts) + 1
+        return self.starts[i] if i < len(self.starts) else float("inf")
+
+
+_NO_TARIFFS = DsoTariffs(array("d", [float("-inf")]), (_EMPTY,), (DEFAULT_RULES,))
+
+
+@dataclass(frozen=True, slots=True)
+class DsoCatalog:
+    """Parsed DSO catalog shared by flows and platforms; tariffs are compiled per DSO on first use."""
+
+    mtime: float
+    raw_by_id: Mapping[str, Mapping[str, Any]]
+    labels: tuple[tuple[str, str], ...]  # (dso_id, label), sorted by label
+    _compiled: dict[str, DsoTariffs] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_raw(cls, raw: Mapping[str, Any], mtime: float = 0.0) -> DsoCatalog:
+        return cls(
+            mtime=mtime,
+            raw_by_id=MappingProxyType(dict(raw)),
+            labels=tuple(
+                sorted(((k, v.get("label", k)) for k, v in raw.items()), key=lambda kv: kv[1].casefold())
+            ),
+        )
+
+    @property
+    def ids(self) -> list[str]:
+        return [k for k, _ in self.labels]
+
+    def tariffs(self, dso: str) -> DsoTariffs:
+        compiled = self._compiled.get(dso)
+        if compiled is None:
+            raw = self.raw_by_id.get(dso)
+            compiled = DsoTariffs.from_raw(raw) if raw is not None else _NO_TARIFFS
+            self._compiled[dso] = compiled
+        return compiled
+
+    def defaults(self, dso: str, ts: float | None = None) -> Mapping[str, Any]:
+        """Defaults of the version valid at ts (now if omitted)."""
+        t = self.tariffs(dso)
+        return t.defaults[t.index_at(time.time() if ts is None else ts)]
+
+    def calendar(self, dso: str, ts: float | None = None) -> CalendarRules:
+        t = self.tariffs(dso)
+        return t.calendars[t.index_at(time.time() if ts is None else ts)]
+
+    def rate_keys(self, dso: str) -> frozenset[str]:
+        """Option keys the DSO's catalog sets in any version."""
+        # versjonene arver hverandre, så den siste har alle nøklene
+        return frozenset(self.tariffs(dso).defaults[-1])
+
+    def options_for_dso(self, options: Mapping[str, Any], dso: str) -> dict[str, Any]:
+        """Options after switching to dso: overrides of the old or new DSO's rates are dropped."""
+        dropped = self.rate_keys(str(options.get(OPT_DSO, ""))) | self.rate_keys(dso)
+        result = {k: v for k, v in options.items() if k not in dropped}
+        result[OPT_DSO] = dso
+        return result
+
+    def explicit_options(self, options: Mapping[str, Any], since: float | None = None) -> dict[str, Any]:
+        """Options without the values version 1 seeded into them (entries from before version 2).
+
+        Version 1 copied {**DEFAULTS, **catalog version} when the entry was
+        created (since); a value is dropped only if it equals what that seeded.
+        Without since, every catalog version of the DSO counts as a candidate.
+        """
+        tariffs = self.tariffs(str(options.get(OPT_DSO, "")))
+        seeded = tariffs.defaults if since is None else (tariffs.defaults[tariffs.index_at(since)],)
+        return {
+            key: value
+            for key, value in options.items()
+            if key in _SELECTIONS or all(version.get(key, DEFAULTS.get(key, _MISSING)) != value for version in seeded)
+        }
+
+
+def effective_options(options: Mapping[str, Any], dso_defaults: Mapping[str, Any]) -> dict[str, Any]:
+    """DEFAULTS, then the DSO's catalog version, then the entry's explicit options."""
+    return {**DEFAULTS, **dso_defaults, **options}
+
+
+class TariffTimeline:
+    """TariffParams over time for one DSO: catalog version defaults under explicit options.
+
+    Lookups inside the current version are two float compares; crossing into
+    another version is a bisect plus, the first time, one TariffParams compile.
+    """
+
+    __slots__ = ("_tariffs", "_options", "_tz", "_compiled", "_start", "_end", "_current")
+
+    def __init__(self, catalog: DsoCatalog, options: Mapping[str, Any], tz: tzinfo = NORWAY_TZ) -> None:
+        self._tariffs = catalog.tariffs(str(options.get(OPT_DSO, "")))
+        self._options = dict(options)
+        self._tz = tz
+        self._compiled: dict[int, TariffParams] = {}
+        self._start = self._end = 0.0
+        self._current: TariffParams | None = None
+
+    def at(self, ts: float) -> TariffParams:
+        if self._current is not None and self._start <= ts < self._end:
+            return self._current
+        t = self._tariffs
+        i = t.index_at(ts)
+        tariff = self._compiled.get(i)
+        if tariff is None:
+            tariff = TariffParams.from_options(effective_options(self._options, t.defaults[i]), t.calendars[i], self._tz)
+            self._compiled[i] = tariff
+        self._start = t.starts[i]
+        self._end = t.starts[i + 1] if i + 1 < len(t.starts) else float("inf")
+        self._current = tariff
+        return tariff
+
+
+def _load_if_changed(cached_mtime: float | None) -> DsoCatalog | None:
+    """Executor job: returns a fresh catalog, or None if the file is unchanged."""
+    mtime = CATALOG_PATH.stat().st_mtime
+    if mtime == cached_mtime:
+        return None
+    return DsoCatalog.from_raw(load_dso_catalog(), mtime)
+
+
+async def async_get_dso_catalog(hass: HomeAssistant) -> DsoCatalog:
+    """Return the cached catalog, re-reading the file in the executor if it changed on disk."""
+    cached: DsoCatalog | None = hass.data.get(DATA_CATALOG)
+    fresh = await hass.async_add_executor_job(_load_if_changed, cached.mtime if cached else None)
+    if fresh is not None:
+        hass.data[DATA_CATALOG] = cached = fresh
+        get_domain_stats(hass).catalog_loads += 1
+    return cached
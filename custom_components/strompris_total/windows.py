@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from typing import Any
+
+from .curve import PriceCurve
+
+
+@dataclass(frozen=True, slots=True)
+class CheapestResult:
+    """Cheapest slots found in a PriceCurve (indices refer to the curve)."""
+
+    slots: tuple[int, ...]
+    start: float
+    end: float
+    average_kr_kwh: float
+    contiguous: bool
+
+    def as_dict(self, curve: PriceCurve, tz: tzinfo) -> dict[str, Any]:
+        return {
+            "start": datetime.fromtimestamp(self.start, tz).isoformat(),
+            "end": datetime.fromtimestamp(self.end, tz).isoformat(),
+            "average_kr_kwh": round(self.average_kr_kwh, 4),
+            "contiguous": self.contiguous,
+            "slots": [
+                {
+                    "start": datetime.fromtimestamp(curve.starts[i], tz).isoformat(),
+                    "end": datetime.fromtimestamp(curve.ends[i], tz).isoformat(),
+                    "value": round(curve.total[i], 4),
+                }
+                for i in self.slots
+            ],
+        }
+
+
+def cheapest_window(prices: Sequence[float], n: int, first: int = 0) -> int | None:
+    """Start index of the cheapest run of n consecutive prices in prices[first:] (O(len) sliding sum)."""
+    if n <= 0 or len(prices) - first < n:
+        return None
+    window = sum(prices[first:first + n])
+    best, best_start = window, first
+    for i in range(first + n, len(prices)):
+        window += prices[i] - prices[i - n]
+        if window < best:
+            best, best_start = window, i - n + 1
+    return best_start
+
+
+def cheapest_slots(prices: Sequence[float], n: int, first: int = 0) -> list[int]:
+    """Indices of the n cheapest prices in prices[first:], in time order (partial selection)."""
+    if n <= 0:
+        return []
+    return sorted(heapq.nsmallest(n, range(first, len(prices)), key=prices.__getitem__))
+
+
+def find_cheapest(curve: PriceCurve, hours: float, now_ts: float, contiguous: bool = True) -> CheapestResult | None:
+    """Cheapest future slots covering `hours` hours, from the slot containing now_ts onward."""
+    n = max(1, round(hours * 3600.0 / curve.slot_seconds))
+    first = curve.index_at(now_ts)
+    if first is None:
+        # before the curve or in a gap: start at the next slot
+        first = bisect_left(curve.starts, now_ts)
+
+    prices = curve.total
+    if contiguous:
+        start = cheapest_window(prices, n, first)
+        if start is None:
+            return None
+        slots = tuple(range(start, start + n))
+    else:
+        slots = tuple(cheapest_slots(prices, n, first))
+        if len(slots) < n:
+            return None
+    return CheapestResult(
+        slots=slots,
+        start=curve.starts[slots[0]],
+        end=curve.ends[slots[-1]],
+        average_kr_kwh=sum(prices[i] for i in slots) / len(slots),
+        contiguous=contiguous,
+    )
@@ -0,0 +1,28 @@
+"""Offline månedsregning fra timesforbruk og spotpriser.
+
+    python scripts/strompris_bill.py forbruk.csv --dso elvia
+    python scripts/strompris_bill.py data/*.parquet --options mine_opsjoner.json --format json
+
+Runs the integration's simulator module without Home Assistant installed.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+INTEGRATION_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "strompris_total"
+PACKAGE = "strompris_total"
+
+# Register the integration as a bare namespace so the package __init__ (which
+# imports HA) is skipped. Done at import time so spawned --compare workers,
+# which re-import this script, can unpickle strompris_total.* objects too.
+if PACKAGE not in sys.modules:
+    _pkg = types.ModuleType(PACKAGE)
+    _pkg.__path__ = [str(INTEGRATION_DIR)]
+    sys.modules[PACKAGE] = _pkg
+
+
+if __name__ == "__main__":
+    sys.exit(importlib.import_module(f"{PACKAGE}.simulator").main())
@@ -0,0 +1,22 @@
+"""Import the integration as the package strompris_total without running its __init__.
+
+Home Assistant is replaced by the benchmark harness' stand-ins
+(benchmarks/stubs.py) when it is not installed.
+"""
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+INTEGRATION_DIR = ROOT / "custom_components" / "strompris_total"
+
+_package = types.ModuleType("strompris_total")
+_package.__path__ = [str(INTEGRATION_DIR)]
+sys.modules.setdefault("strompris_total", _package)
+
+sys.path.insert(0, str(ROOT / "benchmarks"))
+from stubs import install_ha_stubs  # noqa: E402
+
+install_ha_stubs()
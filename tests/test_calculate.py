@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from strompris_total import calculate, capacity, pricing
+
+TZ = ZoneInfo("Europe/Oslo")
+T0 = datetime(2026, 3, 2, 10, tzinfo=TZ).timestamp()  # mandag, dagtariff
+TARIFF = pricing.TariffParams.from_options({})
+STARTS = [T0, T0 + 3600]
+ENDS = [T0 + 3600, T0 + 7200]
+VALUES = [1.0, 2.0]
+
+
+def _run(items, capacity_calc=None):
+    return calculate.calculate(items, TARIFF, STARTS, ENDS, VALUES, TZ, capacity_calc)
+
+
+def test_prices_and_totals_in_input_order() -> None:
+    items = [calculate.CalcItem(T0 + 3600, kwh=2.0), calculate.CalcItem(T0, kwh=1.0)]
+    result = _run(items)
+    second, first = result["items"]
+    assert first["spot_kr_kwh"] == 1.0 and second["spot_kr_kwh"] == 2.0
+    assert first["period"] == "dag"
+    expected = TARIFF.total_kr_kwh(1.0, 1)
+    assert first["total_kr_kwh"] == pytest.approx(expected, abs=1e-6)
+    assert first["total_kr"] == pytest.approx(expected, abs=1e-4)
+    totals = result["totals"]
+    assert totals["kwh"] == pytest.approx(3.0)
+    assert totals["total_kr"] == pytest.approx(TARIFF.total_kr_kwh(1.0, 1) + 2 * TARIFF.total_kr_kwh(2.0, 1), abs=1e-3)
+    assert totals["missing_spot"] == 0
+    parts = ("energy_kr", "grid_energy_kr", "taxes_kr", "vat_kr")
+    assert sum(totals[k] for k in parts) == pytest.approx(totals["total_kr"], abs=1e-3)
+
+
+def test_missing_spot_is_counted_not_priced() -> None:
+    result = _run([calculate.CalcItem(T0 + 3 * 3600, kwh=1.0)])
+    item = result["items"][0]
+    assert item["spot_kr_kwh"] is None and item["total_kr_kwh"] is None
+    assert "total_kr" not in item
+    assert result["totals"]["missing_spot"] == 1
+    assert result["totals"]["kwh"] == 0.0
+
+
+def test_capacity_per_month_from_peaks() -> None:
+    items = [
+        calculate.CalcItem(T0, peak_kw=4.0),
+        calculate.CalcItem(T0 + 3600, peak_kw=6.0),  # samme dag: bare dagens maks teller
+        calculate.CalcItem(T0 + 86400, peak_kw=3.0),
+    ]
+    (month,) = _run(items)["capacity"]
+    assert month["month"] == "2026-03"
+    assert month["top3_avg_kw"] == pytest.approx((6.0 + 3.0) / 2)
+    assert month["tier"] == TARIFF.tier_labels[TARIFF.tier_index(4.5)]
+    assert month["includes_measured"] is False
+
+
+def test_capacity_includes_measured_days_of_the_current_month() -> None:
+    calc = capacity.CapacityCalculator(TZ)
+    calc.update_ts(T0 - 86400, 8.0)
+    calc.update_ts(T0 - 86400 + 3600, 0.0)
+    (month,) = _run([calculate.CalcItem(T0, peak_kw=4.0)], calc)["capacity"]
+    assert month["includes_measured"] is True
+    assert month["top3_avg_kw"] == pytest.approx((8.0 + 4.0) / 2)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from strompris_total import capacity
+
+TZ = ZoneInfo("Europe/Oslo")
+DAY0 = datetime(2026, 3, 2, tzinfo=TZ).timestamp()
+
+
+def _with_days(peaks: list[float], resolution_min: int = 60):
+    """Calculator where day i had one hour at peaks[i] kW (10:00) and 0 kW otherwise; the last day is today."""
+    calc = capacity.CapacityCalculator(TZ, resolution_min)
+    for day, kw in enumerate(peaks):
+        calc.update_ts(DAY0 + day * 86400 + 10 * 3600, kw)
+        calc.update_ts(DAY0 + day * 86400 + 11 * 3600, 0.0)
+    return calc
+
+
+def test_top3_average_of_daily_maxima() -> None:
+    calc = _with_days([4.0, 3.0, 5.0, 1.0])
+    assert calc.top3_avg_kw() == pytest.approx((5.0 + 4.0 + 3.0) / 3)
+
+
+def test_fewer_than_three_days() -> None:
+    assert capacity.CapacityCalculator(TZ).top3_avg_kw() == 0.0
+    assert _with_days([4.0]).top3_avg_kw() == pytest.approx(4.0)
+    assert _with_days([4.0, 2.0]).top3_avg_kw() == pytest.approx(3.0)
+
+
+def test_roll_to_holds_the_last_load() -> None:
+    calc = _with_days([4.0, 3.0, 3.0])
+    noon = DAY0 + 3 * 86400 + 12 * 3600
+    calc.update_ts(noon, 6.0)
+    assert calc.roll_to(noon + 600) is False  # same slot
+    assert calc.roll_to(noon + 3600, 6.0) is True
+    assert calc.hour_avg_kw() == pytest.approx(6.0)
+    assert calc.roll_to(noon + 7200) is True
+    assert calc.hour_avg_kw() == 0.0
+
+
+def test_live_hour_counts_towards_today() -> None:
+    calc = _with_days([4.0, 3.0, 3.0])
+    calc.update_ts(DAY0 + 3 * 86400 + 12 * 3600, 9.0)
+    assert calc.today_max_kw() == pytest.approx(9.0)
+    assert calc.top3_avg_kw() == pytest.approx((9.0 + 4.0 + 3.0) / 3)
+
+
+def test_negative_power_is_clipped() -> None:
+    calc = capacity.CapacityCalculator(TZ)
+    calc.update_ts(DAY0, -3.0)
+    calc.update_ts(DAY0 + 60, 1.0)
+    assert calc.today_max_kw() == pytest.approx(0.5)
+
+
+def test_quarter_resolution_averages_slot_means() -> None:
+    calc = capacity.CapacityCalculator(TZ, 15)
+    calc.update_ts(DAY0, 4.0)
+    for i in range(4):
+        calc.update_ts(DAY0 + 900 + i * 60, 0.0)
+    # to kvarter med snitt 4 og 0, ikke snittet av de fem målingene
+    assert calc.hour_avg_kw() == pytest.approx(2.0)
+
+
+def test_projected_top3_and_today_limit() -> None:
+    # ferdige dager 4 og 3, i dag 3 kW så langt
+    calc = _with_days([4.0, 3.0, 3.0])
+    assert calc.today_limit_kw(5.0) == pytest.approx(3 * 5.0 - 7.0)
+    assert calc.projected_top3_avg_kw(8.0) == pytest.approx(5.0)
+    assert calc.projected_top3_avg_kw(0.0) == pytest.approx(10.0 / 3)
+    # tre ferdige dager: summen med i dag er a + b + max(c, t)
+    full = _with_days([4.0, 3.0, 2.0, 1.0])
+    assert full.today_limit_kw(5.0) == pytest.approx(3 * 5.0 - 4.0 - 3.0)
+    assert full.projected_top3_avg_kw(full.today_limit_kw(5.0)) == pytest.approx(5.0)
+
+
+def test_top3_avg_with_extra_peaks() -> None:
+    calc = _with_days([4.0, 3.0, 3.0])
+    assert calc.top3_avg_with({20: 6.0}) == pytest.approx((6.0 + 4.0 + 3.0) / 3)
+
+
+def test_state_round_trip() -> None:
+    calc = _with_days([4.0, 3.0, 5.0])
+    restored = capacity.CapacityCalculator(TZ)
+    restored.restore(calc.as_dict())
+    assert restored.top3_avg_kw() == pytest.approx(calc.top3_avg_kw())
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stubs import FakeEntry, FakeHass
+
+from strompris_total import backfill, capacity, compare, const, simulator, tariffs
+from strompris_total import coordinator as coordinator_mod
+
+TZ = ZoneInfo("Europe/Oslo")
+T0 = datetime(2026, 1, 1, tzinfo=TZ).timestamp()
+DAG = const.OPT_NETT_DAG_ORE
+# to måneder, dyrt og høyt forbruk på dagtid
+ROWS = [(T0 + h * 3600, 3.0 if 8 <= h % 24 < 20 else 1.0, 1.5 if 8 <= h % 24 < 20 else 0.5) for h in range(59 * 24)]
+RAW = {
+    "billig": {"label": "Billig nett", "defaults": {DAG: 10.0}},
+    "dyr": {"label": "Dyrt nett", "defaults": {DAG: 60.0}},
+    "tom": {"label": "Uten satser"},
+    # ny versjon midt i februar: energiledd fra den dagen, fastledd fra neste måned
+    "ny_sats": {
+        "label": "Ny sats",
+        "calendar": {"summer_months": [2]},
+        "periods": [
+            {"from": "2025-01-01", "defaults": {DAG: 20.0, const.OPT_NETT_FAST_KR: 200}},
+            {"from": "2026-02-15", "defaults": {DAG: 40.0, const.OPT_NETT_FAST_KR: 400}},
+        ],
+    },
+}
+CATALOG = tariffs.DsoCatalog.from_raw(RAW)
+DSOS = [(dso, label, CATALOG.tariffs(dso)) for dso, label in CATALOG.labels if dso != "ny_sats"]
+
+
+def test_ranks_every_contract_for_dsos_with_rates() -> None:
+    profile = compare.build_profile(ROWS, TZ)
+    result = compare.compare(profile, {const.OPT_DSO: "dyr"}, DSOS)
+    assert len(result.rows) == 2 * len(const.CONTRACTS)  # "tom" er hoppet over
+    assert [r.total_kr for r in result.rows] == sorted(r.total_kr for r in result.rows)
+    assert result.months == ("2026-01", "2026-02")
+    assert result.current == (const.DEFAULTS[const.OPT_CONTRACT], "dyr")
+    assert result.best.dso == "billig"
+    assert result.savings_kr > 0.0
+    for row in result.rows:
+        parts = (row.energy_kr, row.grid_energy_kr, row.taxes_kr, row.vat_kr, row.capacity_kr, row.fixed_kr)
+        assert sum(parts) == pytest.approx(row.total_kr)
+
+
+def test_versions_are_priced_like_the_bill_simulator() -> None:
+    options = {const.OPT_DSO: "ny_sats", const.OPT_CONTRACT: "spot_plus_paaslag"}
+    profile = compare.build_profile(ROWS, TZ)
+    result = compare.compare(profile, options, [("ny_sats", "Ny sats", CATALOG.tariffs("ny_sats"))])
+    row = result.row("spot_plus_paaslag", "ny_sats")
+    bills = list(simulator.BillSimulator(tariffs.TariffTimeline(CATALOG, options, TZ), TZ).run(
+        ("", ts, kwh, spot) for ts, kwh, spot in ROWS
+    ))
+    for part in ("energy_kr", "grid_energy_kr", "taxes_kr", "vat_kr", "capacity_kr", "fixed_kr"):
+        assert getattr(row, part) == pytest.approx(sum(getattr(b, part) for b in bills)), part
+    # februar startet på den gamle versjonen
+    assert row.fixed_kr == pytest.approx(2 * (const.DEFAULTS[const.OPT_STROM_FAST_KR] + 200))
+
+
+def test_map_jobs_gives_the_same_ranking() -> None:
+    profile = compare.build_profile(ROWS, TZ)
+    serial = compare.compare(profile, {}, DSOS)
+    mapped = compare.compare(
+        profile, {}, DSOS, map_jobs=lambda p, jobs: [compare.evaluate_dso(p, *job) for job in jobs]
+    )
+    assert mapped.rows == serial.rows
+
+
+def test_dso_options_keep_explicit_values() -> None:
+    options = compare.dso_options({const.OPT_DSO: "dyr", DAG: 20.0}, "billig", {DAG: 10.0, const.OPT_NETT_FAST_KR: 100})
+    assert options[const.OPT_DSO] == "billig"
+    assert options[DAG] == 20.0
+    assert options[const.OPT_NETT_FAST_KR] == 100
+
+
+def test_history_is_read_once_and_ranking_reused(monkeypatch: pytest.MonkeyPatch) -> None:
+    hass = FakeHass()
+    hass.config.components.add("recorder")
+    hass.states.set("sensor.spot", "1.0", {"today": [1.0] * 24})
+    catalog = asyncio.run(tariffs.async_get_dso_catalog(hass))
+    first_dso, other_dso = [dso for dso, _ in catalog.labels if catalog.defaults(dso)][:2]
+    entry = FakeEntry(
+        data={const.CONF_SPOT_ENTITY: "sensor.spot", const.CONF_POWER_ENTITY: "sensor.power"},
+        options={const.OPT_DSO: first_dso},
+    )
+    coordinator = coordinator_mod.StromprisCoordinator(
+        hass, entry, capacity.CapacityCalculator(dt_util.get_default_time_zone())
+    )
+    queries = []
+
+    def statistics_during_period(hass, start, end, statistic_ids, period, units, types):
+        queries.append(statistic_ids)
+        return {
+            "sensor.power": [{"start": ts, "mean": kwh} for ts, kwh, _ in ROWS],
+            "sensor.spot": [{"start": ts, "mean": spot} for ts, _, spot in ROWS],
+        }
+
+    monkeypatch.setattr(backfill, "statistics_during_period", statistics_during_period)
+
+    def run():
+        return asyncio.run(backfill.async_compare_contracts(hass, coordinator))
+
+    first = run()
+    assert first is not None and first.current[1] == first_dso
+    assert coordinator.comparison is first
+    # omlasting og valg som bare gjelder live-sensorene: samme resultat
+    entry.options = {**entry.options, const.OPT_BILLIG_TIMER: 4.0}
+    assert run() is first
+    # nytt nettselskap: ny rangering, men historikken hentes ikke på nytt
+    entry.options = {**entry.options, const.OPT_DSO: other_dso}
+    second = run()
+    assert second is not first and second.current[1] == other_dso
+    assert len(queries) == 1
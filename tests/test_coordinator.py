@@ -0,0 +1,88 @@
+"""Smoke test: the coordinator builds and runs its event path against the Home Assistant stand-ins."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from homeassistant.util import dt as dt_util
+from stubs import FakeEntry, FakeEvent, FakeHass
+
+from strompris_total import capacity, const, projection, tariffs
+from strompris_total import coordinator as coordinator_mod
+
+FAST = const.OPT_NETT_FAST_KR
+
+
+def _coordinator(options: dict | None = None):
+    hass = FakeHass()
+    hass.states.set("sensor.spot", "1.2345", {"today": [1.0 + h / 24 for h in range(24)]})
+    entry = FakeEntry(
+        data={const.CONF_SPOT_ENTITY: "sensor.spot", const.CONF_POWER_ENTITY: "sensor.power"},
+        options={const.OPT_MIN_PUBLISH_S: 0.0, **(options or {})},
+    )
+    calc = capacity.CapacityCalculator(dt_util.get_default_time_zone())
+    return hass, coordinator_mod.StromprisCoordinator(hass, entry, calc)
+
+
+def _power(hass, coordinator, kw: float) -> None:
+    state = hass.states.set("sensor.power", f"{kw:.3f}")
+    coordinator._handle_event(FakeEvent({"entity_id": "sensor.power", "new_state": state}))
+
+
+def test_builds_and_publishes_a_snapshot() -> None:
+    hass, coordinator = _coordinator()
+    assert coordinator.data.spot_kr_kwh == pytest.approx(1.2345)
+    assert coordinator.data.curve is not None
+    published = []
+    coordinator.async_add_listener(lambda: published.append(coordinator.data))
+    _power(hass, coordinator, 2.0)
+    _power(hass, coordinator, 3.0)
+    assert coordinator.samples_ingested == 2
+    assert published and published[-1].top3_avg_kw > 0.0
+
+
+def test_unconverted_currency_is_not_priced_as_nok(caplog: pytest.LogCaptureFixture) -> None:
+    hass, coordinator = _coordinator()
+    hass.states.set("sensor.spot", "1.5", {"unit_of_measurement": "SEK/kWh", "today": [1.0] * 24})
+    assert coordinator.spot_prices() is None
+    assert coordinator.spot_prices() is None
+    assert [r.levelname for r in caplog.records] == ["WARNING"]
+    assert "SEK" in caplog.text
+    hass.states.set("sensor.spot", "150", {"unit_of_measurement": "EUR/MWh", "today": [100.0] * 24})
+    prices = coordinator.spot_prices()
+    assert prices.currency == "NOK"
+    assert prices.current == pytest.approx(0.15 * const.DEFAULTS[const.OPT_EUR_NOK])
+
+
+def test_boundary_carries_the_held_load_into_the_new_hour() -> None:
+    hass, coordinator = _coordinator()
+    _power(hass, coordinator, 4.0)
+    next_hour = (time.time() // 3600 + 1) * 3600
+    coordinator._async_on_boundary(dt_util.utc_from_timestamp(next_hour))
+    assert coordinator.capacity.hour_key == next_hour // 3600
+    assert coordinator.capacity.hour_avg_kw() == pytest.approx(4.0)
+
+
+def test_restore_layers_the_catalog_under_explicit_options() -> None:
+    hass, coordinator = _coordinator({const.OPT_DSO: "elvia", FAST: 300})
+    asyncio.run(coordinator.async_restore())
+    catalog = hass.data[tariffs.DATA_CATALOG]
+    catalog_rates = catalog.defaults("elvia")
+    effective = coordinator.effective_options
+    assert effective[FAST] == 300
+    assert effective[const.OPT_NETT_DAG_ORE] == catalog_rates[const.OPT_NETT_DAG_ORE]
+    assert effective[const.OPT_PAASLAG_ORE] == const.DEFAULTS[const.OPT_PAASLAG_ORE]
+
+
+def test_peak_warning_is_fired_on_the_bus() -> None:
+    hass, coordinator = _coordinator({const.OPT_VARSEL_KW: 3.0})
+    ts = (time.time() // 3600) * 3600 + projection.GRACE_S
+    for t in (ts, ts + projection.DWELL_S):
+        coordinator.capacity.update_ts(t, 10.0)
+        coordinator._project(t, 10.0)
+    (event_type, data), = hass.bus.fired
+    assert event_type == const.EVENT_PEAK_WARNING
+    assert data["direction"] == projection.DIRECTION_UP
+    assert data["entry_id"] == "bench"
+    assert data["threshold_kw"] == 3.0
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from strompris_total import cost
+
+TZ = ZoneInfo("Europe/Oslo")
+T0 = datetime(2026, 3, 2, 12, tzinfo=TZ).timestamp()
+
+
+def test_constant_power_for_an_hour() -> None:
+    acc = cost.CostAccumulator(TZ)
+    acc.update_ts(T0, 2.0, 1.5)
+    acc.update_ts(T0 + 3600, 2.0, 1.5)
+    assert acc.day_kwh == pytest.approx(2.0)
+    assert acc.day_kr == pytest.approx(3.0)
+    assert acc.month_kr == pytest.approx(3.0)
+
+
+def test_interval_is_priced_at_its_start() -> None:
+    acc = cost.CostAccumulator(TZ)
+    acc.update_ts(T0, 1.0, 1.0)
+    acc.update_ts(T0 + 3600, 1.0, 3.0)
+    acc.update_ts(T0 + 7200, 1.0, 3.0)
+    assert acc.day_kr == pytest.approx(1.0 + 3.0)
+
+
+def test_trapezoidal_and_left_rules() -> None:
+    trapezoid = cost.CostAccumulator(TZ, cost.METHOD_TRAPEZOIDAL)
+    left = cost.CostAccumulator(TZ, cost.METHOD_LEFT)
+    for acc in (trapezoid, left):
+        acc.update_ts(T0, 0.0, 1.0)
+        acc.update_ts(T0 + 3600, 4.0, 1.0)
+    assert trapezoid.day_kwh == pytest.approx(2.0)
+    assert left.day_kwh == pytest.approx(0.0)
+
+
+def test_split_at_midnight_and_month_rollover() -> None:
+    acc = cost.CostAccumulator(TZ)
+    before = datetime(2026, 3, 31, 23, 30, tzinfo=TZ).timestamp()
+    acc.update_ts(before, 2.0, 1.0)
+    assert acc.update_ts(before + 3600, 2.0, 1.0) is True
+    assert acc.current_day == datetime(2026, 4, 1).date()
+    assert acc.day_kwh == pytest.approx(1.0)
+    assert acc.month_kwh == pytest.approx(1.0)
+
+
+def test_negative_power_is_clipped() -> None:
+    acc = cost.CostAccumulator(TZ)
+    acc.update_ts(T0, -5.0, 1.0)
+    acc.update_ts(T0 + 3600, -5.0, 1.0)
+    assert acc.day_kwh == 0.0
+
+
+def test_restore_keeps_totals_without_integrating_downtime() -> None:
+    acc = cost.CostAccumulator(TZ)
+    acc.update_ts(T0, 2.0, 1.0)
+    acc.update_ts(T0 + 3600, 2.0, 1.0)
+    restored = cost.CostAccumulator(TZ)
+    restored.restore(acc.as_dict())
+    restored.update_ts(T0 + 4 * 3600, 2.0, 1.0)
+    assert restored.day_kwh == pytest.approx(2.0)
+    assert restored.month_kr == pytest.approx(2.0)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from strompris_total import capacity, pricing, projection
+
+TZ = ZoneInfo("Europe/Oslo")
+DAY0 = datetime(2026, 3, 2, tzinfo=TZ).timestamp()
+TARIFF = pricing.TariffParams.from_options({})
+
+
+def _month(peaks: list[float]):
+    """Finalized days with the given døgnmaks; the returned timestamp is 12:00 the day after."""
+    calc = capacity.CapacityCalculator(TZ)
+    for day, kw in enumerate(peaks):
+        calc.update_ts(DAY0 + day * 86400 + 10 * 3600, kw)
+        calc.update_ts(DAY0 + day * 86400 + 11 * 3600, 0.0)
+    return calc, DAY0 + len(peaks) * 86400 + 12 * 3600
+
+
+def test_projects_the_hour_from_average_so_far_and_current_load() -> None:
+    calc, noon = _month([4.0, 3.0, 3.0])
+    projector = projection.PeakProjector()
+    calc.update_ts(noon, 6.0)
+    calc.update_ts(noon + 1800, 2.0)
+    projector.update(calc, TARIFF, noon + 1800, 2.0)
+    last = projector.last
+    # snitt 4 kW første halvtime, 2 kW resten
+    assert last.hour_kw == pytest.approx(4.0 * 0.5 + 2.0 * 0.5)
+    assert last.tier == TARIFF.tier_index(10.0 / 3)
+    assert last.limit_kw == pytest.approx(3 * 5.0 - 4.0 - 3.0)
+    assert last.budget_kwh == pytest.approx(8.0 - 2.0)
+
+
+def _feed(calc, projector, ts: float, kw: float):
+    calc.update_ts(ts, kw)
+    return projector.update(calc, TARIFF, ts, kw)
+
+
+def test_warns_up_and_down_at_the_tier_boundary() -> None:
+    calc, noon = _month([4.0, 3.0, 3.0])
+    projector = projection.PeakProjector()
+    assert _feed(calc, projector, noon, 6.0) is None
+    t = noon + 1800
+    assert _feed(calc, projector, t, 12.0) is None  # kryssingen må vare DWELL_S
+    assert _feed(calc, projector, t + projection.DWELL_S, 12.0) == projection.DIRECTION_UP
+    # the limit does not move with the live hour
+    assert projector.last.limit_kw == pytest.approx(8.0)
+    assert projector.last.projected_tier == projector.last.tier + 1
+    assert projector.last.above is True
+    assert _feed(calc, projector, t + projection.DWELL_S + 10, 12.0) is None
+    t += 400
+    assert _feed(calc, projector, t, 0.0) is None
+    assert _feed(calc, projector, t + projection.DWELL_S, 0.0) == projection.DIRECTION_DOWN
+
+
+def test_short_spikes_and_the_start_of_the_hour_do_not_warn() -> None:
+    calc, noon = _month([4.0, 3.0, 3.0])
+    projector = projection.PeakProjector()
+    # early in the hour the projection is the instantaneous load
+    assert _feed(calc, projector, noon + 10, 12.0) is None
+    assert _feed(calc, projector, noon + 10 + projection.DWELL_S, 12.0) is None
+    t = noon + 1800
+    assert _feed(calc, projector, t, 2.0) is None
+    # a spike shorter than DWELL_S resets when the load drops again
+    assert _feed(calc, projector, t + 10, 14.0) is None
+    assert _feed(calc, projector, t + 60, 1.0) is None
+    assert _feed(calc, projector, t + 10 + projection.DWELL_S, 14.0) is None
+    assert projector.last.above is False
+
+
+def test_down_needs_the_hysteresis_margin() -> None:
+    calc, noon = _month([4.0, 3.0, 3.0])
+    projector = projection.PeakProjector(threshold_kw=5.0)
+    t = noon + projection.GRACE_S
+    _feed(calc, projector, t, 6.0)
+    assert _feed(calc, projector, t + projection.DWELL_S, 6.0) == projection.DIRECTION_UP
+    # just under the threshold, inside the band: still above
+    assert _feed(calc, projector, t + 200, 4.85) is None
+    assert _feed(calc, projector, t + 200 + projection.DWELL_S, 4.85) is None
+    assert 5.0 * (1 - projection.HYSTERESIS) < projector.last.hour_kw < 5.0
+    assert projector.last.above is True
+    assert _feed(calc, projector, t + 400, 4.0) is None
+    assert _feed(calc, projector, t + 400 + projection.DWELL_S, 4.0) == projection.DIRECTION_DOWN
+
+
+def test_fixed_threshold_overrides_the_tier_boundary() -> None:
+    calc, noon = _month([4.0, 3.0, 3.0])
+    projector = projection.PeakProjector(threshold_kw=3.0)
+    t = noon + projection.GRACE_S
+    assert _feed(calc, projector, t, 3.5) is None
+    assert _feed(calc, projector, t + projection.DWELL_S, 3.5) == projection.DIRECTION_UP
+    assert projector.last.threshold_kw == 3.0
+
+
+def test_no_limit_in_the_top_tier() -> None:
+    calc, noon = _month([30.0, 30.0, 30.0])
+    projector = projection.PeakProjector()
+    calc.update_ts(noon, 30.0)
+    assert projector.update(calc, TARIFF, noon, 30.0) is None
+    assert projector.last.limit_kw is None
+    assert projector.last.budget_kwh is None
+    assert projector.last.as_dict(TARIFF)["tier"] == TARIFF.tier_labels[-1]
+
+
+def test_empty_calculator() -> None:
+    projector = projection.PeakProjector()
+    assert projector.last is None
+    assert projector.update(capacity.CapacityCalculator(TZ), TARIFF, DAY0, 1.0) is None
+    assert projector.last.hour_kw == 1.0
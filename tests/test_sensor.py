@@ -0,0 +1,57 @@
+"""Change-only state writes of the sensor platform, against the Home Assistant stand-ins."""
+from __future__ import annotations
+
+from stubs import FakeEntry, FakeEvent, FakeHass
+
+from strompris_total import capacity, const, sensor
+from strompris_total import coordinator as coordinator_mod
+
+
+def _setup(key: str):
+    hass = FakeHass()
+    hass.states.set("sensor.spot", "1.2345", {"today": [1.0 + h / 24 for h in range(24)]})
+    entry = FakeEntry(
+        data={const.CONF_SPOT_ENTITY: "sensor.spot", const.CONF_POWER_ENTITY: "sensor.power"},
+        options={const.OPT_MIN_PUBLISH_S: 0.0},
+    )
+    coordinator = coordinator_mod.StromprisCoordinator(hass, entry, capacity.CapacityCalculator())
+    (description,) = [d for d in sensor.SENSORS if d.key == key]
+    entity = sensor.StromprisTotalSensor(hass, entry, description, coordinator)
+    built = []
+    attributes = entity._attributes
+
+    def counting() -> dict:
+        built.append(1)
+        return attributes()
+
+    entity._attributes = counting
+    coordinator.async_add_listener(entity._async_write)
+    return hass, coordinator, entity, built
+
+
+def _power(hass, coordinator, kw: float) -> None:
+    state = hass.states.set("sensor.power", f"{kw:.3f}")
+    coordinator._handle_event(FakeEvent({"entity_id": "sensor.power", "new_state": state}))
+
+
+def test_curve_attributes_are_built_once_per_curve() -> None:
+    hass, coordinator, entity, built = _setup("prisforlop_kr_kwh")
+    for kw in (1.0, 2.0, 3.0):
+        _power(hass, coordinator, kw)
+    assert len(built) == 1
+    assert coordinator.stats.state_writes == 1
+    assert coordinator.stats.writes_skipped == 2
+    assert entity.extra_state_attributes == dict(coordinator.data.curve.attributes)
+    # ny spotpris: ny kurve, attributtene bygges på nytt
+    hass.states.set("sensor.spot", "2.0", {"today": [2.0] * 24})
+    coordinator.async_refresh()
+    assert len(built) == 2
+    assert coordinator.stats.state_writes == 2
+
+
+def test_small_attributes_follow_the_value() -> None:
+    hass, coordinator, entity, _ = _setup("kostnad_i_dag_kr")
+    _power(hass, coordinator, 1.0)
+    _power(hass, coordinator, 1.0)
+    assert coordinator.stats.state_writes == 1
+    assert entity.extra_state_attributes == {"energi_kwh": round(coordinator.data.energy_day_kwh, 3)}
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from stubs import FakeHass, FakeState
+
+from strompris_total import spot_hub, spot_sources
+
+TZ = ZoneInfo("Europe/Oslo")
+TODAY = date(2026, 3, 2)
+MIDNIGHT = datetime(2026, 3, 2, tzinfo=TZ)
+
+
+def _hours(n: int, key_start: str = "start", key_value: str = "value", with_end: bool = True) -> list[dict]:
+    out = []
+    for h in range(n):
+        start = MIDNIGHT + timedelta(hours=h)
+        item = {key_start: start.isoformat(), key_value: 1.0 + h / 100}
+        if with_end:
+            item["end"] = (start + timedelta(hours=1)).isoformat()
+        out.append(item)
+    return out
+
+
+@pytest.mark.parametrize(
+    ("attrs", "name"),
+    [
+        ({"raw_today": _hours(24), "raw_tomorrow": []}, "nordpool"),
+        ({"prices_today": _hours(24, "time", "price", with_end=False)}, "entsoe"),
+        ({"today": _hours(24, "startsAt", "total", with_end=False)}, "slot_list"),
+        ({"prices": _hours(48, "time", "price", with_end=False)}, "prices"),
+        ({"today": [1.0] * 24}, "plain_list"),
+    ],
+)
+def test_detects_the_format(attrs: dict, name: str) -> None:
+    adapter = spot_sources.detect_adapter(attrs)
+    assert adapter is not None and adapter.name == name
+    slots = list(adapter.slots(attrs, TZ, TODAY))
+    assert slots[0][0] == MIDNIGHT.timestamp()
+    assert slots[0][1] - slots[0][0] == 3600.0
+
+
+def test_unknown_format() -> None:
+    assert spot_sources.detect_adapter({"friendly_name": "x"}) is None
+
+
+def test_unsorted_list_gets_ends_from_the_next_start() -> None:
+    items = _hours(3, "time", "price", with_end=False)
+    attrs = {"prices_today": [items[2], items[0], items[1]]}
+    slots = list(spot_sources.detect_adapter(attrs).slots(attrs, TZ, TODAY))
+    assert [s for s, _, _ in slots] == sorted(s for s, _, _ in slots)
+    assert all(end - start == 3600.0 for start, end, _ in slots)
+
+
+def test_plain_list_with_quarters() -> None:
+    attrs = {"today": [1.0] * 96}
+    slots = list(spot_sources.detect_adapter(attrs).slots(attrs, TZ, TODAY))
+    assert len(slots) == 96
+    assert slots[1][0] - slots[0][0] == 900.0
+
+
+@pytest.mark.parametrize(
+    ("attrs", "expected"),
+    [
+        ({"unit_of_measurement": "NOK/kWh"}, ("NOK", 1.0)),
+        ({"unit_of_measurement": "øre/kWh"}, ("NOK", 0.01)),
+        ({"unit_of_measurement": "EUR/MWh"}, ("EUR", 0.001)),
+        ({"unit_of_measurement": "SEK/kWh"}, ("SEK", 1.0)),
+        ({"price_in_cents": True, "currency": "NOK"}, ("NOK", 0.01)),
+        ({}, ("NOK", 1.0)),
+    ],
+)
+def test_parse_unit(attrs: dict, expected: tuple[str, float]) -> None:
+    currency, factor = spot_sources.parse_unit(attrs)
+    assert currency == expected[0]
+    assert factor == pytest.approx(expected[1])
+
+
+def test_register_adapter_takes_precedence() -> None:
+    class Custom:
+        name = "custom"
+
+        def detect(self, attrs):
+            return "my_prices" in attrs
+
+        def slots(self, attrs, tz, today):
+            yield from attrs["my_prices"]
+
+    spot_sources.register_adapter(Custom())
+    try:
+        assert spot_sources.detect_adapter({"my_prices": [], "today": [1.0]}).name == "custom"
+    finally:
+        spot_sources.ADAPTERS.pop(0)
+
+
+def test_parse_spot_state_scales_sorts_and_dedupes() -> None:
+    items = _hours(2, "time", "price", with_end=False)
+    state = FakeState(
+        "sensor.spot", "120", {"unit_of_measurement": "øre/kWh", "prices_today": [items[1], items[0], items[1]]},
+        last_updated=MIDNIGHT,
+    )
+    prices = spot_hub.parse_spot_state(state)
+    assert prices.source == "entsoe"
+    assert prices.current == pytest.approx(1.2)
+    assert list(prices.starts) == [MIDNIGHT.timestamp(), MIDNIGHT.timestamp() + 3600]
+    assert list(prices.values) == pytest.approx([0.01, 0.0101])
+
+
+def test_hub_keeps_sources_only_while_subscribed() -> None:
+    hass = FakeHass()
+    hass.states.set("sensor.spot", "1.0", {"today": [1.0] * 24})
+    hub = spot_hub.SpotPriceHub(hass)
+    assert hub.get("sensor.spot") is not None
+    assert hub.source_count == 0
+    unsub_a = hub.async_subscribe("sensor.spot", lambda prices: None)
+    unsub_b = hub.async_subscribe("sensor.spot", lambda prices: None)
+    first = hub.get("sensor.spot")
+    assert hub.get("sensor.spot") is first  # cached while subscribed
+    unsub_a()
+    assert hub.source_count == 1
+    unsub_b()
+    assert hub.source_count == 0
+    assert hub.get("sensor.other") is None
+    assert hub.source_count == 0
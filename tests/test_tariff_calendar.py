@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from strompris_total import tariff_calendar as cal
+
+TZ = ZoneInfo("Europe/Oslo")
+SUMMER = cal.CalendarRules(summer_months=(4, 5, 6, 7, 8, 9))
+
+
+def _ts(*args: int) -> float:
+    return datetime(*args, tzinfo=TZ).timestamp()
+
+
+def test_easter_and_holidays() -> None:
+    assert cal.easter_sunday(2025) == date(2025, 4, 20)
+    assert cal.easter_sunday(2026) == date(2026, 4, 5)
+    holidays = cal.norwegian_holidays(2026)
+    assert date(2026, 5, 17) in holidays
+    assert date(2026, 4, 3) in holidays  # langfredag
+    assert date(2026, 5, 14) in holidays  # Kristi himmelfartsdag
+    assert date(2026, 5, 18) not in holidays
+
+
+def test_day_night_weekend_and_holiday() -> None:
+    lookup = cal.CalendarLookup(cal.DEFAULT_RULES, TZ)
+    assert lookup.period_at(_ts(2026, 3, 2, 10)) == cal.PERIOD_DAY  # mandag
+    assert lookup.period_at(_ts(2026, 3, 2, 5)) == cal.PERIOD_NIGHT
+    assert lookup.period_at(_ts(2026, 3, 2, 22)) == cal.PERIOD_NIGHT
+    assert lookup.period_at(_ts(2026, 3, 7, 10)) == cal.PERIOD_NIGHT  # lørdag
+    assert lookup.period_at(_ts(2026, 5, 1, 10)) == cal.PERIOD_NIGHT  # fredag, 1. mai
+    no_holidays = cal.CalendarLookup(cal.CalendarRules(holidays_as_night=False), TZ)
+    assert no_holidays.period_at(_ts(2026, 5, 1, 10)) == cal.PERIOD_DAY
+
+
+def test_summer_months_set_the_summer_bit() -> None:
+    lookup = cal.CalendarLookup(SUMMER, TZ)
+    assert lookup.period_at(_ts(2026, 7, 1, 10)) == cal.PERIOD_SUMMER | cal.PERIOD_DAY
+    assert lookup.period_at(_ts(2026, 7, 1, 23)) == cal.PERIOD_SUMMER
+    assert lookup.period_at(_ts(2026, 10, 1, 10)) == cal.PERIOD_DAY
+
+
+def test_compiled_calendar_matches_the_rules() -> None:
+    holidays = cal.norwegian_holidays(2026)
+    for resolution in (60, 15):
+        compiled = cal.compile_calendar(SUMMER, TZ, 2026, resolution)
+        assert len(compiled.codes) == 8760 * 60 // resolution
+        for ts in range(int(compiled.start_ts), int(compiled.end_ts), 7 * 3600 + 900):
+            local = datetime.fromtimestamp(ts, TZ)
+            assert compiled.period_at(ts) == SUMMER.period(local, holidays)
+
+
+def test_lookup_across_the_year_boundary() -> None:
+    lookup = cal.CalendarLookup(cal.DEFAULT_RULES, TZ)
+    assert lookup.period_at(_ts(2025, 12, 31, 12)) == cal.PERIOD_DAY  # onsdag
+    assert lookup.period_at(_ts(2026, 1, 1, 12)) == cal.PERIOD_NIGHT  # 1. nyttårsdag
+    assert lookup.period_at(_ts(2026, 1, 2, 12)) == cal.PERIOD_DAY
+
+
+def test_rules_from_catalog() -> None:
+    assert cal.CalendarRules.from_raw(None) is cal.DEFAULT_RULES
+    rules = cal.CalendarRules.from_raw({"day_hours": [7, 21], "summer_months": [6, 7]})
+    assert (rules.day_start, rules.day_end, rules.summer_months) == (7, 21, (6, 7))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from strompris_total import compare, const, tariffs
+from strompris_total.tariff_calendar import PERIOD_DAY
+
+TZ = ZoneInfo("Europe/Oslo")
+DAG = const.OPT_NETT_DAG_ORE
+FAST = const.OPT_NETT_FAST_KR
+RAW = {
+    "nett_a": {
+        "label": "Nett A",
+        "calendar": {"summer_months": [6, 7]},
+        "periods": [
+            {"from": "2026-07-01", "defaults": {DAG: 12.5, FAST: 248}},
+            {"from": "2025-01-01", "defaults": {DAG: 11.9, FAST: 189, const.OPT_NETT_NATT_ORE: 7.9}},
+        ],
+    },
+    "nett_b": {"label": "Nett B", "defaults": {DAG: 30.0}},
+}
+CATALOG = tariffs.DsoCatalog.from_raw(RAW)
+JULY = datetime(2026, 7, 1, tzinfo=TZ).timestamp()
+
+
+def test_versions_sorted_and_inherited() -> None:
+    t = CATALOG.tariffs("nett_a")
+    assert t.starts[0] == float("-inf")
+    assert t.index_at(datetime(2024, 1, 1, tzinfo=TZ).timestamp()) == 0
+    assert t.index_at(JULY - 1) == 0
+    assert t.index_at(JULY) == 1
+    assert t.valid_until(JULY - 1) == JULY
+    assert t.valid_until(JULY) == float("inf")
+    assert t.defaults[1][const.OPT_NETT_NATT_ORE] == 7.9
+    assert CATALOG.calendar("nett_a", JULY).summer_months == (6, 7)
+    assert CATALOG.rate_keys("nett_a") == {DAG, FAST, const.OPT_NETT_NATT_ORE}
+    assert CATALOG.defaults("ukjent") == {}
+    assert [label for _, label in CATALOG.labels] == ["Nett A", "Nett B"]
+
+
+def test_effective_options_precedence() -> None:
+    effective = tariffs.effective_options({FAST: 300}, CATALOG.defaults("nett_a", JULY))
+    assert effective[FAST] == 300  # eget valg vinner
+    assert effective[DAG] == 12.5  # så katalogen
+    assert effective[const.OPT_PAASLAG_ORE] == const.DEFAULTS[const.OPT_PAASLAG_ORE]  # så DEFAULTS
+
+
+def test_compare_uses_the_same_precedence() -> None:
+    base = {const.OPT_DSO: "nett_a", FAST: 300}
+    defaults = CATALOG.defaults("nett_b")
+    options = compare.dso_options(base, "nett_b", defaults)
+    assert options == {**tariffs.effective_options(base, defaults), const.OPT_DSO: "nett_b"}
+    assert options[DAG] == 30.0 and options[FAST] == 300
+
+
+def test_explicit_options_drop_seeded_values() -> None:
+    june = JULY - 86400
+    seeded = {
+        **const.DEFAULTS,
+        **CATALOG.defaults("nett_a", june),  # det versjon 1 kopierte inn da oppføringen ble laget
+        const.OPT_DSO: "nett_a",
+        FAST: 999,  # egen overstyring
+        const.OPT_PAASLAG_ORE: 5.0,
+    }
+    expected = {
+        const.OPT_PRICE_AREA: const.DEFAULTS[const.OPT_PRICE_AREA],
+        const.OPT_DSO: "nett_a",
+        const.OPT_CONTRACT: const.DEFAULTS[const.OPT_CONTRACT],
+        FAST: 999,
+        const.OPT_PAASLAG_ORE: 5.0,
+    }
+    assert CATALOG.explicit_options(seeded, june) == expected
+    assert CATALOG.explicit_options(seeded) == expected
+
+
+def test_explicit_options_keep_values_the_entry_could_not_have_seeded() -> None:
+    options = {const.OPT_DSO: "nett_a", DAG: 12.5, const.OPT_NETT_NATT_ORE: const.DEFAULTS[const.OPT_NETT_NATT_ORE]}
+    # 12.5 kom først i juli-versjonen, og katalogen overstyrte natt-standardverdien
+    assert CATALOG.explicit_options(options, JULY - 86400) == options
+    # uten opprettelsestidspunkt teller alle versjoner
+    assert DAG not in CATALOG.explicit_options(options)
+
+
+def test_switching_dso_drops_rate_overrides() -> None:
+    options = {const.OPT_DSO: "nett_a", FAST: 300, DAG: 20.0, const.OPT_PAASLAG_ORE: 5.0}
+    assert CATALOG.options_for_dso(options, "nett_b") == {const.OPT_DSO: "nett_b", const.OPT_PAASLAG_ORE: 5.0}
+
+
+def test_timeline_picks_the_version_under_overrides() -> None:
+    timeline = tariffs.TariffTimeline(CATALOG, {const.OPT_DSO: "nett_a", DAG: 20.0}, TZ)
+    june = timeline.at(JULY - 3600)
+    july = timeline.at(JULY)
+    assert june.fixed_kr_mnd == pytest.approx(const.DEFAULTS[const.OPT_STROM_FAST_KR] + 189)
+    assert july.fixed_kr_mnd == pytest.approx(const.DEFAULTS[const.OPT_STROM_FAST_KR] + 248)
+    # overstyringen gjelder i begge versjoner
+    assert june.grid_kr[PERIOD_DAY] == july.grid_kr[PERIOD_DAY] == pytest.approx(0.2)
+    assert timeline.at(JULY + 86400) is july
+    assert timeline.at(JULY - 7200) is june
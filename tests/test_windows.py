@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+
+import pytest
+
+from strompris_total import curve as curve_mod
+from strompris_total import windows
+
+T0 = 1_790_805_600.0  # 2026-10-01 00:00 Europe/Oslo
+PRICES = [3.0, 1.0, 2.0, 0.5, 4.0, 0.6, 5.0, 1.0]
+
+
+def _curve(prices: list[float], step: float = 3600.0):
+    starts = tuple(T0 + i * step for i in range(len(prices)))
+    return curve_mod.PriceCurve(
+        starts=starts,
+        ends=tuple(s + step for s in starts),
+        spot=tuple(prices),
+        total=tuple(prices),
+        today_avg=sum(prices) / len(prices),
+        attributes=MappingProxyType({}),
+    )
+
+
+def test_cheapest_window_sliding_sum() -> None:
+    assert windows.cheapest_window(PRICES, 2) == 2  # 2.0 + 0.5
+    assert windows.cheapest_window(PRICES, 3) == 1  # 1.0 + 2.0 + 0.5
+    assert windows.cheapest_window(PRICES, 2, first=4) == 4  # 4.0 + 0.6
+    assert windows.cheapest_window(PRICES, 9) is None
+
+
+def test_cheapest_slots_in_time_order() -> None:
+    assert windows.cheapest_slots(PRICES, 3) == [1, 3, 5]
+    assert windows.cheapest_slots(PRICES, 2, first=4) == [5, 7]
+    assert windows.cheapest_slots(PRICES, 0) == []
+
+
+def test_find_cheapest_from_now() -> None:
+    curve = _curve(PRICES)
+    # from inside slot 4: the slot already started still counts
+    result = windows.find_cheapest(curve, 2, T0 + 4 * 3600 + 60)
+    assert result.slots == (4, 5)
+    assert result.start == T0 + 4 * 3600
+    assert result.end == T0 + 6 * 3600
+    assert result.average_kr_kwh == pytest.approx((4.0 + 0.6) / 2)
+
+    spread = windows.find_cheapest(curve, 2, T0, contiguous=False)
+    assert spread.slots == (3, 5)
+    assert spread.contiguous is False
+
+
+def test_find_cheapest_quarter_slots_and_too_few_left() -> None:
+    curve = _curve(PRICES, step=900.0)
+    result = windows.find_cheapest(curve, 0.5, T0)
+    assert len(result.slots) == 2
+    assert windows.find_cheapest(curve, 3, T0) is None